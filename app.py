@@ -1,11 +1,62 @@
+# First, so the import phase is timed too
+import startup
+import functools
+import gc
+import os
+import sys
+
+# Dash imports IPython (about 0.4 s) for notebook support whenever it is
+# installed. Hide it while Dash loads unless this process already runs in
+# IPython or Jupyter, where Dash finds it loaded.
+_hide_ipython = 'IPython' not in sys.modules
+if _hide_ipython:
+    sys.modules['IPython'] = None
 import dash
-from dash import dcc, html, Input, Output, State, dash_table
-import plotly.express as px
+from dash import dcc, html, Input, Output, State, dash_table, no_update
+import dash_auth
+if _hide_ipython:
+    del sys.modules['IPython']
+# Dash loads plotly.graph_objects itself; pandas comes with the data load
 import plotly.graph_objects as go
 import pandas as pd
-import numpy as np
-import os
-import dash_auth
+
+import datastore
+import figure_cache
+import figures
+import health
+import metrics as callback_metrics
+import table_query
+from figure_cache import cached_figure
+from data_loader import PRELOAD
+
+# Optional subsystems are imported only when switched on; their modules
+# document the variables
+BACKGROUND_JOBS = os.environ.get("TREND_BACKGROUND_JOBS", "0") == "1"
+COMPACT_RESPONSES = os.environ.get("TREND_COMPACT_RESPONSES", "0") == "1"
+PARTIAL_UPDATES = os.environ.get("TREND_PARTIAL_UPDATES", "1") == "1"
+PROFILING = bool(os.environ.get("TREND_PROFILE_TOKEN"))
+WARMUP = os.environ.get("TREND_WARMUP", "0") == "1"
+if BACKGROUND_JOBS:
+    import jobs
+if COMPACT_RESPONSES:
+    import responses
+if PARTIAL_UPDATES:
+    import partial_updates
+if PROFILING:
+    import profiling
+if WARMUP:
+    import warmup
+
+startup.mark('imports')
+
+# Send the therapy ranking as one figure with native Plotly animation frames
+# instead of driving the player with clientside callbacks
+RANKING_FRAMES = os.environ.get("TREND_RANKING_FRAMES", "0") == "1"
+
+# Filter, sort and page the generic table on the server (TREND_TABLE_PAGING=0
+# sends every row and lets the browser do it)
+TABLE_PAGING = os.environ.get("TREND_TABLE_PAGING", "1") == "1"
+TABLE_ACTION = "custom" if TABLE_PAGING else "native"
 
 # Get credentials from Render environment variables
 VALID_USERS = {
@@ -18,49 +69,60 @@ VALID_USERS = {
 app = dash.Dash(__name__, suppress_callback_exceptions=True)
 auth = dash_auth.BasicAuth(app, VALID_USERS)
 server = app.server
-# Load data from Excel file
-def load_data():
-    # Read the Excel file with multiple sheets
-    yearly_df = pd.read_csv('data/annual.csv', dtype={'Insurer':str})
-    province_df = pd.read_csv('data/province.csv', dtype={'Insurer':str})
-    generic_df = pd.read_csv('data/generic.csv', dtype={'Insurer':str})
-    therapy_df = pd.read_csv('data/therapy.csv', dtype={'Insurer':str})
-     
-    # Calculate derived metrics for all dataframes
-    for df in [yearly_df, province_df, generic_df, therapy_df]:
-        df['Cost_Per_Claimant'] = df['Cost'] / df['Claimants']
-        df['Cost_Per_Volume'] = df['Cost'] / df['Volumes']
-        df['Claims_Per_Claimant'] = df['Volumes'] / df['Claimants']
-    
-    # Get unique insurers
-    insurers = sorted(yearly_df['Insurer'].unique().tolist())
-    insurers.remove('BOB')  # Remove BOB from the list to handle it separately
-   
-    # Calculate growth rates for yearly data
-    # Group by Insurer and Year, then calculate pct_change within each group
-    yearly_growth_rate_df = pd.DataFrame()
-    
-    for insurer in ['BOB'] + insurers:
-        insurer_yearly = yearly_df[yearly_df['Insurer'] == insurer].sort_values('Year')
-        
-        # Calculate growth rates
-        insurer_yearly['Claimants_Growth'] = insurer_yearly['Claimants'].pct_change() * 100
-        insurer_yearly['Volumes_Growth'] = insurer_yearly['Volumes'].pct_change() * 100
-        insurer_yearly['Cost_Growth'] = insurer_yearly['Cost'].pct_change() * 100
-        insurer_yearly['Cost_Per_Claimant_Growth'] = insurer_yearly['Cost_Per_Claimant'].pct_change() * 100
-        insurer_yearly['Cost_Per_Volume_Growth'] = insurer_yearly['Cost_Per_Volume'].pct_change() * 100
-        insurer_yearly['Claims_Per_Claimant_Growth'] = insurer_yearly['Claims_Per_Claimant'].pct_change() * 100
+# Per-callback timings, response sizes, cache hits and RSS on /metrics (TREND_METRICS)
+callback_metrics.install(app, cache_stats=figure_cache.stats)
+# Slim figure template, fast JSON and gzip/brotli (TREND_COMPACT_RESPONSES)
+if COMPACT_RESPONSES:
+    responses.install(server)
+# Profile single callback requests on demand (TREND_PROFILE_TOKEN)
+if PROFILING:
+    profiling.install(server)
+# /healthz and /readyz, answered ahead of the basic auth
+health.install(server, warmup_state=warmup.state if WARMUP else None)
+startup.mark('app setup')
+# Load the data
+datastore.load()
+startup.mark('data load')
 
-      
-        # Update the original dataframe
-        yearly_growth_rate_df = pd.concat([yearly_growth_rate_df,insurer_yearly])
-    yearly_df = yearly_growth_rate_df
-    
-    return yearly_df, province_df, generic_df, therapy_df, insurers
+# Once a worker serves requests: poll the data directory (hot reload) and
+# load the remaining tab datasets in the background (TREND_WARM_DATA)
+@server.before_request
+def start_data_threads():
+    datastore.start_refresher()
+    datastore.warm_up()
 
-# Load the data
-yearly_df, province_df, generic_df, therapy_df, insurers = load_data()
-print(yearly_df.columns)
+def _no_progress(value):
+    pass
+
+# app.callback that runs as a background job with TREND_BACKGROUND_JOBS=1. The
+# function takes set_progress first either way; inline it does nothing.
+def background_callback(*dependencies, progress=None, running=None):
+    if BACKGROUND_JOBS:
+        return jobs.callback(app, *dependencies, progress=progress, running=running)
+    def decorator(func):
+        def inline(*args):
+            return func(_no_progress, *args)
+        functools.update_wrapper(inline, func)
+        return app.callback(*dependencies)(inline)
+    return decorator
+
+# Between the build steps of a background job: stop if the browser cancelled it
+def checkpoint():
+    if BACKGROUND_JOBS:
+        jobs.checkpoint()
+
+# (figure or Patch, signature) for a graph and its signature store; with
+# TREND_PARTIAL_UPDATES=0 the full figure, and the store is left alone
+def send_figure(figure, signature):
+    if PARTIAL_UPDATES:
+        return partial_updates.update(figure, signature)
+    return figure, no_update
+
+# The same for the store of per-year ranking figures
+def send_frames(frames, signature):
+    if PARTIAL_UPDATES:
+        return partial_updates.update_frames(frames, signature)
+    return frames, no_update
 
 # Define available metrics
 metrics = [
@@ -81,373 +143,234 @@ growth_metrics = [
     {'label': 'Claims Per Claimant Growth', 'value': 'Claims_Per_Claimant_Growth'}
 ]
 
-# App layout
-app.layout = html.Div([
-    html.H1("Claims Dashboard", style={'textAlign': 'center', 'marginBottom': 30}),
+# Initial selections of the multi-metric dropdowns
+default_annual_metrics = ['Claimants', 'Volumes', 'Cost']
+default_growth_metrics = ['Claimants_Growth', 'Volumes_Growth', 'Cost_Growth']
+
+# App layout, rebuilt on every page load so dropdowns follow reloaded data
+def serve_layout():
+    data = datastore.current()
+    yearly_df, insurers = data.yearly, data.insurers
+    # Listed without loading the province frame, which waits for its tab
+    provinces = data.values('province', 'Province')
+    # Headings span the loaded years; the annual frame covers the other datasets' years
+    year_span = f"{yearly_df['Year'].min()}-{yearly_df['Year'].max()}"
+
+    return html.Div([
+        html.H1("Claims Dashboard", style={'textAlign': 'center', 'marginBottom': 30}),
     
-    # Main layout with left panel and right content
-    html.Div([
-        # Left Panel for Insurer Selection
+        # Main layout with left panel and right content
         html.Div([
-            html.H3("Data Selection", style={'textAlign': 'center', 'marginBottom': 20}),
-            
-            # BOB Toggle
+            # Left Panel for Insurer Selection
             html.Div([
-                html.Label("Show Book of Business (BOB) Data:"),
-                dcc.RadioItems(
-                    id='bob-toggle',
-                    options=[
-                        {'label': 'Yes', 'value': 'BOB'},
-                        {'label': 'No', 'value': 'insurer'}
-                    ],
-                    value='BOB',
-                    labelStyle={'display': 'inline-block', 'marginRight': '10px'}
-                )
-            ], style={'marginBottom': 20}),
+                html.H3("Data Selection", style={'textAlign': 'center', 'marginBottom': 20}),
             
-            # Insurer Dropdown (only visible when BOB is not selected)
-            html.Div([
-                html.Label("Select Insurer:"),
-                dcc.Dropdown(
-                    id='insurer-dropdown',
-                    options=[{'label': f"Insurer {insurer}", 'value': insurer} for insurer in insurers],
-                    value=insurers[0],
-                    disabled=True
-                )
-            ], style={'marginBottom': 20, 'display': 'block'}),
+                # BOB Toggle
+                html.Div([
+                    html.Label("Show Book of Business (BOB) Data:"),
+                    dcc.RadioItems(
+                        id='bob-toggle',
+                        options=[
+                            {'label': 'Yes', 'value': 'BOB'},
+                            {'label': 'No', 'value': 'insurer'}
+                        ],
+                        value='BOB',
+                        labelStyle={'display': 'inline-block', 'marginRight': '10px'}
+                    )
+                ], style={'marginBottom': 20}),
             
-            # Data Source Display
-            html.Div([
-                html.H4("Current Data Source:", style={'marginBottom': 5}),
-                html.Div(id='data-source-display', style={
-                    'padding': '10px',
-                    'backgroundColor': '#f8f9fa',
-                    'border': '1px solid #ddd',
-                    'borderRadius': '5px',
-                    'fontWeight': 'bold',
-                    'textAlign': 'center'
-                })
-            ])
-        ], style={
-            'width': '20%',
-            'padding': '20px',
-            'backgroundColor': '#f8f9fa',
-            'border': '1px solid #ddd',
-            'borderRadius': '5px',
-            'marginRight': '20px',
-            'height': 'fit-content',
-            'float': 'left'  # Add float left to ensure it stays on the left
-        }),
+                # Insurer Dropdown (only visible when BOB is not selected)
+                html.Div([
+                    html.Label("Select Insurer:"),
+                    dcc.Dropdown(
+                        id='insurer-dropdown',
+                        options=[{'label': f"Insurer {insurer}", 'value': insurer} for insurer in insurers],
+                        value=insurers[0],
+                        disabled=True
+                    )
+                ], style={'marginBottom': 20, 'display': 'block'}),
+            
+                # Data Source Display
+                html.Div([
+                    html.H4("Current Data Source:", style={'marginBottom': 5}),
+                    html.Div(id='data-source-display', style={
+                        'padding': '10px',
+                        'backgroundColor': '#f8f9fa',
+                        'border': '1px solid #ddd',
+                        'borderRadius': '5px',
+                        'fontWeight': 'bold',
+                        'textAlign': 'center'
+                    })
+                ])
+            ], style={
+                'width': '20%',
+                'padding': '20px',
+                'backgroundColor': '#f8f9fa',
+                'border': '1px solid #ddd',
+                'borderRadius': '5px',
+                'marginRight': '20px',
+                'height': 'fit-content',
+                'float': 'left'  # Add float left to ensure it stays on the left
+            }),
         
-        # Right Content with Tabs
-        html.Div([
-            dcc.Tabs([
-                # Tab 1: Annual Trends
-                dcc.Tab(label="Annual Trends", children=[
-                    html.Div([
-                        # Summary cards for latest year metrics
+            # Right Content with Tabs
+            html.Div([
+                dcc.Tabs([
+                    # Tab 1: Annual Trends
+                    dcc.Tab(label="Annual Trends", children=[
                         html.Div([
-                            html.H3("Latest Year Summary", style={'textAlign': 'center', 'marginBottom': 20}),
-                            # All metrics in a single container with 3 per row
+                            # Summary cards for latest year metrics
                             html.Div([
-                                # Row 1: Primary metrics
+                                html.H3("Latest Year Summary", style={'textAlign': 'center', 'marginBottom': 20}),
+                                # All metrics in a single container with 3 per row
                                 html.Div([
-                                    # Claimants Card
+                                    # Row 1: Primary metrics
                                     html.Div([
-                                        html.H4("Total Claimants", style={'textAlign': 'center', 'marginBottom': 10}),
-                                        html.H2(
-                                            id='latest-year-claimants',
-                                            children=f"{yearly_df.iloc[-1]['Claimants']:,.0f}",
-                                            style={'textAlign': 'center', 'color': '#007BFF'}
-                                        ),
-                                        html.P(
-                                            id='latest-year-claimants-growth',
-                                            children=f"({yearly_df.iloc[-1]['Claimants_Growth']:.1f}% from previous year)" 
-                                            if not pd.isna(yearly_df.iloc[-1]['Claimants_Growth']) else "",
-                                            style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
-                                        )
-                                    ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
-                                            'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'}),
+                                        # Claimants Card
+                                        html.Div([
+                                            html.H4("Total Claimants", style={'textAlign': 'center', 'marginBottom': 10}),
+                                            html.H2(
+                                                id='latest-year-claimants',
+                                                children=f"{yearly_df.iloc[-1]['Claimants']:,.0f}",
+                                                style={'textAlign': 'center', 'color': '#007BFF'}
+                                            ),
+                                            html.P(
+                                                id='latest-year-claimants-growth',
+                                                children=f"({yearly_df.iloc[-1]['Claimants_Growth']:.1f}% from previous year)" 
+                                                if not pd.isna(yearly_df.iloc[-1]['Claimants_Growth']) else "",
+                                                style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
+                                            )
+                                        ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
+                                                'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'}),
                                     
-                                    # Volumes Card
-                                    html.Div([
-                                        html.H4("Total Volumes", style={'textAlign': 'center', 'marginBottom': 10}),
-                                        html.H2(
-                                            id='latest-year-volumes',
-                                            children=f"{yearly_df.iloc[-1]['Volumes']:,.0f}",
-                                            style={'textAlign': 'center', 'color': '#28A745'}
-                                        ),
-                                        html.P(
-                                            id='latest-year-volumes-growth',
-                                            children=f"({yearly_df.iloc[-1]['Volumes_Growth']:.1f}% from previous year)"
-                                            if not pd.isna(yearly_df.iloc[-1]['Volumes_Growth']) else "",
-                                            style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
-                                        )
-                                    ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
-                                            'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'}),
+                                        # Volumes Card
+                                        html.Div([
+                                            html.H4("Total Volumes", style={'textAlign': 'center', 'marginBottom': 10}),
+                                            html.H2(
+                                                id='latest-year-volumes',
+                                                children=f"{yearly_df.iloc[-1]['Volumes']:,.0f}",
+                                                style={'textAlign': 'center', 'color': '#28A745'}
+                                            ),
+                                            html.P(
+                                                id='latest-year-volumes-growth',
+                                                children=f"({yearly_df.iloc[-1]['Volumes_Growth']:.1f}% from previous year)"
+                                                if not pd.isna(yearly_df.iloc[-1]['Volumes_Growth']) else "",
+                                                style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
+                                            )
+                                        ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
+                                                'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'}),
                                     
-                                    # Cost Card
-                                    html.Div([
-                                        html.H4("Total Cost", style={'textAlign': 'center', 'marginBottom': 10}),
-                                        html.H2(
-                                            id='latest-year-cost',
-                                            children=f"${yearly_df.iloc[-1]['Cost']:,.0f}",
-                                            style={'textAlign': 'center', 'color': '#DC3545'}
-                                        ),
-                                        html.P(
-                                            id='latest-year-cost-growth',
-                                            children=f"({yearly_df.iloc[-1]['Cost_Growth']:.1f}% from previous year)"
-                                            if not pd.isna(yearly_df.iloc[-1]['Cost_Growth']) else "",
-                                            style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
-                                        )
-                                    ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
-                                            'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'})
-                                ], style={'marginBottom': 20, 'textAlign': 'center', 'width': '100%', 'display': 'flex', 'justifyContent': 'center'}),
+                                        # Cost Card
+                                        html.Div([
+                                            html.H4("Total Cost", style={'textAlign': 'center', 'marginBottom': 10}),
+                                            html.H2(
+                                                id='latest-year-cost',
+                                                children=f"${yearly_df.iloc[-1]['Cost']:,.0f}",
+                                                style={'textAlign': 'center', 'color': '#DC3545'}
+                                            ),
+                                            html.P(
+                                                id='latest-year-cost-growth',
+                                                children=f"({yearly_df.iloc[-1]['Cost_Growth']:.1f}% from previous year)"
+                                                if not pd.isna(yearly_df.iloc[-1]['Cost_Growth']) else "",
+                                                style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
+                                            )
+                                        ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
+                                                'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'})
+                                    ], style={'marginBottom': 20, 'textAlign': 'center', 'width': '100%', 'display': 'flex', 'justifyContent': 'center'}),
                                 
-                                # Row 2: Derived metrics
-                                html.Div([
-                                    # Cost Per Claimant Card
+                                    # Row 2: Derived metrics
                                     html.Div([
-                                        html.H4("Cost Per Claimant", style={'textAlign': 'center', 'marginBottom': 10}),
-                                        html.H2(
-                                            id='latest-year-cost-per-claimant',
-                                            children=f"${yearly_df.iloc[-1]['Cost_Per_Claimant']:,.2f}",
-                                            style={'textAlign': 'center', 'color': '#6610F2'}
-                                        ),
-                                        html.P(
-                                            id='latest-year-cost-per-claimant-growth',
-                                            children=f"({yearly_df.iloc[-1]['Cost_Per_Claimant_Growth']:.1f}% from previous year)"
-                                            if not pd.isna(yearly_df.iloc[-1]['Cost_Per_Claimant_Growth']) else "",
-                                            style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
-                                        )
-                                    ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
-                                            'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'}),
+                                        # Cost Per Claimant Card
+                                        html.Div([
+                                            html.H4("Cost Per Claimant", style={'textAlign': 'center', 'marginBottom': 10}),
+                                            html.H2(
+                                                id='latest-year-cost-per-claimant',
+                                                children=f"${yearly_df.iloc[-1]['Cost_Per_Claimant']:,.2f}",
+                                                style={'textAlign': 'center', 'color': '#6610F2'}
+                                            ),
+                                            html.P(
+                                                id='latest-year-cost-per-claimant-growth',
+                                                children=f"({yearly_df.iloc[-1]['Cost_Per_Claimant_Growth']:.1f}% from previous year)"
+                                                if not pd.isna(yearly_df.iloc[-1]['Cost_Per_Claimant_Growth']) else "",
+                                                style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
+                                            )
+                                        ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
+                                                'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'}),
                                     
-                                    # Cost Per Volume Card
-                                    html.Div([
-                                        html.H4("Cost Per Volume", style={'textAlign': 'center', 'marginBottom': 10}),
-                                        html.H2(
-                                            id='latest-year-cost-per-volume',
-                                            children=f"${yearly_df.iloc[-1]['Cost_Per_Volume']:,.2f}",
-                                            style={'textAlign': 'center', 'color': '#FD7E14'}
-                                        ),
-                                        html.P(
-                                            id='latest-year-cost-per-volume-growth',
-                                            children=f"({yearly_df.iloc[-1]['Cost_Per_Volume_Growth']:.1f}% from previous year)"
-                                            if not pd.isna(yearly_df.iloc[-1]['Cost_Per_Volume_Growth']) else "",
-                                            style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
-                                        )
-                                    ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
-                                            'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'}),
+                                        # Cost Per Volume Card
+                                        html.Div([
+                                            html.H4("Cost Per Volume", style={'textAlign': 'center', 'marginBottom': 10}),
+                                            html.H2(
+                                                id='latest-year-cost-per-volume',
+                                                children=f"${yearly_df.iloc[-1]['Cost_Per_Volume']:,.2f}",
+                                                style={'textAlign': 'center', 'color': '#FD7E14'}
+                                            ),
+                                            html.P(
+                                                id='latest-year-cost-per-volume-growth',
+                                                children=f"({yearly_df.iloc[-1]['Cost_Per_Volume_Growth']:.1f}% from previous year)"
+                                                if not pd.isna(yearly_df.iloc[-1]['Cost_Per_Volume_Growth']) else "",
+                                                style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
+                                            )
+                                        ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
+                                                'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'}),
                                     
-                                    # Claims Per Claimant Card
-                                    html.Div([
-                                        html.H4("Claims Per Claimant", style={'textAlign': 'center', 'marginBottom': 10}),
-                                        html.H2(
-                                            id='latest-year-claims-per-claimant',
-                                            children=f"{yearly_df.iloc[-1]['Claims_Per_Claimant']:,.2f}",
-                                            style={'textAlign': 'center', 'color': '#20C997'}
-                                        ),
-                                        html.P(
-                                            id='latest-year-claims-per-claimant-growth',
-                                            children=f"({yearly_df.iloc[-1]['Claims_Per_Claimant_Growth']:.1f}% from previous year)"
-                                            if not pd.isna(yearly_df.iloc[-1]['Claims_Per_Claimant_Growth']) else "",
-                                            style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
-                                        )
-                                    ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
-                                            'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'})
-                                ], style={'marginBottom': 30, 'textAlign': 'center', 'width': '100%', 'display': 'flex', 'justifyContent': 'center'})
+                                        # Claims Per Claimant Card
+                                        html.Div([
+                                            html.H4("Claims Per Claimant", style={'textAlign': 'center', 'marginBottom': 10}),
+                                            html.H2(
+                                                id='latest-year-claims-per-claimant',
+                                                children=f"{yearly_df.iloc[-1]['Claims_Per_Claimant']:,.2f}",
+                                                style={'textAlign': 'center', 'color': '#20C997'}
+                                            ),
+                                            html.P(
+                                                id='latest-year-claims-per-claimant-growth',
+                                                children=f"({yearly_df.iloc[-1]['Claims_Per_Claimant_Growth']:.1f}% from previous year)"
+                                                if not pd.isna(yearly_df.iloc[-1]['Claims_Per_Claimant_Growth']) else "",
+                                                style={'textAlign': 'center', 'fontSize': '0.9em', 'color': '#666'}
+                                            )
+                                        ], style={'width': '31%', 'display': 'inline-block', 'border': '1px solid #ddd', 
+                                                'borderRadius': '5px', 'padding': '15px', 'margin': '0 1%', 'verticalAlign': 'top'})
+                                    ], style={'marginBottom': 30, 'textAlign': 'center', 'width': '100%', 'display': 'flex', 'justifyContent': 'center'})
+                                ]),
                             ]),
-                        ]),
-                        
-                        html.H3("Annual Trends", style={'textAlign': 'center'}),
-                        html.Div([
-                            html.Label("Select Metrics:"),
-                            dcc.Dropdown(
-                                id='annual-metrics-dropdown',
-                                options=metrics,
-                                value=['Claimants', 'Volumes', 'Cost'],
-                                multi=True
-                            )
-                        ], style={'width': '50%', 'margin': 'auto', 'marginBottom': 20}),
-                        dcc.Graph(id='annual-trends-graph'),
-                        
-                        html.H3("Annual Growth Rates", style={'textAlign': 'center', 'marginTop': 40}),
-                        html.Div([
-                            html.Label("Select Growth Metrics:"),
-                            dcc.Dropdown(
-                                id='growth-metrics-dropdown',
-                                options=growth_metrics,
-                                value=['Claimants_Growth', 'Volumes_Growth', 'Cost_Growth'],
-                                multi=True
-                            )
-                        ], style={'width': '50%', 'margin': 'auto', 'marginBottom': 20}),
-                        dcc.Graph(id='growth-rates-graph')
-                    ])
-                ]),
-                
-                # Tab 2: Generic Name Analysis
-                dcc.Tab(label="Generic Name Analysis", children=[
-                    html.Div([
-                        html.H3("Generic Name Analysis", style={'textAlign': 'center'}),
-                        
-                        # Selection controls
-                        html.Div([
-                            html.Div([
-                                html.Label("Select Year:"),
-                                dcc.Dropdown(
-                                    id='generic-year-dropdown',
-                                    options=[{'label': str(year), 'value': year} for year in yearly_df['Year'].unique()],
-                                    value=yearly_df['Year'].max()
-                                )
-                            ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '5%'}),
-                            html.Div([
-                                html.Label("Compare with Years:"),
-                                dcc.Dropdown(
-                                    id='generic-compare-years-dropdown',
-                                    options=[{'label': str(year), 'value': year} for year in yearly_df['Year'].unique()],
-                                    value=[],
-                                    multi=True
-                                )
-                            ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '5%'}),
-                            html.Div([
-                                html.Label("Select Metric:"),
-                                dcc.Dropdown(
-                                    id='generic-metric-dropdown',
-                                    options=metrics,
-                                    value='Cost'
-                                )
-                            ], style={'width': '30%', 'display': 'inline-block'})
-                        ], style={'marginBottom': 20}),
-                        
-                        # Top 10 Generic Names Graph
-                        html.Div([
-                            html.H4("Top 10 Generic Names by Cost", style={'textAlign': 'center', 'marginBottom': 20}),
-                            dcc.Graph(id='generic-bar-graph')
-                        ], style={'width': '100%', 'marginBottom': 30}),
                         
-                        # Generic Name Table with filtering
-                        html.Div([
-                            html.H4("Generic Name Data Table", style={'textAlign': 'center', 'marginBottom': 10}),
-                            html.P("Filter the table to select specific generic names for analysis.", 
-                                style={'textAlign': 'center', 'marginBottom': 15}),
-                            dash_table.DataTable(
-                                id='generic-table',
-                                columns=[
-                                    {"name": "Generic Name", "id": "Generic_Name"},
-                                    {"name": "Claimants", "id": "Claimants", "type": "numeric", "format": {"specifier": ","}},
-                                    {"name": "Volumes", "id": "Volumes", "type": "numeric", "format": {"specifier": ","}},
-                                    {"name": "Cost ($)", "id": "Cost", "type": "numeric", "format": {"specifier": "$,.2f"}},
-                                    {"name": "Cost Per Claimant ($)", "id": "Cost_Per_Claimant", "type": "numeric", "format": {"specifier": "$,.2f"}},
-                                    {"name": "Cost Per Volume ($)", "id": "Cost_Per_Volume", "type": "numeric", "format": {"specifier": "$,.2f"}},
-                                    {"name": "Claims Per Claimant", "id": "Claims_Per_Claimant", "type": "numeric", "format": {"specifier": ",.2f"}}
-                                ],
-                                data=[], # Will be populated by callback
-                                filter_action="native",
-                                sort_action="native",
-                                sort_mode="multi",
-                                page_size=10,
-                                style_table={'overflowX': 'auto'},
-                                style_cell={
-                                    'textAlign': 'right',
-                                    'padding': '8px',
-                                    'minWidth': '100px'
-                                },
-                                style_header={
-                                    'backgroundColor': 'rgb(230, 230, 230)',
-                                    'fontWeight': 'bold',
-                                    'textAlign': 'center'
-                                },
-                                style_data_conditional=[
-                                    {
-                                        'if': {'column_id': 'Generic_Name'},
-                                        'textAlign': 'left'
-                                    }
-                                ]
-                            )
-                        ], style={'width': '100%', 'marginTop': 30})
-                    ])
-                ]),
-                
-                # Tab 3: Provincial Analysis
-                dcc.Tab(label="Provincial Analysis", children=[
-                    html.Div([
-                        html.H3("Provincial Analysis", style={'textAlign': 'center'}),
-                        html.Div([
+                            html.H3("Annual Trends", style={'textAlign': 'center'}),
                             html.Div([
-                                html.Label("Select Year:"),
+                                html.Label("Select Metrics:"),
                                 dcc.Dropdown(
-                                    id='province-year-dropdown',
-                                    options=[{'label': str(year), 'value': year} for year in yearly_df['Year'].unique()],
-                                    value=yearly_df['Year'].max()
-                                )
-                            ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '5%'}),
-                            html.Div([
-                                html.Label("Select Metric:"),
-                                dcc.Dropdown(
-                                    id='province-metric-dropdown',
+                                    id='annual-metrics-dropdown',
                                     options=metrics,
-                                    value='Cost'
+                                    value=default_annual_metrics,
+                                    multi=True
                                 )
-                            ], style={'width': '30%', 'display': 'inline-block'})
-                        ], style={'marginBottom': 20}),
-                        dcc.Graph(id='province-bar-graph'),
+                            ], style={'width': '50%', 'margin': 'auto', 'marginBottom': 20}),
+                            dcc.Graph(id='annual-trends-graph'),
                         
-                        # Top provinces trend chart
-                        html.H3("Top Provinces Trend", style={'textAlign': 'center', 'marginTop': 20}),
-                        html.P("Showing trend of the selected metric for the top 5 provinces", 
-                            style={'textAlign': 'center', 'marginBottom': 15}),
-                        dcc.Graph(id='top-provinces-trend-graph'),
-                        
-                        # Annual trend by province section
-                        html.H3("Annual Trend by Province", style={'textAlign': 'center', 'marginTop': 40}),
-                        html.Div([
-                            html.Div([
-                                html.Label("Select Province:"),
-                                dcc.Dropdown(
-                                    id='province-trend-dropdown',
-                                    options=[{'label': province, 'value': province} for province in province_df['Province'].unique()],
-                                    value=province_df['Province'].iloc[0]
-                                )
-                            ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '5%'}),
+                            html.H3("Annual Growth Rates", style={'textAlign': 'center', 'marginTop': 40}),
                             html.Div([
-                                html.Label("Select Metric:"),
+                                html.Label("Select Growth Metrics:"),
                                 dcc.Dropdown(
-                                    id='province-trend-metric-dropdown',
-                                    options=metrics,
-                                    value='Cost'
+                                    id='growth-metrics-dropdown',
+                                    options=growth_metrics,
+                                    value=default_growth_metrics,
+                                    multi=True
                                 )
-                            ], style={'width': '30%', 'display': 'inline-block'})
-                        ], style={'marginBottom': 20}),
-                        dcc.Graph(id='province-trend-graph')
-                    ])
-                ]),
+                            ], style={'width': '50%', 'margin': 'auto', 'marginBottom': 20}),
+                            dcc.Graph(id='growth-rates-graph')
+                        ])
+                    ]),
                 
-                # Tab 4: Therapy Class
-                dcc.Tab(label="Therapy Class", children=[
-                    html.Div([
-                        html.H3("Therapy Class Analysis", style={'textAlign': 'center'}),
-                        
-                        # Metric selection dropdown
+                    # Tab 2: Generic Name Analysis
+                    dcc.Tab(label="Generic Name Analysis", children=[
                         html.Div([
-                            html.Label("Select Metric:"),
-                            dcc.Dropdown(
-                                id='therapy-metric-dropdown',
-                                options=metrics,
-                                value='Cost',
-                                clearable=False
-                            )
-                        ], style={'width': '50%', 'margin': 'auto', 'marginBottom': 20}),
+                            html.H3("Generic Name Analysis", style={'textAlign': 'center'}),
                         
-                        # Top 10 Therapy Classes by Cost
-                        html.Div([
-                            html.H4("Top 10 Therapy Classes by Cost", 
-                                    style={'textAlign': 'center', 'marginTop': 30, 'marginBottom': 20}),
+                            # Selection controls
                             html.Div([
                                 html.Div([
                                     html.Label("Select Year:"),
                                     dcc.Dropdown(
-                                        id='therapy-year-dropdown',
+                                        id='generic-year-dropdown',
                                         options=[{'label': str(year), 'value': year} for year in yearly_df['Year'].unique()],
                                         value=yearly_df['Year'].max()
                                     )
@@ -455,63 +378,229 @@ app.layout = html.Div([
                                 html.Div([
                                     html.Label("Compare with Years:"),
                                     dcc.Dropdown(
-                                        id='therapy-compare-years-dropdown',
+                                        id='generic-compare-years-dropdown',
                                         options=[{'label': str(year), 'value': year} for year in yearly_df['Year'].unique()],
                                         value=[],
                                         multi=True
                                     )
-                                ], style={'width': '60%', 'display': 'inline-block'})
+                                ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '5%'}),
+                                html.Div([
+                                    html.Label("Select Metric:"),
+                                    dcc.Dropdown(
+                                        id='generic-metric-dropdown',
+                                        options=metrics,
+                                        value='Cost'
+                                    )
+                                ], style={'width': '30%', 'display': 'inline-block'})
                             ], style={'marginBottom': 20}),
-                            dcc.Graph(id='therapy-top10-graph')
-                        ], style={'marginBottom': 40}),
                         
-                        # Top 10 Therapy Classes Movement Over Years
+                            # Top 10 Generic Names Graph
+                            html.Div([
+                                html.H4("Top 10 Generic Names by Cost", style={'textAlign': 'center', 'marginBottom': 20}),
+                                html.Progress(id='generic-bar-progress', style={'display': 'none'}),
+                                dcc.Graph(id='generic-bar-graph'),
+                                dcc.Store(id='generic-bar-signature')
+                            ], style={'width': '100%', 'marginBottom': 30}),
+                        
+                            # Generic Name Table with filtering
+                            html.Div([
+                                html.H4("Generic Name Data Table", style={'textAlign': 'center', 'marginBottom': 10}),
+                                html.P("Filter the table to select specific generic names for analysis.", 
+                                    style={'textAlign': 'center', 'marginBottom': 15}),
+                                dash_table.DataTable(
+                                    id='generic-table',
+                                    columns=[
+                                        {"name": "Generic Name", "id": "Generic_Name"},
+                                        {"name": "Claimants", "id": "Claimants", "type": "numeric", "format": {"specifier": ","}},
+                                        {"name": "Volumes", "id": "Volumes", "type": "numeric", "format": {"specifier": ","}},
+                                        {"name": "Cost ($)", "id": "Cost", "type": "numeric", "format": {"specifier": "$,.2f"}},
+                                        {"name": "Cost Per Claimant ($)", "id": "Cost_Per_Claimant", "type": "numeric", "format": {"specifier": "$,.2f"}},
+                                        {"name": "Cost Per Volume ($)", "id": "Cost_Per_Volume", "type": "numeric", "format": {"specifier": "$,.2f"}},
+                                        {"name": "Claims Per Claimant", "id": "Claims_Per_Claimant", "type": "numeric", "format": {"specifier": ",.2f"}}
+                                    ],
+                                    data=[], # Will be populated by callback
+                                    filter_action=TABLE_ACTION,
+                                    sort_action=TABLE_ACTION,
+                                    sort_mode="multi",
+                                    page_action=TABLE_ACTION,
+                                    page_current=0,
+                                    page_size=10,
+                                    style_table={'overflowX': 'auto'},
+                                    style_cell={
+                                        'textAlign': 'right',
+                                        'padding': '8px',
+                                        'minWidth': '100px'
+                                    },
+                                    style_header={
+                                        'backgroundColor': 'rgb(230, 230, 230)',
+                                        'fontWeight': 'bold',
+                                        'textAlign': 'center'
+                                    },
+                                    style_data_conditional=[
+                                        {
+                                            'if': {'column_id': 'Generic_Name'},
+                                            'textAlign': 'left'
+                                        }
+                                    ]
+                                ),
+                                html.Div(id='generic-table-count', style={'textAlign': 'right', 'marginTop': 5})
+                            ], style={'width': '100%', 'marginTop': 30})
+                        ])
+                    ]),
+                
+                    # Tab 3: Provincial Analysis
+                    dcc.Tab(label="Provincial Analysis", children=[
                         html.Div([
-                            html.H4("Top 10 Therapy Classes Movement (2018-2024)", 
-                                    style={'textAlign': 'center', 'marginTop': 40, 'marginBottom': 20}),
-                            dcc.Graph(id='therapy-movement-graph')
-                        ]),
+                            html.H3("Provincial Analysis", style={'textAlign': 'center'}),
+                            html.Div([
+                                html.Div([
+                                    html.Label("Select Year:"),
+                                    dcc.Dropdown(
+                                        id='province-year-dropdown',
+                                        options=[{'label': str(year), 'value': year} for year in yearly_df['Year'].unique()],
+                                        value=yearly_df['Year'].max()
+                                    )
+                                ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '5%'}),
+                                html.Div([
+                                    html.Label("Select Metric:"),
+                                    dcc.Dropdown(
+                                        id='province-metric-dropdown',
+                                        options=metrics,
+                                        value='Cost'
+                                    )
+                                ], style={'width': '30%', 'display': 'inline-block'})
+                            ], style={'marginBottom': 20}),
+                            dcc.Graph(id='province-bar-graph'),
+                        
+                            # Top provinces trend chart
+                            html.H3("Top Provinces Trend", style={'textAlign': 'center', 'marginTop': 20}),
+                            html.P("Showing trend of the selected metric for the top 5 provinces", 
+                                style={'textAlign': 'center', 'marginBottom': 15}),
+                            dcc.Graph(id='top-provinces-trend-graph'),
                         
-                        # Therapy Class Ranking Movement Animation
+                            # Annual trend by province section
+                            html.H3("Annual Trend by Province", style={'textAlign': 'center', 'marginTop': 40}),
+                            html.Div([
+                                html.Div([
+                                    html.Label("Select Province:"),
+                                    dcc.Dropdown(
+                                        id='province-trend-dropdown',
+                                        options=[{'label': province, 'value': province} for province in provinces],
+                                        value=provinces[0]
+                                    )
+                                ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '5%'}),
+                                html.Div([
+                                    html.Label("Select Metric:"),
+                                    dcc.Dropdown(
+                                        id='province-trend-metric-dropdown',
+                                        options=metrics,
+                                        value='Cost'
+                                    )
+                                ], style={'width': '30%', 'display': 'inline-block'})
+                            ], style={'marginBottom': 20}),
+                            dcc.Graph(id='province-trend-graph')
+                        ])
+                    ]),
+                
+                    # Tab 4: Therapy Class
+                    dcc.Tab(label="Therapy Class", children=[
                         html.Div([
-                            html.H4("Therapy Class Ranking Movement (2018-2024)", 
-                                    style={'textAlign': 'center', 'marginTop': 40, 'marginBottom': 20}),
+                            html.H3("Therapy Class Analysis", style={'textAlign': 'center'}),
+                        
+                            # Metric selection dropdown
+                            html.Div([
+                                html.Label("Select Metric:"),
+                                dcc.Dropdown(
+                                    id='therapy-metric-dropdown',
+                                    options=metrics,
+                                    value='Cost',
+                                    clearable=False
+                                )
+                            ], style={'width': '50%', 'margin': 'auto', 'marginBottom': 20}),
+                        
+                            # Top 10 Therapy Classes by Cost
+                            html.Div([
+                                html.H4("Top 10 Therapy Classes by Cost", 
+                                        style={'textAlign': 'center', 'marginTop': 30, 'marginBottom': 20}),
+                                html.Div([
+                                    html.Div([
+                                        html.Label("Select Year:"),
+                                        dcc.Dropdown(
+                                            id='therapy-year-dropdown',
+                                            options=[{'label': str(year), 'value': year} for year in yearly_df['Year'].unique()],
+                                            value=yearly_df['Year'].max()
+                                        )
+                                    ], style={'width': '30%', 'display': 'inline-block', 'marginRight': '5%'}),
+                                    html.Div([
+                                        html.Label("Compare with Years:"),
+                                        dcc.Dropdown(
+                                            id='therapy-compare-years-dropdown',
+                                            options=[{'label': str(year), 'value': year} for year in yearly_df['Year'].unique()],
+                                            value=[],
+                                            multi=True
+                                        )
+                                    ], style={'width': '60%', 'display': 'inline-block'})
+                                ], style={'marginBottom': 20}),
+                                dcc.Graph(id='therapy-top10-graph'),
+                                dcc.Store(id='therapy-top10-signature')
+                            ], style={'marginBottom': 40}),
+                        
+                            # Top 10 Therapy Classes Movement Over Years
                             html.Div([
-                                html.Button(
-                                    "Play Animation", 
-                                    id="play-animation-button",
-                                    style={
-                                        'backgroundColor': '#007BFF',
-                                        'color': 'white',
-                                        'border': 'none',
-                                        'padding': '10px 20px',
-                                        'borderRadius': '5px',
-                                        'cursor': 'pointer',
-                                        'marginBottom': '20px'
-                                    }
+                                html.H4(f"Top 10 Therapy Classes Movement ({year_span})",
+                                        style={'textAlign': 'center', 'marginTop': 40, 'marginBottom': 20}),
+                                html.Progress(id='therapy-movement-progress', style={'display': 'none'}),
+                                dcc.Graph(id='therapy-movement-graph'),
+                                dcc.Store(id='therapy-movement-signature')
+                            ]),
+                        
+                            # Therapy Class Ranking Movement Animation
+                            html.Div([
+                                html.H4(f"Therapy Class Ranking Movement ({year_span})",
+                                        style={'textAlign': 'center', 'marginTop': 40, 'marginBottom': 20}),
+                                html.Div([
+                                    html.Button(
+                                        "Play Animation", 
+                                        id="play-animation-button",
+                                        style={
+                                            'backgroundColor': '#007BFF',
+                                            'color': 'white',
+                                            'border': 'none',
+                                            'padding': '10px 20px',
+                                            'borderRadius': '5px',
+                                            'cursor': 'pointer',
+                                            'marginBottom': '20px'
+                                        }
+                                    ),
+                                    html.Div(id='animation-year-display', style={
+                                        'fontSize': '18px',
+                                        'fontWeight': 'bold',
+                                        'margin': '10px 0'
+                                    })
+                                # The animated figure brings its own play button and slider
+                                ], style={'textAlign': 'center', 'display': 'none' if RANKING_FRAMES else 'block'}),
+                                dcc.Graph(id='therapy-ranking-graph'),
+                                # Ticks are handled in the browser (see the clientside callbacks)
+                                dcc.Interval(
+                                    id='animation-interval',
+                                    interval=1000,  # in milliseconds (1 second)
+                                    n_intervals=0,
+                                    disabled=True
                                 ),
-                                html.Div(id='animation-year-display', style={
-                                    'fontSize': '18px',
-                                    'fontWeight': 'bold',
-                                    'margin': '10px 0'
-                                })
-                            ], style={'textAlign': 'center'}),
-                            dcc.Graph(id='therapy-ranking-graph'),
-                            dcc.Interval(
-                                id='animation-interval',
-                                interval=1000,  # in milliseconds (1 second)
-                                n_intervals=0,
-                                disabled=True
-                            ),
-                            # Hidden div to store animation state
-                            html.Div(id='animation-state', style={'display': 'none'})
+                                # Play state and the per-year ranking figures, kept client-side
+                                dcc.Store(id='animation-state', data='stopped'),
+                                dcc.Store(id='ranking-frames'),
+                                dcc.Store(id='ranking-signature')
+                            ])
                         ])
                     ])
                 ])
-            ])
-        ], style={'width': '75%', 'float': 'left'})
-    ], style={'display': 'flex', 'flexWrap': 'wrap', 'width': '100%'})
-])
+            ], style={'width': '75%', 'float': 'left'})
+        ], style={'display': 'flex', 'flexWrap': 'wrap', 'width': '100%'})
+    ])
+
+app.layout = serve_layout
+startup.mark('layout')
 
 # Callbacks for insurer selection
 @app.callback(
@@ -532,13 +621,15 @@ def update_insurer_selection(bob_toggle):
      Input('bob-toggle', 'value'),
      Input('insurer-dropdown', 'value')]
 )
+@cached_figure
 def update_annual_trends(selected_metrics, bob_toggle, selected_insurer):
     if not selected_metrics:
         return go.Figure()
     
     # Filter data based on selected insurer
     insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    filtered_df = yearly_df[yearly_df['Insurer'] == insurer_value].sort_values('Year')
+    context = datastore.current().context(insurer_value)
+    filtered_df = context.rows('yearly')
     
     if filtered_df.empty:
         return go.Figure()
@@ -582,13 +673,15 @@ def update_annual_trends(selected_metrics, bob_toggle, selected_insurer):
      Input('bob-toggle', 'value'),
      Input('insurer-dropdown', 'value')]
 )
+@cached_figure
 def update_growth_rates(selected_metrics, bob_toggle, selected_insurer):
     if not selected_metrics:
         return go.Figure()
     
     # Filter data based on selected insurer
     insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    filtered_df = yearly_df[yearly_df['Insurer'] == insurer_value].sort_values('Year')
+    context = datastore.current().context(insurer_value)
+    filtered_df = context.rows('yearly')
     
     if filtered_df.empty or len(filtered_df) <= 1:
         return go.Figure()
@@ -621,17 +714,21 @@ def update_growth_rates(selected_metrics, bob_toggle, selected_insurer):
      Input('bob-toggle', 'value'),
      Input('insurer-dropdown', 'value')]
 )
+@cached_figure
 def update_province_bar(selected_year, selected_metric, bob_toggle, selected_insurer):
     # Filter data based on selected insurer and year
     insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    filtered_df = province_df[(province_df['Year'] == selected_year) & 
-                             (province_df['Insurer'] == insurer_value)]
+    context = datastore.current().context(insurer_value)
+    filtered_df = context.year_rows('province', selected_year)
     
     if filtered_df.empty:
         return go.Figure()
     
     filtered_df = filtered_df.sort_values(by=selected_metric, ascending=False)
     
+    # Imported on first use: plotly.express adds ~60 ms to every worker's boot
+    import plotly.express as px
+
     insurer_label = "BOB" if bob_toggle == 'BOB' else f"Insurer {selected_insurer}"
     fig = px.bar(
         filtered_df,
@@ -660,20 +757,21 @@ def update_province_bar(selected_year, selected_metric, bob_toggle, selected_ins
      Input('bob-toggle', 'value'),
      Input('insurer-dropdown', 'value')]
 )
+@cached_figure
 def update_top_provinces_trend(selected_metric, bob_toggle, selected_insurer):
     # Filter data based on selected insurer
     insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    insurer_data = province_df[province_df['Insurer'] == insurer_value]
+    context = datastore.current().context(insurer_value)
+    insurer_data = context.rows('province')
     
     if insurer_data.empty:
         return go.Figure()
     
-    latest_year = insurer_data['Year'].max()
-    latest_data = insurer_data[insurer_data['Year'] == latest_year]
-    
-    top_provinces = latest_data.sort_values(by=selected_metric, ascending=False).head(5)['Province'].tolist()
+    latest_year = context.latest_year('province')
+    top_provinces = context.top('province', latest_year, selected_metric, 5)['Province'].tolist()
     top_provinces_data = insurer_data[insurer_data['Province'].isin(top_provinces)]
-    
+    import plotly.express as px
+
     insurer_label = "BOB" if bob_toggle == 'BOB' else f"Insurer {selected_insurer}"
     fig = px.line(
         top_provinces_data,
@@ -703,20 +801,21 @@ def update_top_provinces_trend(selected_metric, bob_toggle, selected_insurer):
      Input('bob-toggle', 'value'),
      Input('insurer-dropdown', 'value')]
 )
+@cached_figure
 def update_province_trend(selected_province, selected_metric, bob_toggle, selected_insurer):
     if not selected_province:
         return go.Figure()
     
     # Filter data based on selected insurer and province
     insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    filtered_df = province_df[(province_df['Province'] == selected_province) & 
-                             (province_df['Insurer'] == insurer_value)].sort_values(by='Year')
+    context = datastore.current().context(insurer_value)
+    filtered_df = context.series('province', selected_province)
     
     if filtered_df.empty:
         return go.Figure()
     
     # Get overall average for the selected insurer
-    insurer_yearly = yearly_df[yearly_df['Insurer'] == insurer_value].sort_values('Year')
+    insurer_yearly = context.rows('yearly')
     
     fig = go.Figure()
     
@@ -738,24 +837,9 @@ def update_province_trend(selected_province, selected_metric, bob_toggle, select
         marker=dict(size=6)
     ))
     
-    filtered_df['Growth'] = filtered_df[selected_metric].pct_change() * 100
-    
-    for i in range(1, len(filtered_df)):
-        growth = filtered_df['Growth'].iloc[i]
-        if not pd.isna(growth):
-            fig.add_annotation(
-                x=filtered_df['Year'].iloc[i],
-                y=filtered_df[selected_metric].iloc[i],
-                text=f"{growth:.1f}%",
-                showarrow=True,
-                arrowhead=4,
-                arrowsize=1,
-                arrowwidth=1,
-                arrowcolor="#636363",
-                ax=0,
-                ay=-30,
-                font=dict(size=10)
-            )
+    # Year-over-year growth above each point
+    figures.add_annotations(fig, figures.growth_annotations(
+        filtered_df['Year'], filtered_df[selected_metric], filtered_df[f'{selected_metric}_Growth']))
     
     insurer_label = "BOB" if bob_toggle == 'BOB' else f"Insurer {selected_insurer}"
     fig.update_layout(
@@ -770,316 +854,189 @@ def update_province_trend(selected_province, selected_metric, bob_toggle, select
     return fig
 
 # Callback for generic table
-@app.callback(
-    Output('generic-table', 'data'),
-    [Input('generic-year-dropdown', 'value'),
-     Input('bob-toggle', 'value'),
-     Input('insurer-dropdown', 'value')]
-)
-def update_generic_table(selected_year, bob_toggle, selected_insurer):
-    # Filter data based on selected insurer and year
-    insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    filtered_df = generic_df[(generic_df['Year'] == selected_year) & 
-                            (generic_df['Insurer'] == insurer_value)]
-    
-    return filtered_df.to_dict('records')
+if TABLE_PAGING:
+    @app.callback(
+        [Output('generic-table', 'data'),
+         Output('generic-table', 'page_count'),
+         Output('generic-table', 'page_current'),
+         Output('generic-table-count', 'children')],
+        [Input('generic-year-dropdown', 'value'),
+         Input('bob-toggle', 'value'),
+         Input('insurer-dropdown', 'value'),
+         Input('generic-table', 'page_current'),
+         Input('generic-table', 'page_size'),
+         Input('generic-table', 'sort_by'),
+         Input('generic-table', 'filter_query')],
+        [State('generic-table', 'columns')]
+    )
+    def update_generic_table(selected_year, bob_toggle, selected_insurer,
+                             page_current, page_size, sort_by, filter_query, columns):
+        # Filter data based on selected insurer and year
+        insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
+        context = datastore.current().context(insurer_value)
+        filtered_df = context.year_rows('generic', selected_year)
+        
+        # Only the visible page, and only the columns the table shows
+        page, total, page_current = table_query.query_page(
+            filtered_df, filter_query, sort_by, page_current, page_size)
+        table_columns = [column['id'] for column in columns]
+        return (page[table_columns].to_dict('records'), table_query.page_count(total, page_size),
+                page_current, f"{total:,} generic names")
+else:
+    @app.callback(
+        Output('generic-table', 'data'),
+        [Input('generic-year-dropdown', 'value'),
+         Input('bob-toggle', 'value'),
+         Input('insurer-dropdown', 'value')]
+    )
+    def update_generic_table(selected_year, bob_toggle, selected_insurer):
+        # Filter data based on selected insurer and year
+        insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
+        context = datastore.current().context(insurer_value)
+        filtered_df = context.year_rows('generic', selected_year)
+        
+        # Growth and rank columns are not shown in the table, so don't send them
+        table_columns = [column for column in filtered_df.columns if not column.endswith(('_Growth', '_Rank'))]
+        return filtered_df[table_columns].to_dict('records')
 
 # Callback for generic name bar graph with insurer filtering
-@app.callback(
-    Output('generic-bar-graph', 'figure'),
-    [Input('generic-year-dropdown', 'value'),
-     Input('generic-metric-dropdown', 'value'),
-     Input('generic-compare-years-dropdown', 'value'),
-     Input('bob-toggle', 'value'),
-     Input('insurer-dropdown', 'value')]
-)
-def update_generic_bar(selected_year, selected_metric, compare_years, bob_toggle, selected_insurer):
+@cached_figure
+def generic_bar_figure(selected_year, selected_metric, compare_years, bob_toggle, selected_insurer):
     # Filter data based on selected insurer and year
     insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    filtered_df = generic_df[(generic_df['Year'] == selected_year) & 
-                            (generic_df['Insurer'] == insurer_value)]
+    context = datastore.current().context(insurer_value)
+    filtered_df = context.year_rows('generic', selected_year)
     
     if filtered_df.empty:
         return go.Figure()
     
-    # Sort by cost and get top 10
-    top_10_by_cost = filtered_df.sort_values(by='Cost', ascending=False).head(10)
+    # Top 10 by cost from the ranking store
+    top_10_by_cost = context.top('generic', selected_year, 'Cost', 10)
     
     # Calculate percentage of total cost
     total_cost = filtered_df['Cost'].sum()
     top_10_by_cost['Percent_of_Total'] = (top_10_by_cost['Cost'] / total_cost) * 100
     
-    # Get the generic names to use for comparison
-    top_10_names = top_10_by_cost['Generic_Name'].tolist()
-    
     # Sort by the selected metric for display
     top_10_by_cost = top_10_by_cost.sort_values(by=selected_metric, ascending=True)
     
-    # Create figure with two y-axes
-    fig = go.Figure()
-    
-    # Add bars for the selected year
-    fig.add_trace(go.Bar(
-        y=top_10_by_cost['Generic_Name'],
-        x=top_10_by_cost[selected_metric],
-        orientation='h',
-        name=f"{selected_year}",
-        marker=dict(color='#007BFF'),
-        text=top_10_by_cost[selected_metric].apply(lambda x: f"{x:,.0f}" if selected_metric not in ['Cost_Per_Claimant', 'Cost_Per_Volume'] else f"${x:,.2f}"),
-        textposition='outside',
-        hoverinfo='text',
-        hovertext=[
-            f"{row['Generic_Name']}<br>"
-            f"{selected_year}: {row[selected_metric]:,.2f}<br>"
-            f"% of Total Cost: {row['Percent_of_Total']:.1f}%"
-            for _, row in top_10_by_cost.iterrows()
-        ]
-    ))
-    
-    # Add comparison years if selected
-    colors = ['#28A745', '#FD7E14', '#6610F2', '#20C997']
+    # Comparison years, aligned with the selected year's top 10
+    comparisons = []
     for i, year in enumerate(compare_years):
+        checkpoint()
         if year != selected_year:  # Skip if it's the same as the selected year
-            year_data = generic_df[(generic_df['Year'] == year) & 
-                                  (generic_df['Insurer'] == insurer_value)]
-            
-            # Filter for the top 10 names from the selected year
-            year_data = year_data[year_data['Generic_Name'].isin(top_10_names)]
-            
+            year_data = context.year_rows('generic', year)
+            year_data = year_data[year_data['Generic_Name'].isin(top_10_by_cost['Generic_Name'])]
             if not year_data.empty:
-                # Sort to match the order of the selected year
                 year_data = year_data.set_index('Generic_Name').reindex(top_10_by_cost['Generic_Name']).reset_index()
-                
-                # Add bars for this comparison year
-                fig.add_trace(go.Bar(
-                    y=year_data['Generic_Name'],
-                    x=year_data[selected_metric],
-                    orientation='h',
-                    name=f"{year}",
-                    marker=dict(color=colors[i % len(colors)]),
-                    opacity=0.7,
-                    hoverinfo='text',
-                    hovertext=[
-                        f"{row['Generic_Name']}<br>"
-                        f"{year}: {row[selected_metric]:,.2f}"
-                        for _, row in year_data.iterrows()
-                    ]
-                ))
-    
-    # Always add markers for percentage of total cost
-    fig.add_trace(go.Scatter(
-        y=top_10_by_cost['Generic_Name'],
-        x=top_10_by_cost['Percent_of_Total'],
-        mode='markers+text',
-        name='% of Total Cost',
-        marker=dict(
-            symbol='circle',
-            size=12,
-            color='#DC3545'
-        ),
-        text=top_10_by_cost['Percent_of_Total'].apply(lambda x: f"{x:.1f}%"),
-        textposition='middle right',
-        xaxis='x2'
-    ))
+                comparisons.append((i, year, year_data))
     
-    # Update layout with secondary x-axis
     insurer_label = "BOB" if bob_toggle == 'BOB' else f"Insurer {selected_insurer}"
-    fig.update_layout(
-        xaxis2=dict(
-            title='% of Total Cost',
-            overlaying='x',
-            side='top',
-            range=[0, max(top_10_by_cost['Percent_of_Total']) * 1.2],
-            showgrid=False
-        ),
+    return figures.top_cost_bar(
+        top_10_by_cost, comparisons, 'Generic_Name', selected_metric, selected_year, compare_years,
         title=f'Top 10 Generic Names by Cost - {selected_metric.replace("_", " ")} ({selected_year}) - {insurer_label}',
-        xaxis=dict(
-            title=selected_metric.replace('_', ' '),
-            showgrid=True
-        ),
-        yaxis=dict(
-            title='Generic Name',
-            categoryorder='array',
-            categoryarray=top_10_by_cost['Generic_Name'].tolist()
-        ),
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='right',
-            x=1
-        ),
-        margin=dict(l=20, r=20, t=80, b=20),
-        height=600,
-        barmode='group' if compare_years else 'relative'
+        axis_title='Generic Name'
     )
-    
-    return fig
 
-# Callback for therapy top 10 graph
-@app.callback(
-    Output('therapy-top10-graph', 'figure'),
-    [Input('therapy-metric-dropdown', 'value'),
-     Input('therapy-year-dropdown', 'value'),
-     Input('therapy-compare-years-dropdown', 'value'),
+# A background job with TREND_BACKGROUND_JOBS=1 (several compare years on a large dataset take seconds)
+@background_callback(
+    [Output('generic-bar-graph', 'figure'),
+     Output('generic-bar-signature', 'data')],
+    [Input('generic-year-dropdown', 'value'),
+     Input('generic-metric-dropdown', 'value'),
+     Input('generic-compare-years-dropdown', 'value'),
      Input('bob-toggle', 'value'),
-     Input('insurer-dropdown', 'value')]
+     Input('insurer-dropdown', 'value')],
+    [State('generic-bar-signature', 'data')],
+    progress=[Output('generic-bar-progress', 'value'),
+              Output('generic-bar-progress', 'max')],
+    running=[(Output('generic-bar-progress', 'style'), {'width': '100%'}, {'display': 'none'})]
 )
-def update_therapy_top10(selected_metric, selected_year, compare_years, bob_toggle, selected_insurer):
+def update_generic_bar(set_progress, selected_year, selected_metric, compare_years, bob_toggle, selected_insurer, signature):
+    insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
+    # Steps: load the generic data, build the figure, diff it against the browser's
+    set_progress((0, 3))
+    datastore.current().context(insurer_value).rows('generic')
+    set_progress((1, 3))
+    figure = generic_bar_figure(selected_year, selected_metric, compare_years, bob_toggle, selected_insurer)
+    set_progress((2, 3))
+    # Metric and year changes keep the chart's shape; send just the new traces and titles
+    return send_figure(figure, signature)
+
+# Callback for therapy top 10 graph
+@cached_figure
+def therapy_top10_figure(selected_metric, selected_year, compare_years, bob_toggle, selected_insurer):
     # Filter data based on selected insurer and year
     insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    selected_data = therapy_df[(therapy_df['Year'] == selected_year) & 
-                              (therapy_df['Insurer'] == insurer_value)]
+    context = datastore.current().context(insurer_value)
+    selected_data = context.year_rows('therapy', selected_year)
     
     if selected_data.empty:
         return go.Figure()
     
-    # Sort by cost and get top 10
-    top_10_by_cost = selected_data.sort_values(by='Cost', ascending=False).head(10)
+    # Top 10 by cost from the ranking store
+    top_10_by_cost = context.top('therapy', selected_year, 'Cost', 10)
     
     # Calculate percentage of total cost
     total_cost = selected_data['Cost'].sum()
     top_10_by_cost['Percent_of_Total'] = (top_10_by_cost['Cost'] / total_cost) * 100
     
-    # Get the therapy classes to use for comparison
-    top_10_classes = top_10_by_cost['Therapy_Class'].tolist()
-    
     # Sort by the selected metric for display
     top_10_by_cost = top_10_by_cost.sort_values(by=selected_metric, ascending=True)
     
-    # Create figure with two y-axes
-    fig = go.Figure()
-    
-    # Add bars for the selected year
-    fig.add_trace(go.Bar(
-        y=top_10_by_cost['Therapy_Class'],
-        x=top_10_by_cost[selected_metric],
-        orientation='h',
-        name=f"{selected_year}",
-        marker=dict(color='#007BFF'),
-        text=top_10_by_cost[selected_metric].apply(lambda x: f"{x:,.0f}" if selected_metric not in ['Cost_Per_Claimant', 'Cost_Per_Volume'] else f"${x:,.2f}"),
-        textposition='outside',
-        hoverinfo='text',
-        hovertext=[
-            f"{row['Therapy_Class']}<br>"
-            f"{selected_year}: {row[selected_metric]:,.2f}<br>"
-            f"% of Total Cost: {row['Percent_of_Total']:.1f}%"
-            for _, row in top_10_by_cost.iterrows()
-        ]
-    ))
-    
-    # Add comparison years if selected
-    colors = ['#28A745', '#FD7E14', '#6610F2', '#20C997']
+    # Comparison years, aligned with the selected year's top 10
+    comparisons = []
     for i, year in enumerate(compare_years):
         if year != selected_year:  # Skip if it's the same as the selected year
-            year_data = therapy_df[(therapy_df['Year'] == year) & 
-                                  (therapy_df['Insurer'] == insurer_value)]
-            
-            # Filter for the top 10 classes from the selected year
-            year_data = year_data[year_data['Therapy_Class'].isin(top_10_classes)]
-            
+            year_data = context.year_rows('therapy', year)
+            year_data = year_data[year_data['Therapy_Class'].isin(top_10_by_cost['Therapy_Class'])]
             if not year_data.empty:
-                # Sort to match the order of the selected year
                 year_data = year_data.set_index('Therapy_Class').reindex(top_10_by_cost['Therapy_Class']).reset_index()
-                
-                # Add bars for this comparison year
-                fig.add_trace(go.Bar(
-                    y=year_data['Therapy_Class'],
-                    x=year_data[selected_metric],
-                    orientation='h',
-                    name=f"{year}",
-                    marker=dict(color=colors[i % len(colors)]),
-                    opacity=0.7,
-                    hoverinfo='text',
-                    hovertext=[
-                        f"{row['Therapy_Class']}<br>"
-                        f"{year}: {row[selected_metric]:,.2f}"
-                        for _, row in year_data.iterrows()
-                    ]
-                ))
-    
-    # Always add markers for percentage of total cost
-    fig.add_trace(go.Scatter(
-        y=top_10_by_cost['Therapy_Class'],
-        x=top_10_by_cost['Percent_of_Total'],
-        mode='markers+text',
-        name='% of Total Cost',
-        marker=dict(
-            symbol='circle',
-            size=12,
-            color='#DC3545'
-        ),
-        text=top_10_by_cost['Percent_of_Total'].apply(lambda x: f"{x:.1f}%"),
-        textposition='middle right',
-        xaxis='x2'
-    ))
+                comparisons.append((i, year, year_data))
     
-    # Update layout with secondary x-axis
     insurer_label = "BOB" if bob_toggle == 'BOB' else f"Insurer {selected_insurer}"
-    fig.update_layout(
-        xaxis2=dict(
-            title='% of Total Cost',
-            overlaying='x',
-            side='top',
-            range=[0, max(top_10_by_cost['Percent_of_Total']) * 1.2],
-            showgrid=False
-        ),
+    return figures.top_cost_bar(
+        top_10_by_cost, comparisons, 'Therapy_Class', selected_metric, selected_year, compare_years,
         title=f'Top 10 Therapy Classes by Cost - {selected_metric.replace("_", " ")} ({selected_year}) - {insurer_label}',
-        xaxis=dict(
-            title=selected_metric.replace('_', ' '),
-            showgrid=True
-        ),
-        yaxis=dict(
-            title='Therapy Class',
-            categoryorder='array',
-            categoryarray=top_10_by_cost['Therapy_Class'].tolist()
-        ),
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            y=1.02,
-            xanchor='right',
-            x=1
-        ),
-        margin=dict(l=20, r=20, t=80, b=20),
-        height=600,
-        barmode='group' if compare_years else 'relative'
+        axis_title='Therapy Class'
     )
-    
-    return fig
 
-# Callback for therapy movement graph with insurer filtering
 @app.callback(
-    Output('therapy-movement-graph', 'figure'),
+    [Output('therapy-top10-graph', 'figure'),
+     Output('therapy-top10-signature', 'data')],
     [Input('therapy-metric-dropdown', 'value'),
      Input('therapy-year-dropdown', 'value'),
+     Input('therapy-compare-years-dropdown', 'value'),
      Input('bob-toggle', 'value'),
-     Input('insurer-dropdown', 'value')]
+     Input('insurer-dropdown', 'value')],
+    [State('therapy-top10-signature', 'data')]
 )
-def update_therapy_movement(selected_metric, selected_year, bob_toggle, selected_insurer):
+def update_therapy_top10(selected_metric, selected_year, compare_years, bob_toggle, selected_insurer, signature):
+    # Metric and year changes keep the chart's shape; send just the new traces and titles
+    return send_figure(therapy_top10_figure(selected_metric, selected_year, compare_years, bob_toggle, selected_insurer), signature)
+
+# Callback for therapy movement graph with insurer filtering
+@cached_figure
+def therapy_movement_figure(selected_metric, selected_year, bob_toggle, selected_insurer):
     # Filter data based on selected insurer
     insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
+    context = datastore.current().context(insurer_value)
     
-    # Get data for the selected year and insurer
-    selected_data = therapy_df[(therapy_df['Year'] == selected_year) & 
-                              (therapy_df['Insurer'] == insurer_value)]
+    # Get top 10 therapy classes by cost in the selected year
+    top_10 = context.top('therapy', selected_year, 'Cost', 10)
     
-    if selected_data.empty:
+    if top_10.empty:
         return go.Figure()
     
-    # Get top 10 therapy classes by cost in the selected year
-    top_10_classes = selected_data.sort_values(by='Cost', ascending=False).head(10)['Therapy_Class'].tolist()
-    
-    # Filter data for these top 10 classes across all years for the selected insurer
-    filtered_df = therapy_df[(therapy_df['Therapy_Class'].isin(top_10_classes)) & 
-                            (therapy_df['Insurer'] == insurer_value)]
+    top_10_classes = top_10['Therapy_Class'].tolist()
     
     # Create a figure
     fig = go.Figure()
     
-    # Add a line for each therapy class
+    # Add a line for each therapy class, across all years for the selected insurer
     for therapy_class in top_10_classes:
-        class_data = filtered_df[filtered_df['Therapy_Class'] == therapy_class].sort_values(by='Year')
+        checkpoint()
+        class_data = context.series('therapy', therapy_class)
         
         if not class_data.empty:
             fig.add_trace(go.Scatter(
@@ -1098,13 +1055,14 @@ def update_therapy_movement(selected_metric, selected_year, bob_toggle, selected
     
     # Update layout
     insurer_label = "BOB" if bob_toggle == 'BOB' else f"Insurer {selected_insurer}"
+    years = context.years('therapy')
     fig.update_layout(
-        title=f'Movement of Top 10 Therapy Classes (2018-2024) - {selected_metric.replace("_", " ")} - {insurer_label}',
+        title=f'Movement of Top 10 Therapy Classes ({years[0]}-{years[-1]}) - {selected_metric.replace("_", " ")} - {insurer_label}',
         xaxis=dict(
             title='Year',
             tickmode='array',
-            tickvals=list(range(2018, 2025)),
-            ticktext=[str(year) for year in range(2018, 2025)]
+            tickvals=years,
+            ticktext=[str(year) for year in years]
         ),
         yaxis=dict(
             title=selected_metric.replace('_', ' '),
@@ -1124,6 +1082,30 @@ def update_therapy_movement(selected_metric, selected_year, bob_toggle, selected
     
     return fig
 
+# A background job with TREND_BACKGROUND_JOBS=1
+@background_callback(
+    [Output('therapy-movement-graph', 'figure'),
+     Output('therapy-movement-signature', 'data')],
+    [Input('therapy-metric-dropdown', 'value'),
+     Input('therapy-year-dropdown', 'value'),
+     Input('bob-toggle', 'value'),
+     Input('insurer-dropdown', 'value')],
+    [State('therapy-movement-signature', 'data')],
+    progress=[Output('therapy-movement-progress', 'value'),
+              Output('therapy-movement-progress', 'max')],
+    running=[(Output('therapy-movement-progress', 'style'), {'width': '100%'}, {'display': 'none'})]
+)
+def update_therapy_movement(set_progress, selected_metric, selected_year, bob_toggle, selected_insurer, signature):
+    insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
+    # Steps: load the therapy data, build the figure, diff it against the browser's
+    set_progress((0, 3))
+    datastore.current().context(insurer_value).rows('therapy')
+    set_progress((1, 3))
+    figure = therapy_movement_figure(selected_metric, selected_year, bob_toggle, selected_insurer)
+    set_progress((2, 3))
+    # Metric and year changes keep the chart's shape; send just the new traces and titles
+    return send_figure(figure, signature)
+
 # Callback to update the latest year summary cards based on insurer selection
 @app.callback(
     [Output('latest-year-claimants', 'children'),
@@ -1144,7 +1126,8 @@ def update_therapy_movement(selected_metric, selected_year, bob_toggle, selected
 def update_latest_year_summary(bob_toggle, selected_insurer):
     # Filter data based on selected insurer
     insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    filtered_df = yearly_df[yearly_df['Insurer'] == insurer_value].sort_values('Year')
+    context = datastore.current().context(insurer_value)
+    filtered_df = context.rows('yearly')
     
     if filtered_df.empty:
         # Return empty values if no data
@@ -1176,163 +1159,213 @@ def update_latest_year_summary(bob_toggle, selected_insurer):
         cost_per_claimant_growth, cost_per_volume_growth, claims_per_claimant_growth
     ]
 
-# Callback to toggle animation interval
-@app.callback(
+# Play/pause and the year ticks run in the browser, so a playing animation
+# sends no requests; the server only builds the frames when the selection changes
+app.clientside_callback(
+    """
+    function(n_clicks, current_state) {
+        if (!n_clicks) {
+            // Initial state: animation is disabled
+            return [true, 'stopped'];
+        }
+        return current_state === 'playing' ? [true, 'stopped'] : [false, 'playing'];
+    }
+    """,
     [Output('animation-interval', 'disabled'),
-     Output('animation-state', 'children')],
+     Output('animation-state', 'data')],
     [Input('play-animation-button', 'n_clicks')],
-    [State('animation-state', 'children')]
+    [State('animation-state', 'data')]
 )
-def toggle_animation(n_clicks, current_state):
-    if n_clicks is None:
-        # Initial state: animation is disabled
-        return True, "stopped"
-    
-    # Toggle the animation state
-    if current_state == "stopped" or current_state is None:
-        return False, "playing"
-    else:
-        return True, "stopped"
 
-# Callback to update the year display during animation
-@app.callback(
-    Output('animation-year-display', 'children'),
-    [Input('animation-interval', 'n_intervals')],
-    [State('animation-state', 'children')]
-)
-def update_year_display(n_intervals, animation_state):
-    if animation_state != "playing":
-        return "Year: 2018"
-    
-    # Calculate which year to show based on the interval count
-    years = list(range(2018, 2025))
-    year_index = n_intervals % len(years)
-    return f"Year: {years[year_index]}"
+if not RANKING_FRAMES:
+    app.clientside_callback(
+        """
+        function(n_intervals, frames, animation_state) {
+            if (!frames || !frames.years.length) {
+                return ['', {}];
+            }
+            // Show the first year unless the animation is playing
+            const index = animation_state === 'playing' ? n_intervals % frames.years.length : 0;
+            return ['Year: ' + frames.years[index], frames.figures[index]];
+        }
+        """,
+        [Output('animation-year-display', 'children'),
+         Output('therapy-ranking-graph', 'figure')],
+        [Input('animation-interval', 'n_intervals'),
+         Input('ranking-frames', 'data')],
+        [State('animation-state', 'data')]
+    )
 
-# Callback for therapy ranking graph with animation and insurer filtering
-@app.callback(
-    Output('therapy-ranking-graph', 'figure'),
-    [Input('animation-interval', 'n_intervals'),
-     Input('therapy-metric-dropdown', 'value'),
-     Input('bob-toggle', 'value'),
-     Input('insurer-dropdown', 'value')],
-    [State('animation-state', 'children')]
-)
-def update_therapy_ranking(n_intervals, selected_metric, bob_toggle, selected_insurer, animation_state):
-    # Filter data based on selected insurer
-    insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
-    
-    # Get all years from 2018 to 2024
-    years = list(range(2018, 2025))
-    
-    # Determine which year to display
-    if animation_state == "playing":
-        display_year = years[n_intervals % len(years)]
-    else:
-        # Default to the first year when not animating
-        display_year = years[0]
+def therapy_ranking_figure(context, insurer_label, selected_metric, display_year, prev_year=None):
+    # Get top 15 classes by the selected metric for better visibility
+    top_classes = context.top('therapy', display_year, selected_metric, 15)
     
-    # Get data for the current year and insurer
-    year_data = therapy_df[(therapy_df['Year'] == display_year) & 
-                          (therapy_df['Insurer'] == insurer_value)]
-    
-    if year_data.empty:
+    if top_classes.empty:
         return go.Figure()
     
-    # Sort by the selected metric to determine rankings
-    ranked_data = year_data.sort_values(by=selected_metric, ascending=False)
-    
-    # Add a bar for each therapy class, showing its rank
-    colors = px.colors.qualitative.Plotly
-    
-    # Get top 15 classes for better visibility
-    top_classes = ranked_data.head(15)
-    
-    # Create a figure
-    fig = go.Figure()
-    
-    # Create the horizontal bar chart
-    fig.add_trace(go.Bar(
-        y=[f"{i+1}. {row['Therapy_Class']}" for i, (_, row) in enumerate(top_classes.iterrows())],
-        x=top_classes[selected_metric],
-        orientation='h',
-        marker=dict(
-            color=[colors[i % len(colors)] for i in range(len(top_classes))],
-            line=dict(width=1)
-        ),
-        text=top_classes[selected_metric].apply(lambda x: f"{x:,.0f}" if selected_metric not in ['Cost_Per_Claimant', 'Cost_Per_Volume'] 
-                                               else f"${x:,.2f}"),
-        textposition='outside',
-        hoverinfo='text',
-        hovertext=[
-            f"Rank {i+1}: {row['Therapy_Class']}<br>"
-            f"{selected_metric.replace('_', ' ')}: " + 
-            (f"${row[selected_metric]:,.2f}" if selected_metric in ['Cost_Per_Claimant', 'Cost_Per_Volume'] 
-             else f"${row[selected_metric]:,.0f}" if selected_metric == 'Cost' else f"{row[selected_metric]:,.0f}")
-            for i, (_, row) in enumerate(top_classes.iterrows())
-        ]
-    ))
+    # Rank changes from the previous year (if not the first year)
+    prev_ranks = None
+    if prev_year is not None:
+        prev_year_data = context.year_rows('therapy', prev_year)
+        if not prev_year_data.empty:
+            prev_ranks = pd.Series(prev_year_data[f'{selected_metric}_Rank'].to_numpy(),
+                                   index=figures.as_strings(prev_year_data['Therapy_Class']))
     
-    # Update layout
-    insurer_label = "BOB" if bob_toggle == 'BOB' else f"Insurer {selected_insurer}"
-    fig.update_layout(
+    return figures.ranking_bar(
+        top_classes, 'Therapy_Class', selected_metric,
         title=f'Therapy Class Rankings by {selected_metric.replace("_", " ")} in {display_year} - {insurer_label}',
-        xaxis=dict(
-            title=selected_metric.replace('_', ' '),
-            showgrid=True
-        ),
-        yaxis=dict(
-            title='Rank and Therapy Class',
-            autorange="reversed"  # To show rank 1 at the top
-        ),
-        margin=dict(l=20, r=20, t=80, b=20),
-        height=600
+        axis_title='Rank and Therapy Class',
+        prev_ranks=prev_ranks
     )
+
+def therapy_ranking_figures(selected_metric, insurer_value):
+    context = datastore.current().context(insurer_value)
+    insurer_label = "BOB" if insurer_value == 'BOB' else f"Insurer {insurer_value}"
+    # Every year the insurer has therapy data for, in order
+    years = context.years('therapy')
+    
+    # Rank changes are annotated from the second year on
+    ranking_figures = [therapy_ranking_figure(context, insurer_label, selected_metric, year,
+                                              years[i - 1] if i > 0 else None)
+                       for i, year in enumerate(years)]
+    return years, ranking_figures
+
+@cached_figure
+def therapy_ranking_frames(selected_metric, insurer_value):
+    years, ranking_figures = therapy_ranking_figures(selected_metric, insurer_value)
+    return {'years': years, 'figures': ranking_figures}
+
+@cached_figure
+def therapy_ranking_animation(selected_metric, insurer_value):
+    years, ranking_figures = therapy_ranking_figures(selected_metric, insurer_value)
+    if not years:
+        return go.Figure()
     
-    # Add annotations to show rank changes from previous year (if not the first year)
-    if display_year > 2018 and animation_state == "playing":
-        prev_year = display_year - 1
-        prev_year_data = therapy_df[(therapy_df['Year'] == prev_year) & 
-                                   (therapy_df['Insurer'] == insurer_value)]
-        
-        if not prev_year_data.empty:
-            # Sort previous year data by the selected metric
-            prev_ranked_data = prev_year_data.sort_values(by=selected_metric, ascending=False)
-            
-            # Create a mapping of therapy class to previous rank
-            prev_ranks = {row['Therapy_Class']: i+1 for i, (_, row) in enumerate(prev_ranked_data.iterrows())}
-            
-            # Add annotations for rank changes
-            for i, (_, row) in enumerate(top_classes.iterrows()):
-                therapy_class = row['Therapy_Class']
-                current_rank = i + 1
-                
-                if therapy_class in prev_ranks:
-                    prev_rank = prev_ranks[therapy_class]
-                    rank_change = prev_rank - current_rank
-                    
-                    if rank_change != 0:
-                        # Determine color and symbol based on direction of change
-                        if rank_change > 0:
-                            # Improved rank (moved up)
-                            color = 'green'
-                            symbol = '▲'
-                        else:
-                            # Worsened rank (moved down)
-                            color = 'red'
-                            symbol = '▼'
-                        
-                        fig.add_annotation(
-                            y=f"{current_rank}. {therapy_class}",
-                            x=row[selected_metric] * 1.02,  # Position slightly to the right of the bar
-                            text=f"{symbol} {abs(rank_change)}",
-                            showarrow=False,
-                            font=dict(color=color, size=12),
-                            align='left'
-                        )
+    # Start on the first year; every year becomes a frame with its own bars,
+    # title and rank-change annotations
+    fig = go.Figure(
+        data=ranking_figures[0].data,
+        layout=ranking_figures[0].layout,
+        frames=[go.Frame(name=str(year), data=figure.data,
+                         layout=go.Layout(title=figure.layout.title, annotations=figure.layout.annotations))
+                for year, figure in zip(years, ranking_figures)]
+    )
     
+    # Bars and labels change every year, so each frame is redrawn
+    frame_args = dict(frame=dict(duration=1000, redraw=True), transition=dict(duration=0), mode='immediate')
+    fig.update_layout(
+        updatemenus=[dict(
+            type='buttons',
+            direction='left',
+            x=0, y=-0.05, xanchor='left', yanchor='top',
+            buttons=[
+                dict(label='Play', method='animate', args=[None, dict(frame_args, fromcurrent=True)]),
+                dict(label='Pause', method='animate', args=[[None], frame_args])
+            ]
+        )],
+        sliders=[dict(
+            active=0,
+            x=0.15, len=0.85, y=-0.05, yanchor='top',
+            currentvalue=dict(prefix='Year: '),
+            steps=[dict(label=str(year), method='animate', args=[[str(year)], frame_args]) for year in years]
+        )],
+        margin=dict(l=20, r=20, t=80, b=100)
+    )
     return fig
 
+# Callback for the therapy ranking animation
+# (a metric change for the same insurer only replaces the bars, titles and annotations)
+if RANKING_FRAMES:
+    @app.callback(
+        [Output('therapy-ranking-graph', 'figure'),
+         Output('ranking-signature', 'data')],
+        [Input('therapy-metric-dropdown', 'value'),
+         Input('bob-toggle', 'value'),
+         Input('insurer-dropdown', 'value')],
+        [State('ranking-signature', 'data')]
+    )
+    def update_therapy_ranking(selected_metric, bob_toggle, selected_insurer, signature):
+        insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
+        return send_figure(therapy_ranking_animation(selected_metric, insurer_value), signature)
+else:
+    @app.callback(
+        [Output('ranking-frames', 'data'),
+         Output('ranking-signature', 'data')],
+        [Input('therapy-metric-dropdown', 'value'),
+         Input('bob-toggle', 'value'),
+         Input('insurer-dropdown', 'value')],
+        [State('ranking-signature', 'data')]
+    )
+    def update_therapy_ranking(selected_metric, bob_toggle, selected_insurer, signature):
+        insurer_value = bob_toggle if bob_toggle == 'BOB' else selected_insurer
+        return send_frames(therapy_ranking_frames(selected_metric, insurer_value), signature)
+
+startup.mark('callbacks')
+
+# Figures for the warm-up (TREND_WARMUP), in the order they're wanted: what a
+# page load shows for BOB and each insurer, then every metric for the latest
+# year, then the other years. Arguments match what the dropdowns send.
+def warmup_tasks():
+    data = datastore.current()
+    years = sorted((int(year) for year in data.yearly['Year'].unique()), reverse=True)
+    metric_values = [metric['value'] for metric in metrics]
+    # The multi-metric dropdowns send their values in the order picked: warm
+    # each metric alone and every selection one click from the initial one
+    def selections_near(default, options):
+        removed = [[value for value in default if value != metric] for metric in default]
+        added = [default + [metric] for metric in options if metric not in default]
+        alone = [[metric] for metric in options if [metric] not in removed]
+        return alone + removed + added
+    annual_selections = selections_near(default_annual_metrics, metric_values)
+    growth_selections = selections_near(default_growth_metrics, [metric['value'] for metric in growth_metrics])
+    province = data.values('province', 'Province')[0]
+    ranking = therapy_ranking_animation if RANKING_FRAMES else therapy_ranking_frames
+    # With BOB on, the disabled insurer dropdown still holds its initial value
+    selections = [('BOB', data.insurers[0])] + [('insurer', insurer) for insurer in data.insurers]
+
+    def figures_for(year, metric, bob_toggle, insurer):
+        insurer_value = bob_toggle if bob_toggle == 'BOB' else insurer
+        return [
+            (update_province_bar, (year, metric, bob_toggle, insurer)),
+            (generic_bar_figure, (year, metric, [], bob_toggle, insurer)),
+            (therapy_top10_figure, (metric, year, [], bob_toggle, insurer)),
+            (therapy_movement_figure, (metric, year, bob_toggle, insurer)),
+        ] + ([
+            (update_top_provinces_trend, (metric, bob_toggle, insurer)),
+            (update_province_trend, (province, metric, bob_toggle, insurer)),
+            (ranking, (metric, insurer_value)),
+        ] if year == years[0] else [])
+
+    tasks = []
+    for bob_toggle, insurer in selections:
+        tasks += [(update_annual_trends, (default_annual_metrics, bob_toggle, insurer)),
+                  (update_growth_rates, (default_growth_metrics, bob_toggle, insurer))]
+        tasks += figures_for(years[0], 'Cost', bob_toggle, insurer)
+    for bob_toggle, insurer in selections:
+        tasks += [(update_annual_trends, (selected, bob_toggle, insurer)) for selected in annual_selections]
+        tasks += [(update_growth_rates, (selected, bob_toggle, insurer)) for selected in growth_selections]
+        for metric in metric_values:
+            if metric != 'Cost':
+                tasks += figures_for(years[0], metric, bob_toggle, insurer)
+    for year in years[1:]:
+        for bob_toggle, insurer in selections:
+            for metric in metric_values:
+                tasks += figures_for(year, metric, bob_toggle, insurer)
+    return tasks
+
+# Render them into the figure cache before this process serves a request
+if WARMUP:
+    warmup.run(warmup_tasks())
+    startup.mark('warm-up')
+
+# With gunicorn --preload this module is imported once in the master. Move
+# everything allocated so far into the permanent GC generation so collections
+# in the forked workers don't touch (and copy) those pages.
+if PRELOAD:
+    gc.freeze()
+
+startup.report()
+
 # Run the app
 if __name__ == '__main__':
    # app.run_server(debug=False, host="0.0.0.0", port=8080)
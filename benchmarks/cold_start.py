@@ -0,0 +1,134 @@
+"""Cold start of the app module, by phase, against a time budget.
+
+Imports ``app`` in fresh interpreters (as every gunicorn worker without
+--preload does) and reads the phase timings it records (``startup.timings``:
+imports, app setup, data load, layout, callbacks, warm-up). Prints the median
+of each phase and exits with status 1 when:
+
+* the median startup is over budget. The budget is --budget, else
+  TREND_STARTUP_BUDGET, else the median startup recorded in
+  benchmarks/baselines/cold_start.json plus MARGIN. Without a baseline it is
+  DEFAULT_BUDGET;
+* a module that should not load at boot was loaded: plotly.express and
+  IPython, and each optional subsystem whose switch is off in the
+  environment (jobs, warmup, responses, profiling, partial_updates).
+
+Re-record the baseline on the machine that runs the check.
+
+    python -m benchmarks.cold_start [--runs 5] [--budget SECONDS] [--update-baselines]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.dash_client import PASSWORD, REPO_ROOT, USERNAME
+
+BASELINES = Path(__file__).resolve().parent / 'baselines' / 'cold_start.json'
+
+# Seconds; well above the run-to-run spread seen on a 1-CPU box (1.2-2.1 s)
+DEFAULT_BUDGET = 4.0
+
+# Headroom over the recorded median, as a fraction of it. The median of
+# --runs startups stays within about 10% of it on an unchanged tree.
+MARGIN = 0.25
+
+# Module: the variable that switches it on (None: never loaded at boot)
+DEFERRED = {
+    'plotly.express': None,
+    'IPython': None,
+    'jobs': 'TREND_BACKGROUND_JOBS',
+    'warmup': 'TREND_WARMUP',
+    'responses': 'TREND_COMPACT_RESPONSES',
+    'profiling': 'TREND_PROFILE_TOKEN',
+    'partial_updates': 'TREND_PARTIAL_UPDATES',
+}
+
+CHILD = f"""
+import json, sys
+import app, startup
+print(json.dumps({{'timings': startup.timings, 'total': startup.total(),
+                  'loaded': [name for name in {list(DEFERRED)!r} if name in sys.modules]}}))
+"""
+
+
+def switched_on(variable, env):
+    # Partial updates are on unless TREND_PARTIAL_UPDATES=0; the others are off unless set
+    default = '1' if variable == 'TREND_PARTIAL_UPDATES' else ''
+    return variable is not None and env.get(variable, default) not in ('', '0')
+
+
+def cold_start(env):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=REPO_ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['wall'] = time.perf_counter() - start
+    return result
+
+
+def budget_from(args):
+    if args.budget is not None:
+        return args.budget, "--budget"
+    if os.environ.get('TREND_STARTUP_BUDGET'):
+        return float(os.environ['TREND_STARTUP_BUDGET']), "TREND_STARTUP_BUDGET"
+    if args.baselines.exists():
+        median = json.loads(args.baselines.read_text())['median']
+        return median * (1 + MARGIN), f"recorded median {median:.2f}s + {MARGIN:.0%}"
+    return DEFAULT_BUDGET, "default"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the app's cold start by phase.")
+    parser.add_argument('--runs', type=int,
+                        help="fresh interpreters to start (default 10 with --update-baselines, else 5)")
+    parser.add_argument('--budget', type=float, help="seconds the app module may take to load")
+    parser.add_argument('--baselines', type=Path, default=BASELINES)
+    parser.add_argument('--update-baselines', action='store_true',
+                        help="record these startups as the baseline instead of checking them")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, DASH_USERNAME=USERNAME, DASH_PASSWORD=PASSWORD)
+    runs = [cold_start(env) for _ in range(args.runs or (10 if args.update_baselines else 5))]
+
+    print(f"{'phase':<16} {'median ms':>10}")
+    for phase in runs[0]['timings']:
+        print(f"{phase:<16} {statistics.median(run['timings'][phase] for run in runs) * 1000:>10.0f}")
+    totals = [run['total'] for run in runs]
+    total = statistics.median(totals)
+    print(f"{'app module':<16} {total * 1000:>10.0f}   (slowest {max(totals) * 1000:.0f})")
+    print(f"{'process':<16} {statistics.median(run['wall'] for run in runs) * 1000:>10.0f}"
+          "   (interpreter start to exit)")
+
+    if args.update_baselines:
+        args.baselines.parent.mkdir(parents=True, exist_ok=True)
+        args.baselines.write_text(json.dumps({
+            'runs': len(runs), 'median': total, 'worst': max(totals),
+            'machine': {'python': platform.python_version(), 'cpus': os.cpu_count(),
+                        'platform': platform.platform()},
+        }, indent=2, sort_keys=True) + '\n')
+        print(f"\nBaseline written to {args.baselines}")
+        return 0
+
+    failed = False
+    loaded = {name for run in runs for name in run['loaded']}
+    for name, variable in DEFERRED.items():
+        if name in loaded and not switched_on(variable, env):
+            print(f"FAIL: {name} is loaded at boot" + (f" with {variable} off" if variable else ""))
+            failed = True
+    budget, source = budget_from(args)
+    if total > budget:
+        print(f"FAIL: startup {total:.2f}s is over the {budget:.2f}s budget ({source})")
+        failed = True
+    else:
+        print(f"OK: startup {total:.2f}s is within the {budget:.2f}s budget ({source})")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
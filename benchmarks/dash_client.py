@@ -0,0 +1,155 @@
+"""Minimal HTTP client for driving the dashboard's callbacks in benchmarks."""
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+USERNAME = 'bench'
+PASSWORD = 'bench'
+
+GENERIC_TABLE_COLUMNS = [{'id': column, 'name': column} for column in [
+    'Generic_Name', 'Claimants', 'Volumes', 'Cost', 'Cost_Per_Claimant', 'Cost_Per_Volume', 'Claims_Per_Claimant']]
+
+SUMMARY_OUTPUTS = [(f'latest-year-{name}', 'children') for name in [
+    'claimants', 'volumes', 'cost', 'cost-per-claimant', 'cost-per-volume', 'claims-per-claimant',
+    'claimants-growth', 'volumes-growth', 'cost-growth', 'cost-per-claimant-growth',
+    'cost-per-volume-growth', 'claims-per-claimant-growth']]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def callback_payload(outputs, inputs, state=()):
+    """Body of a /_dash-update-component request.
+
+    ``outputs`` is a list of (component id, property); ``inputs`` and
+    ``state`` are lists of (component id, property, value). Every input is
+    reported as changed.
+    """
+    output_specs = [{'id': cid, 'property': prop} for cid, prop in outputs]
+    if len(output_specs) == 1:
+        output = f"{outputs[0][0]}.{outputs[0][1]}"
+        output_specs = output_specs[0]
+    else:
+        output = '..' + '...'.join(f"{cid}.{prop}" for cid, prop in outputs) + '..'
+    return {
+        'output': output,
+        'outputs': output_specs,
+        'inputs': [{'id': cid, 'property': prop, 'value': value} for cid, prop, value in inputs],
+        'changedPropIds': [f"{cid}.{prop}" for cid, prop, _ in inputs],
+        'state': [{'id': cid, 'property': prop, 'value': value} for cid, prop, value in state],
+    }
+
+
+def generic_table_callback(year, bob_toggle, insurer, page=0, sort_by=(), filter_query=''):
+    """(outputs, inputs, state) of one server-side page of the generic table."""
+    return ([('generic-table', 'data'), ('generic-table', 'page_count'),
+             ('generic-table', 'page_current'), ('generic-table-count', 'children')],
+            [('generic-year-dropdown', 'value', year), ('bob-toggle', 'value', bob_toggle),
+             ('insurer-dropdown', 'value', insurer), ('generic-table', 'page_current', page),
+             ('generic-table', 'page_size', 10), ('generic-table', 'sort_by', list(sort_by)),
+             ('generic-table', 'filter_query', filter_query)],
+            [('generic-table', 'columns', GENERIC_TABLE_COLUMNS)])
+
+
+def session_callbacks(insurer, year, metric='Cost', province='Ontario'):
+    """(outputs, inputs, state) of every callback a page load fires for one insurer."""
+    bob_toggle = 'BOB' if insurer == 'BOB' else 'insurer'
+    selected = None if insurer == 'BOB' else insurer
+    selection = [('bob-toggle', 'value', bob_toggle), ('insurer-dropdown', 'value', selected)]
+    compare_years = [year - 1]
+    return [
+        (SUMMARY_OUTPUTS, selection, []),
+        ([('annual-trends-graph', 'figure')],
+         [('annual-metrics-dropdown', 'value', ['Claimants', 'Cost'])] + selection, []),
+        ([('growth-rates-graph', 'figure')],
+         [('growth-metrics-dropdown', 'value', ['Claimants_Growth', 'Cost_Growth'])] + selection, []),
+        ([('province-bar-graph', 'figure')],
+         [('province-year-dropdown', 'value', year), ('province-metric-dropdown', 'value', metric)] + selection, []),
+        ([('top-provinces-trend-graph', 'figure')],
+         [('province-metric-dropdown', 'value', metric)] + selection, []),
+        ([('province-trend-graph', 'figure')],
+         [('province-trend-dropdown', 'value', province),
+          ('province-trend-metric-dropdown', 'value', metric)] + selection, []),
+        generic_table_callback(year, bob_toggle, selected),
+        ([('generic-bar-graph', 'figure'), ('generic-bar-signature', 'data')],
+         [('generic-year-dropdown', 'value', year), ('generic-metric-dropdown', 'value', metric),
+          ('generic-compare-years-dropdown', 'value', compare_years)] + selection,
+         [('generic-bar-signature', 'data', None)]),
+        ([('therapy-top10-graph', 'figure'), ('therapy-top10-signature', 'data')],
+         [('therapy-metric-dropdown', 'value', metric), ('therapy-year-dropdown', 'value', year),
+          ('therapy-compare-years-dropdown', 'value', compare_years)] + selection,
+         [('therapy-top10-signature', 'data', None)]),
+        ([('therapy-movement-graph', 'figure'), ('therapy-movement-signature', 'data')],
+         [('therapy-metric-dropdown', 'value', metric), ('therapy-year-dropdown', 'value', year)] + selection,
+         [('therapy-movement-signature', 'data', None)]),
+        ([('ranking-frames', 'data'), ('ranking-signature', 'data')],
+         [('therapy-metric-dropdown', 'value', metric)] + selection,
+         [('ranking-signature', 'data', None)]),
+    ]
+
+
+class DashClient:
+    def __init__(self, base_url, username=USERNAME, password=PASSWORD, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        token = base64.b64encode(f"{username}:{password}".encode()).decode()
+        self.headers = {'Authorization': f'Basic {token}'}
+        self.timeout = timeout
+
+    def request(self, path, body=None, headers=None):
+        """Return (status, response bytes)."""
+        data = None
+        all_headers = dict(self.headers, **(headers or {}))
+        if body is not None:
+            data = json.dumps(body).encode()
+            all_headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=all_headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+    def callback(self, outputs, inputs, state=(), headers=None):
+        return self.request('/_dash-update-component', callback_payload(outputs, inputs, state), headers)
+
+    def wait_ready(self, path='/', timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                status, _ = self.request(path)
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise TimeoutError(f"{self.base_url}{path} not ready after {timeout}s")
+
+
+def start_gunicorn(port, workers=2, threads=1, extra_args=(), env=None):
+    """Start ``gunicorn app:server`` from the repo root with bench credentials."""
+    child_env = dict(os.environ, DASH_USERNAME=USERNAME, DASH_PASSWORD=PASSWORD, **(env or {}))
+    cmd = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+           '--workers', str(workers), '--threads', str(threads), *extra_args, 'app:server']
+    return subprocess.Popen(cmd, cwd=REPO_ROOT, env=child_env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop(process, timeout=10):
+    process.terminate()
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
@@ -0,0 +1,139 @@
+"""Per-figure build time of the row-wise builders versus figures.py.
+
+For 10, 100 and 300 ranked items, builds the ranking bar chart (labels,
+hover text and rank-change annotations) and the growth-annotated trend the
+way the callbacks used to (iterrows, per-row formatting, one
+add_annotation per point) and with the shared builders, and reports the
+median milliseconds per figure. ``--callbacks`` also times the dashboard
+callbacks on the real data with the figure cache bypassed.
+
+    python -m benchmarks.figure_build [--repeat 5] [--sizes 10 100 300] [--callbacks]
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+import figures
+
+METRIC = 'Cost'
+
+
+def synthetic_ranking(items, seed=0):
+    rng = np.random.default_rng(seed)
+    current = pd.DataFrame({
+        'Therapy_Class': [f'Class {i}' for i in range(items)],
+        METRIC: np.sort(rng.gamma(2.0, 1e5, items))[::-1],
+    })
+    prev_ranks = pd.Series(rng.permutation(items) + 1, index=current['Therapy_Class'])
+    return current, prev_ranks
+
+
+def legacy_ranking(ranked, prev_ranks):
+    # The pre-figures.py construction: per-row labels and one annotation per change
+    colors = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=[f"{i+1}. {row['Therapy_Class']}" for i, (_, row) in enumerate(ranked.iterrows())],
+        x=ranked[METRIC],
+        orientation='h',
+        marker=dict(color=[colors[i % len(colors)] for i in range(len(ranked))], line=dict(width=1)),
+        text=ranked[METRIC].apply(lambda x: f"{x:,.0f}"),
+        textposition='outside',
+        hoverinfo='text',
+        hovertext=[f"Rank {i+1}: {row['Therapy_Class']}<br>Cost: ${row[METRIC]:,.0f}"
+                   for i, (_, row) in enumerate(ranked.iterrows())]
+    ))
+    prev = prev_ranks.to_dict()
+    for i, (_, row) in enumerate(ranked.iterrows()):
+        change = prev[row['Therapy_Class']] - (i + 1)
+        if change != 0:
+            fig.add_annotation(y=f"{i+1}. {row['Therapy_Class']}", x=row[METRIC] * 1.02,
+                               text=f"{'▲' if change > 0 else '▼'} {abs(change)}", showarrow=False,
+                               font=dict(color='green' if change > 0 else 'red', size=12), align='left')
+    return fig
+
+
+def vectorized_ranking(ranked, prev_ranks):
+    return figures.ranking_bar(ranked, 'Therapy_Class', METRIC, 'Ranking', 'Rank', prev_ranks=prev_ranks)
+
+
+def synthetic_trend(points, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.gamma(2.0, 1e5, points)
+    return pd.DataFrame({'Year': np.arange(points), METRIC: values,
+                         f'{METRIC}_Growth': pd.Series(values).pct_change() * 100})
+
+
+def legacy_trend(df):
+    fig = go.Figure(go.Scatter(x=df['Year'], y=df[METRIC], mode='lines+markers'))
+    for i in range(1, len(df)):
+        growth = df[f'{METRIC}_Growth'].iloc[i]
+        if not pd.isna(growth):
+            fig.add_annotation(x=df['Year'].iloc[i], y=df[METRIC].iloc[i], text=f"{growth:.1f}%",
+                               showarrow=True, arrowhead=4, arrowsize=1, arrowwidth=1,
+                               arrowcolor="#636363", ax=0, ay=-30, font=dict(size=10))
+    return fig
+
+
+def vectorized_trend(df):
+    fig = go.Figure(go.Scatter(x=df['Year'], y=df[METRIC], mode='lines+markers'))
+    return figures.add_annotations(fig, figures.growth_annotations(df['Year'], df[METRIC], df[f'{METRIC}_Growth']))
+
+
+def median_ms(build, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def callback_times(repeat):
+    import app
+
+    insurer = app.datastore.current().insurers[0]
+    year = int(app.datastore.current().yearly['Year'].max())
+    cases = {
+        'generic bar': (app.generic_bar_figure, (year, METRIC, [year - 1], 'insurer', insurer)),
+        'therapy top 10': (app.therapy_top10_figure, (METRIC, year, [year - 1], 'insurer', insurer)),
+        'province trend': (app.update_province_trend, ('Ontario', METRIC, 'insurer', insurer)),
+        'ranking frames': (app.therapy_ranking_frames, (METRIC, insurer)),
+    }
+    for name, (callback, args) in cases.items():
+        build = callback.__wrapped__  # Skip the figure cache
+        build(*args)  # Load the dataset outside the timing
+        yield name, median_ms(lambda: build(*args), repeat)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time figure construction, row-wise versus vectorized.")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 300])
+    parser.add_argument('--callbacks', action='store_true', help="also time the dashboard callbacks")
+    args = parser.parse_args(argv)
+
+    print(f"{'figure':<16} {'items':>6} {'row-wise ms':>12} {'vectorized ms':>14} {'speedup':>8}")
+    for items in args.sizes:
+        ranked, prev_ranks = synthetic_ranking(items)
+        trend = synthetic_trend(items)
+        for name, legacy, vectorized in [
+            ('ranking bar', lambda: legacy_ranking(ranked, prev_ranks), lambda: vectorized_ranking(ranked, prev_ranks)),
+            ('growth trend', lambda: legacy_trend(trend), lambda: vectorized_trend(trend)),
+        ]:
+            before, after = median_ms(legacy, args.repeat), median_ms(vectorized, args.repeat)
+            print(f"{name:<16} {items:>6} {before:>12.2f} {after:>14.2f} {before / after:>7.1f}x")
+
+    if args.callbacks:
+        print(f"\n{'callback':<16} {'ms':>8}")
+        for name, ms in callback_times(args.repeat):
+            print(f"{name:<16} {ms:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
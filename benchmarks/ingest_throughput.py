@@ -0,0 +1,82 @@
+"""Throughput of ingest.py on a synthetic line-level claims file.
+
+Writes a seeded raw claims CSV, aggregates it with 1..N worker processes
+and reports rows/sec. The single-worker result is checked against a
+direct in-memory pandas aggregation, and every parallel result against the
+single-worker one.
+
+    python -m benchmarks.ingest_throughput [--rows 2000000] [--workers 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+PROVINCES = ['Ontario', 'Quebec', 'British Columbia', 'Alberta', 'Manitoba', 'Saskatchewan',
+             'Nova Scotia', 'New Brunswick', 'Newfoundland', 'Prince Edward Island']
+
+
+def write_raw_claims(path, rows, seed=0, insurers=20, claimants=200_000, generics=500, classes=60):
+    rng = np.random.default_rng(seed)
+    generic_class = rng.integers(0, classes, generics)
+    generic = rng.integers(0, generics, rows)
+    claims = pd.DataFrame({
+        'Claimant_ID': np.char.add('C', rng.integers(0, claimants, rows).astype(str)),
+        'Insurer': np.char.add('I', rng.integers(0, insurers, rows).astype(str)),
+        'Year': rng.integers(2018, 2025, rows),
+        'Province': np.array(PROVINCES)[rng.integers(0, len(PROVINCES), rows)],
+        'Generic_Name': np.char.add('Generic ', generic.astype(str)),
+        'Therapy_Class': np.char.add('Class ', generic_class[generic].astype(str)),
+        'Cost': rng.gamma(2.0, 40.0, rows).round(2),
+    })
+    claims.to_csv(path, index=False)
+
+
+def check(frames, path):
+    claims = pd.read_csv(path, dtype={'Claimant_ID': str, 'Insurer': str})
+    expected = claims.groupby(['Insurer', 'Year']).agg(
+        Claimants=('Claimant_ID', 'nunique'), Volumes=('Cost', 'size'), Cost=('Cost', 'sum'))
+    actual = frames['yearly'][frames['yearly']['Insurer'] != 'BOB'].set_index(['Insurer', 'Year'])
+    pd.testing.assert_frame_equal(actual[expected.columns].sort_index(), expected.sort_index(),
+                                  check_dtype=False)
+    bob = frames['yearly'][frames['yearly']['Insurer'] == 'BOB'].set_index('Year')['Claimants']
+    assert (bob.sort_index() == claims.groupby('Year')['Claimant_ID'].nunique()).all()
+
+
+def check_same(frames, serial):
+    for name, frame in serial.items():
+        pd.testing.assert_frame_equal(frames[name].reset_index(drop=True), frame.reset_index(drop=True),
+                                      obj=f"parallel {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure ingest.py throughput in rows/sec.")
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunksize', type=int, default=250_000)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'claims.csv')
+        write_raw_claims(path, args.rows)
+        print(f"{'workers':>7} {'seconds':>9} {'rows/s':>12}")
+        serial = None
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            frames, rows = ingest.ingest([path], args.chunksize, workers)
+            elapsed = time.perf_counter() - start
+            if workers == 1:
+                check(frames, path)
+                serial = frames
+            else:
+                check_same(frames, serial)
+            print(f"{workers:>7} {elapsed:>9.2f} {rows / elapsed:>12,.0f}")
+
+
+if __name__ == '__main__':
+    main()
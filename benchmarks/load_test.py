@@ -0,0 +1,304 @@
+"""Concurrent analysts against gunicorn, under several worker/thread settings.
+
+For each ``WORKERSxTHREADS`` setting, starts ``gunicorn app:server`` on a
+local port with the bench basic-auth credentials and runs N simulated
+analysts, each in its own thread, for a fixed time. An analyst loads the
+page (every callback a page load fires), then repeatedly picks an action,
+changes the component values the browser would change for it and sends the
+/_dash-update-component requests for every server callback that takes one
+of those values:
+
+* switch insurer: the BOB toggle and the insurer dropdown;
+* change metric: one tab's metric dropdown;
+* play the animation: fetch the therapy ranking (playback itself runs in the
+  browser);
+* page the generic table: the next page, sometimes sorted.
+
+Requests are built from the app's callback map (/_dash-dependencies), so the
+outputs and inputs follow the server's switches (TREND_RANKING_FRAMES,
+TREND_BACKGROUND_JOBS, ... are passed on from this environment). Background
+callbacks are polled as the browser polls them, and their latency runs from
+the first request to the result. Analysts keep the values the server
+returns, such as the partial-update signatures, and send them back as the
+browser does. Insurers, years, metrics and provinces come from the served
+layout, so any data set works (e.g. one from benchmarks.synthetic_data via
+--data-dir).
+
+Reports throughput, error rate and p50/p95/p99 latency per callback for each
+setting. Everything runs on this machine; the client threads share a core
+with the server, so compare settings rather than reading absolute numbers.
+
+    python -m benchmarks.load_test [--configs 1x1 2x1 2x4] [--analysts 8] [--duration 30]
+                                   [--think 0.2] [--data-dir DIR] [--seed 0]
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.parse
+
+from benchmarks.dash_client import DashClient, callback_payload, free_port, start_gunicorn, stop
+
+# Relative frequency of each action after the page load
+ACTIONS = {'switch_insurer': 2, 'change_metric': 4, 'play_animation': 1, 'page_table': 3}
+
+# The metric dropdown of each tab
+METRIC_DROPDOWNS = ['province-metric-dropdown', 'generic-metric-dropdown', 'therapy-metric-dropdown']
+
+# Outputs of the server callback behind the ranking player, with and without TREND_RANKING_FRAMES
+RANKING_OUTPUTS = ['ranking-frames', 'therapy-ranking-graph']
+
+SORTS = [[], [{'column_id': 'Cost', 'direction': 'desc'}], [{'column_id': 'Claimants', 'direction': 'asc'}]]
+
+
+def find_component(layout, component_id):
+    """The props of the component with ``component_id`` in a /_dash-layout tree."""
+    if isinstance(layout, dict):
+        props = layout.get('props', {})
+        if props.get('id') == component_id:
+            return props
+        children = props.get('children')
+        return find_component(children, component_id) if children is not None else None
+    if isinstance(layout, list):
+        for child in layout:
+            found = find_component(child, component_id)
+            if found is not None:
+                return found
+    return None
+
+
+def parse_outputs(output):
+    """[(component id, property)] of a callback map 'output' string ('a.b' or '..a.b...c.d..')."""
+    if output.startswith('..'):
+        output = output[2:-2]
+    return [tuple(spec.rsplit('.', 1)) for spec in output.split('...')]
+
+
+def served_callbacks(client):
+    """The server-side callbacks in the app's callback map, in registration order."""
+    status, body = client.request('/_dash-dependencies')
+    if status != 200:
+        raise RuntimeError(f"/_dash-dependencies returned {status}")
+    return [{
+        'outputs': parse_outputs(dependency['output']),
+        'inputs': [(spec['id'], spec['property']) for spec in dependency['inputs']],
+        'state': [(spec['id'], spec['property']) for spec in dependency['state']],
+        # {'interval': ms} for a background callback
+        'background': dependency.get('background'),
+    } for dependency in json.loads(body) if not dependency.get('clientside_function')]
+
+
+def page_end_id(client):
+    """The page's signed end_id, which the browser sends with every callback request."""
+    status, body = client.request('/')
+    if status != 200:
+        raise RuntimeError(f"/ returned {status}")
+    config = re.search(rb'<script id="_dash-config" type="application/json">(.*?)</script>', body, re.S)
+    return json.loads(config.group(1)).get('end_id') if config else None
+
+
+def layout_choices(client):
+    status, body = client.request('/_dash-layout')
+    if status != 200:
+        raise RuntimeError(f"/_dash-layout returned {status}")
+    layout = json.loads(body)
+
+    def values(component_id):
+        return [option['value'] for option in find_component(layout, component_id)['options']]
+
+    return {
+        'layout': layout,
+        'insurers': ['BOB'] + values('insurer-dropdown'),
+        'metrics': {component_id: values(component_id) for component_id in METRIC_DROPDOWNS},
+        'callbacks': served_callbacks(client),
+        'end_id': page_end_id(client),
+    }
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+
+class Analyst:
+    """One simulated browser tab: the values of its components, as the browser holds them."""
+
+    def __init__(self, client, choices, results, rng, think):
+        self.client = client
+        self.choices = choices
+        self.results = results
+        self.rng = rng
+        self.think = think
+        self.callbacks = choices['callbacks']
+        # Every property a server callback reads, starting from the served layout
+        self.values = {}
+        for callback in self.callbacks:
+            for cid, prop in callback['inputs'] + callback['state']:
+                self.values[cid, prop] = (find_component(choices['layout'], cid) or {}).get(prop)
+        self.select_insurer(rng.choice(choices['insurers']))
+
+    def select_insurer(self, insurer):
+        self.values['bob-toggle', 'value'] = 'BOB' if insurer == 'BOB' else 'insurer'
+        if insurer != 'BOB':
+            self.values['insurer-dropdown', 'value'] = insurer
+
+    def request(self, payload, query):
+        """(ok, response JSON or None) of one /_dash-update-component request."""
+        if self.choices['end_id']:
+            query = {'endId': self.choices['end_id'], **query}
+        path = '/_dash-update-component'
+        if query:
+            path += '?' + urllib.parse.urlencode(query)
+        status, body = self.client.request(path, payload)
+        if status == 204:
+            return True, None
+        if status != 200:
+            return False, None
+        return True, json.loads(body)
+
+    def send(self, callback, changed):
+        payload = callback_payload(callback['outputs'],
+                                   [(cid, prop, self.values[cid, prop]) for cid, prop in callback['inputs']],
+                                   [(cid, prop, self.values[cid, prop]) for cid, prop in callback['state']])
+        payload['changedPropIds'] = [f"{cid}.{prop}" for cid, prop in callback['inputs'] if (cid, prop) in changed]
+        name = callback['outputs'][0][0]
+        if name.startswith('latest-year-'):
+            name = 'latest-year-summary'
+        start = time.perf_counter()
+        try:
+            ok, data = self.request(payload, {})
+            # A background callback answers with a job handle; poll until the result is in
+            if ok and data is not None and callback['background'] and 'response' not in data:
+                handles = {key: data[key] for key in ('cacheKey', 'job')}
+                poll = dict(payload,
+                            inputs=[dict(spec, value=None) for spec in payload['inputs']],
+                            state=[dict(spec, value=None) for spec in payload['state']])
+                interval = callback['background'].get('interval', 500) / 1000
+                while ok and data is not None and 'response' not in data:
+                    time.sleep(interval)
+                    ok, data = self.request(poll, handles)
+        except OSError:
+            ok, data = False, None
+        self.results.record(name, time.perf_counter() - start, ok=ok)
+        # Keep what the server sent for the values later requests read (Patches excepted)
+        for cid, props in ((data or {}).get('response') or {}).items():
+            for prop, value in props.items():
+                if (cid, prop) in self.values and not (isinstance(value, dict) and '__dash_patch_update' in value):
+                    self.values[cid, prop] = value
+
+    def fire(self, changed):
+        """Send every server callback that takes one of the ``changed`` properties."""
+        for callback in self.callbacks:
+            if changed & set(callback['inputs']):
+                self.send(callback, changed)
+
+    def page_load(self):
+        for callback in self.callbacks:
+            self.send(callback, set(callback['inputs']))
+
+    def switch_insurer(self):
+        self.select_insurer(self.rng.choice(self.choices['insurers']))
+        self.fire({('bob-toggle', 'value'), ('insurer-dropdown', 'value')})
+
+    def change_metric(self):
+        dropdown = self.rng.choice(METRIC_DROPDOWNS)
+        self.values[dropdown, 'value'] = self.rng.choice(self.choices['metrics'][dropdown])
+        self.fire({(dropdown, 'value')})
+
+    def play_animation(self):
+        for callback in self.callbacks:
+            if callback['outputs'][0][0] in RANKING_OUTPUTS:
+                self.send(callback, set())
+
+    def page_table(self):
+        self.values['generic-table', 'page_current'] = (self.values['generic-table', 'page_current'] or 0) + 1
+        self.values['generic-table', 'sort_by'] = self.rng.choice(SORTS)
+        self.fire({('generic-table', 'page_current'), ('generic-table', 'sort_by')})
+
+    def run(self, deadline):
+        self.page_load()
+        names, weights = zip(*ACTIONS.items())
+        while time.monotonic() < deadline:
+            if self.think:
+                time.sleep(self.rng.expovariate(1 / self.think))
+            getattr(self, self.rng.choices(names, weights)[0])()
+
+
+def run_config(workers, threads, analysts, duration, think, seed, env):
+    port = free_port()
+    worker_args = ['--worker-class', 'gthread'] if threads > 1 else []
+    process = start_gunicorn(port, workers=workers, threads=threads, extra_args=worker_args, env=env)
+    try:
+        client = DashClient(f'http://127.0.0.1:{port}', timeout=60)
+        client.wait_ready(timeout=120)
+        choices = layout_choices(client)
+        results = Results()
+        start = time.monotonic()
+        deadline = start + duration
+        sessions = [Analyst(client, choices, results, random.Random(seed + i), think) for i in range(analysts)]
+        pool = [threading.Thread(target=session.run, args=(deadline,)) for session in sessions]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return results, time.monotonic() - start
+    finally:
+        stop(process)
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        return [samples[0] * 1000] * 3
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return [cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000]
+
+
+def report(label, results, elapsed):
+    total = sum(len(samples) for samples in results.latencies.values())
+    errors = sum(results.errors.values())
+    print(f"\n{label}: {total} requests in {elapsed:.1f}s, {total / elapsed:.1f} req/s, "
+          f"{errors / max(total, 1):.2%} errors")
+    print(f"  {'callback':<28} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, samples in sorted(results.latencies.items()):
+        p50, p95, p99 = percentiles(samples)
+        print(f"  {name:<28} {len(samples):>7} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} "
+              f"{results.errors.get(name, 0):>7}")
+
+
+def parse_config(value):
+    workers, _, threads = value.partition('x')
+    return int(workers), int(threads or 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test gunicorn with simulated analysts.")
+    parser.add_argument('--configs', nargs='+', type=parse_config, default=[(1, 1), (2, 1), (2, 4)],
+                        metavar='WORKERSxTHREADS')
+    parser.add_argument('--analysts', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help="seconds per configuration")
+    parser.add_argument('--think', type=float, default=0.2,
+                        help="mean seconds an analyst waits between actions (0: none)")
+    parser.add_argument('--data-dir', help="serve this data set (TREND_DATA_DIR) instead of data/")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    env = {'TREND_DATA_DIR': args.data_dir} if args.data_dir else {}
+    print(f"{args.analysts} analysts, {args.duration:.0f}s per configuration, think time {args.think}s")
+    for workers, threads in args.configs:
+        results, elapsed = run_config(workers, threads, args.analysts, args.duration, args.think, args.seed, env)
+        report(f"{workers} workers x {threads} threads", results, elapsed)
+
+
+if __name__ == '__main__':
+    main()
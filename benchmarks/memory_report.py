@@ -0,0 +1,29 @@
+"""Per-frame memory of the dashboard data, default vs compact representation.
+
+    python -m benchmarks.memory_report [--data-dir data]
+"""
+import argparse
+
+import data_loader
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-dir', default=data_loader.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    frames = data_loader.load_frames(args.data_dir, compact=False)
+    before = data_loader.frame_memory(frames)
+    after = data_loader.frame_memory(data_loader.compact_frames(frames))
+
+    print(f"{'frame':<10} {'rows':>10} {'before':>14} {'after':>14} {'saved':>7}")
+    for name, df in frames.items():
+        saved = 1 - after[name] / before[name]
+        print(f"{name:<10} {len(df):>10,} {before[name]:>14,} {after[name]:>14,} {saved:>7.1%}")
+    total_before, total_after = sum(before.values()), sum(after.values())
+    print(f"{'total':<10} {'':>10} {total_before:>14,} {total_after:>14,} "
+          f"{1 - total_after / total_before:>7.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Payload bytes of a typical analysis session, full figures versus patches.
+
+Replays metric and year changes against the generic bar, therapy top 10,
+therapy movement and therapy ranking callbacks over gunicorn. Once without
+the signature stores (every response is a full figure), once keeping them
+the way the browser does (same-shape updates come back as dash.Patch).
+
+    python -m benchmarks.partial_updates [--insurer 11]
+"""
+import argparse
+import json
+
+from benchmarks.dash_client import DashClient, free_port, start_gunicorn, stop
+
+METRICS = ['Cost', 'Claimants', 'Volumes', 'Cost_Per_Claimant', 'Cost_Per_Volume', 'Claims_Per_Claimant']
+YEARS = [2024, 2023, 2022, 2021]
+
+
+def session_steps(insurer):
+    """(graph, output, inputs) for each callback fired by an analyst's session."""
+    selection = [('bob-toggle', 'value', 'insurer'), ('insurer-dropdown', 'value', insurer)]
+    steps = []
+    for year in YEARS:
+        for metric in METRICS:
+            steps.append(('generic-bar', ('generic-bar-graph', 'figure'),
+                          [('generic-year-dropdown', 'value', year), ('generic-metric-dropdown', 'value', metric),
+                           ('generic-compare-years-dropdown', 'value', [year - 1])] + selection))
+            steps.append(('therapy-top10', ('therapy-top10-graph', 'figure'),
+                          [('therapy-metric-dropdown', 'value', metric), ('therapy-year-dropdown', 'value', year),
+                           ('therapy-compare-years-dropdown', 'value', [year - 1])] + selection))
+            steps.append(('therapy-movement', ('therapy-movement-graph', 'figure'),
+                          [('therapy-metric-dropdown', 'value', metric),
+                           ('therapy-year-dropdown', 'value', year)] + selection))
+    for metric in METRICS:
+        steps.append(('ranking', ('ranking-frames', 'data'),
+                      [('therapy-metric-dropdown', 'value', metric)] + selection))
+    return steps
+
+
+def replay(client, steps, keep_signatures):
+    signatures = {}
+    sizes = {}
+    patches = 0
+    for graph, output, inputs in steps:
+        store = f'{graph}-signature'
+        status, body = client.callback([output, (store, 'data')], inputs,
+                                       [(store, 'data', signatures.get(graph) if keep_signatures else None)])
+        if status != 200:
+            raise RuntimeError(f"{graph} returned {status}")
+        response = json.loads(body)['response']
+        signatures[graph] = response[store]['data']
+        patches += '__dash_patch_update' in response[output[0]][output[1]]
+        sizes[graph] = sizes.get(graph, 0) + len(body)
+    return sizes, patches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare full-figure and patch payloads for a session.")
+    parser.add_argument('--insurer', default='11')
+    args = parser.parse_args(argv)
+
+    steps = session_steps(args.insurer)
+    port = free_port()
+    process = start_gunicorn(port, workers=1, threads=2)
+    try:
+        client = DashClient(f'http://127.0.0.1:{port}')
+        client.wait_ready()
+        replay(client, steps, keep_signatures=False)  # Load data and fill the figure cache
+        full, _ = replay(client, steps, keep_signatures=False)
+        partial, patches = replay(client, steps, keep_signatures=True)
+    finally:
+        stop(process)
+
+    print(f"{len(steps)} callbacks, {patches} answered with a patch")
+    print(f"{'callback':<18} {'full KiB':>9} {'patched KiB':>12} {'saved':>7}")
+    for graph in full:
+        print(f"{graph:<18} {full[graph] / 1024:>9.1f} {partial[graph] / 1024:>12.1f} "
+              f"{1 - partial[graph] / full[graph]:>7.0%}")
+    total_full, total_partial = sum(full.values()), sum(partial.values())
+    print(f"{'total':<18} {total_full / 1024:>9.1f} {total_partial / 1024:>12.1f} "
+          f"{1 - total_partial / total_full:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
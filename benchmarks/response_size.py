@@ -0,0 +1,66 @@
+"""Bytes on the wire and latency of a dashboard session, stock versus compact responses.
+
+Starts ``gunicorn app:server`` with TREND_COMPACT_RESPONSES off and on,
+replays every callback of a page load for a few insurers and years, and
+reports the response bytes (as sent, i.e. compressed) and p50/p95 latency
+per Accept-Encoding.
+
+    python -m benchmarks.response_size [--rounds 5]
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.dash_client import DashClient, free_port, session_callbacks, start_gunicorn, stop
+
+SESSIONS = [('BOB', 2024), ('11', 2023), ('13', 2021)]
+
+
+def replay(client, rounds, accept_encoding):
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    sizes, latencies = [], []
+    for _ in range(rounds):
+        session_bytes = 0
+        for insurer, year in SESSIONS:
+            for outputs, inputs, state in session_callbacks(insurer, year):
+                start = time.perf_counter()
+                status, body = client.callback(outputs, inputs, state, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    raise RuntimeError(f"{outputs[0][0]} returned {status}")
+                session_bytes += len(body)
+        sizes.append(session_bytes)
+    return sizes[-1], latencies
+
+
+def measure(compact, encodings, rounds):
+    port = free_port()
+    process = start_gunicorn(port, workers=1, threads=4, env={'TREND_COMPACT_RESPONSES': '1' if compact else '0'})
+    try:
+        client = DashClient(f'http://127.0.0.1:{port}')
+        client.wait_ready()
+        replay(client, 1, None)  # Load data and fill the figure cache
+        for encoding in encodings:
+            yield encoding, replay(client, rounds, encoding)
+    finally:
+        stop(process)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure callback response bytes and latency.")
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    calls = sum(len(session_callbacks(insurer, year)) for insurer, year in SESSIONS)
+    print(f"{len(SESSIONS)} page loads, {calls} callbacks per round")
+    print(f"{'mode':<8} {'encoding':<9} {'KiB':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for compact, encodings in [(False, [None]), (True, [None, 'gzip', 'br'])]:
+        for encoding, (size, latencies) in measure(compact, encodings, args.rounds):
+            p50 = statistics.median(latencies) * 1000
+            p95 = statistics.quantiles(latencies, n=20)[-1] * 1000
+            print(f"{'compact' if compact else 'stock':<8} {encoding or 'identity':<9} "
+                  f"{size / 1024:>9.1f} {p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
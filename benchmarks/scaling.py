@@ -0,0 +1,206 @@
+"""Load time, peak memory and callback latency on synthetic data at several scales.
+
+For each scale, writes seeded synthetic CSVs (benchmarks.synthetic_data),
+times ``data_loader.load_data()`` and measures its peak traced memory, then
+makes that data current and calls every server callback directly over a grid
+of inputs (BOB and one insurer, latest year, two metrics, with and without
+comparison years) with the figure cache off. Prints each measure as a curve
+across the scales.
+
+Every timing is the fastest of --repeat calls made after one untimed call,
+which absorbs lazy imports (plotly.express) and first-call memoization.
+
+--update-baselines measures --runs times (default 5) and stores each
+measure's best and worst in benchmarks/baselines/scaling.json. A check run
+exits with status 1 when a measure goes over its worst recorded value plus
+a margin: the larger of --tolerance times the best, twice the recorded
+spread (worst - best) and SLACK. Timings depend on the machine, so record
+the baselines where the check runs.
+
+    python -m benchmarks.scaling [--scales small medium] [--repeat 7] [--runs 1] [--tolerance 0.25]
+                                 [--update-baselines]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Time the callbacks themselves, in the request rather than as jobs and
+# without the figure cache; read when app is imported
+os.environ['TREND_FIGURE_CACHE_SIZE'] = '0'
+os.environ['TREND_BACKGROUND_JOBS'] = '0'
+
+import data_loader
+from benchmarks.dash_client import GENERIC_TABLE_COLUMNS
+from benchmarks.synthetic_data import write_dataset
+
+BASELINES = Path(__file__).resolve().parent / 'baselines' / 'scaling.json'
+
+SCALES = {
+    # The size of the bundled extract
+    'small': dict(insurers=5, years=7, provinces=10, generics=100, classes=100),
+    'medium': dict(insurers=20, years=7, provinces=13, generics=1000, classes=200),
+    'large': dict(insurers=50, years=10, provinces=13, generics=3000, classes=400),
+}
+
+GRID_METRICS = ['Cost', 'Cost_Per_Claimant']
+
+# Differences below this (ms or MiB) are noise, whatever the ratio
+SLACK = 1.0
+
+# Margin over the worst recorded value, in recorded spreads (worst - best)
+SPREAD_FACTOR = 2
+
+
+def best_ms(call, repeat):
+    call()  # Untimed: lazy imports and memoized lookups
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def load_measures(data_dir, repeat):
+    load_ms = best_ms(lambda: data_loader.load_data(data_dir), repeat)
+    tracemalloc.start()
+    try:
+        data_loader.load_data(data_dir)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'load_data ms': load_ms, 'load_data peak MiB': peak / 2**20}
+
+
+def callback_grid(app, dataset):
+    """(callback name, args) for every server callback over the input grid."""
+    year = int(dataset.yearly['Year'].max())
+    insurer = dataset.insurers[0]
+    province = dataset.values('province', 'Province')[0]
+    grid = []
+    for bob_toggle in ['BOB', 'insurer']:
+        selection = (bob_toggle, insurer)
+        grid += [
+            ('update_insurer_selection', (bob_toggle,)),
+            ('update_latest_year_summary', selection),
+            ('update_annual_trends', (app.default_annual_metrics,) + selection),
+            ('update_growth_rates', (app.default_growth_metrics,) + selection),
+            ('update_generic_table', (year,) + selection + ((0, 10, [], '', GENERIC_TABLE_COLUMNS)
+                                                            if app.TABLE_PAGING else ())),
+        ]
+        for metric in GRID_METRICS:
+            grid += [
+                ('update_province_bar', (year, metric) + selection),
+                ('update_top_provinces_trend', (metric,) + selection),
+                ('update_province_trend', (province, metric) + selection),
+                ('update_therapy_movement', (metric, year) + selection + (None,)),
+                ('update_therapy_ranking', (metric,) + selection + (None,)),
+            ]
+            for compare_years in ([], [year - 1, year - 2]):
+                grid += [
+                    ('update_generic_bar', (year, metric, compare_years) + selection + (None,)),
+                    ('update_therapy_top10', (metric, year, compare_years) + selection + (None,)),
+                ]
+    return grid
+
+
+def callback_measures(data_dir, repeat):
+    import app
+
+    dataset = app.datastore.load(data_dir, lazy=False)
+    per_callback = {}
+    for name, args in callback_grid(app, dataset):
+        callback = getattr(app, name)
+        per_callback.setdefault(name, []).append(best_ms(lambda: callback(*args), repeat))
+    # Mean over the grid of each input's best time
+    return {f"{name} ms": statistics.fmean(times) for name, times in per_callback.items()}
+
+
+def run_scale(scale, repeat, runs):
+    """Row counts and each measure's best and worst over ``runs`` measurements."""
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = write_dataset(tmp, **SCALES[scale])
+        for _ in range(runs):
+            measures = load_measures(tmp, repeat)
+            measures.update(callback_measures(tmp, repeat))
+            samples.append(measures)
+    return {'rows': rows, 'runs': runs, 'measures': {measure: {'best': min(sample[measure] for sample in samples),
+                                                 'worst': max(sample[measure] for sample in samples)}
+                                       for measure in samples[0]}}
+
+
+def limit(recorded, tolerance):
+    best, worst = recorded['best'], recorded['worst']
+    return worst + max(tolerance * best, SPREAD_FACTOR * (worst - best), SLACK)
+
+
+def regressions(results, baselines, tolerance):
+    found = []
+    for scale, result in results.items():
+        baseline = baselines.get('scales', {}).get(scale)
+        if baseline is None:
+            continue
+        for measure, value in result['measures'].items():
+            recorded = baseline['measures'].get(measure)
+            if recorded is None:
+                continue
+            value = value['best']
+            if value > limit(recorded, tolerance):
+                found.append(f"{scale}: {measure} {value:.1f} over the limit {limit(recorded, tolerance):.1f} "
+                             f"(recorded {recorded['best']:.1f}-{recorded['worst']:.1f})")
+    return found
+
+
+def print_curves(results):
+    scales = list(results)
+    print(f"{'measure':<34}" + ''.join(f"{scale:>12}" for scale in scales))
+    print(f"{'generic rows':<34}" + ''.join(f"{results[scale]['rows']['generic']:>12,}" for scale in scales))
+    for measure in results[scales[0]]['measures']:
+        print(f"{measure:<34}" + ''.join(f"{results[scale]['measures'][measure]['best']:>12.1f}" for scale in scales))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure load and callback cost across data scales.")
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=['small', 'medium'])
+    parser.add_argument('--repeat', type=int, default=7, help="timed calls per measure; the fastest counts")
+    parser.add_argument('--runs', type=int,
+                        help="measurements per scale (default 5 with --update-baselines, else 1)")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="minimum margin over the worst recorded value, as a fraction of the best")
+    parser.add_argument('--baselines', type=Path, default=BASELINES)
+    parser.add_argument('--update-baselines', action='store_true',
+                        help="store these results as the baselines instead of checking them")
+    args = parser.parse_args(argv)
+
+    runs = args.runs or (5 if args.update_baselines else 1)
+    results = {scale: run_scale(scale, args.repeat, runs) for scale in args.scales}
+    print_curves(results)
+
+    baselines = json.loads(args.baselines.read_text()) if args.baselines.exists() else {}
+    if args.update_baselines:
+        baselines.setdefault('scales', {}).update(results)
+        baselines['machine'] = {'python': platform.python_version(), 'cpus': os.cpu_count(),
+                                'platform': platform.platform()}
+        args.baselines.parent.mkdir(parents=True, exist_ok=True)
+        args.baselines.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"\nBaselines written to {args.baselines}")
+        return 0
+
+    found = regressions(results, baselines, args.tolerance)
+    if not baselines:
+        print(f"\nNo baselines at {args.baselines}; run with --update-baselines to record them")
+    for line in found:
+        print(f"REGRESSION {line}")
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
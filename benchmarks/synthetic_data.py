@@ -0,0 +1,116 @@
+"""Seeded synthetic data in the four source CSV schemas, at any scale.
+
+Every insurer has a row for every year and every province, generic and
+therapy class. Popularity follows a Zipf-like curve, so the top-N charts
+rank a stable head over a long tail, and each item grows at its own rate
+from year to year. BOB rows are the sum over insurers.
+
+    python -m benchmarks.synthetic_data OUT_DIR [--insurers 20] [--years 7] [--provinces 13]
+                                                [--generics 1000] [--classes 200] [--seed 0]
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from benchmarks.ingest_throughput import PROVINCES
+
+FIRST_YEAR = 2018
+
+# Source CSVs list the dimension column after Year and Insurer last
+COLUMNS = {
+    name: ['Year'] + data_loader.DIMENSIONS[name] + ['Claimants', 'Volumes', 'Cost', 'Insurer']
+    for name in data_loader.SOURCES
+}
+
+
+def names(prefix, count, known=()):
+    known = list(known)[:count]
+    return known + [f"{prefix} {i}" for i in range(len(known) + 1, count + 1)]
+
+
+def insurer_codes(count):
+    # Numeric codes like the bundled extract ('11', '12', ...)
+    return [str(11 + i) for i in range(count)]
+
+
+def dimension_rows(rng, insurers, years, items):
+    """Claimants/Volumes/Cost for every (insurer, year, item), insurer-major."""
+    popularity = 1.0 / np.arange(1, len(items) + 1) ** 0.8
+    popularity = rng.permutation(popularity)
+    share = rng.dirichlet(np.full(len(insurers), 2.0))
+    growth = rng.normal(0.04, 0.05, len(items))
+    year_index = np.arange(len(years))
+
+    # insurers x years x items
+    base = 50_000 * share[:, None, None] * popularity[None, None, :]
+    trend = (1 + growth[None, None, :]) ** year_index[None, :, None]
+    noise = rng.lognormal(0.0, 0.1, (len(insurers), len(years), len(items)))
+    claimants = np.maximum(np.rint(base * trend * noise), 1).astype(np.int64)
+    volumes = claimants * rng.integers(1, 9, claimants.shape)
+    unit_cost = rng.gamma(4.0, 12.0, len(items))
+    cost = np.rint(volumes * unit_cost[None, None, :] * rng.lognormal(0.0, 0.05, claimants.shape)).astype(np.int64)
+
+    grid = pd.MultiIndex.from_product([insurers, years, items], names=['Insurer', 'Year', 'Item'])
+    return pd.DataFrame({'Claimants': claimants.ravel(), 'Volumes': volumes.ravel(), 'Cost': cost.ravel()},
+                        index=grid).reset_index()
+
+
+def with_bob(df, keys):
+    bob = df.groupby(keys, sort=False)[['Claimants', 'Volumes', 'Cost']].sum().reset_index()
+    bob['Insurer'] = 'BOB'
+    return pd.concat([bob, df], ignore_index=True)
+
+
+def generate(insurers=20, years=7, provinces=13, generics=1000, classes=200, seed=0):
+    """Return {dataset name: source frame} for the given scale."""
+    rng = np.random.default_rng(seed)
+    insurer_list = insurer_codes(insurers)
+    year_list = list(range(FIRST_YEAR, FIRST_YEAR + years))
+    items = {
+        'province': names('Province', provinces, PROVINCES),
+        'generic': names('Generic', generics),
+        'therapy': names('Class', classes),
+    }
+
+    frames = {}
+    for name, dimension_items in items.items():
+        dimension = data_loader.DIMENSIONS[name][0]
+        df = dimension_rows(rng, insurer_list, year_list, dimension_items).rename(columns={'Item': dimension})
+        frames[name] = with_bob(df, ['Year', dimension])[COLUMNS[name]]
+    # The annual extract is the province breakdown summed per insurer-year
+    yearly = frames['province'].groupby(['Insurer', 'Year'], sort=False)[['Claimants', 'Volumes', 'Cost']].sum()
+    frames['yearly'] = yearly.reset_index()[COLUMNS['yearly']]
+    return frames
+
+
+def write_dataset(directory, **scale):
+    """Write the four source CSVs for ``scale`` into ``directory``; return their row counts."""
+    os.makedirs(directory, exist_ok=True)
+    frames = generate(**scale)
+    for name, filename in data_loader.SOURCES.items():
+        frames[name].to_csv(os.path.join(directory, filename), index=False)
+    return {name: len(df) for name, df in frames.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write seeded synthetic source CSVs.")
+    parser.add_argument('out_dir')
+    parser.add_argument('--insurers', type=int, default=20)
+    parser.add_argument('--years', type=int, default=7)
+    parser.add_argument('--provinces', type=int, default=13)
+    parser.add_argument('--generics', type=int, default=1000)
+    parser.add_argument('--classes', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows = write_dataset(args.out_dir, insurers=args.insurers, years=args.years, provinces=args.provinces,
+                         generics=args.generics, classes=args.classes, seed=args.seed)
+    for name, count in rows.items():
+        print(f"{data_loader.SOURCES[name]:<14} {count:>12,} rows")
+
+
+if __name__ == '__main__':
+    main()
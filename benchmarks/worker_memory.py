@@ -0,0 +1,95 @@
+"""Per-worker unique memory of gunicorn workers with and without preload mode.
+
+Starts ``gunicorn app:server`` twice (plain, then ``--preload`` with
+TREND_PRELOAD=1), drives a batch of callbacks so every worker touches the
+data, and reads each worker's private (unshared) and proportional memory
+from /proc. Linux only.
+
+Both runs hold the same data and serve the same callbacks: the plain run
+loads every frame at boot (TREND_LAZY_LOAD=0), as preload mode does, and
+the callbacks read the province, generic and therapy frames.
+
+    python -m benchmarks.worker_memory [--workers 4] [--requests 200]
+"""
+import argparse
+from pathlib import Path
+
+from benchmarks.dash_client import DashClient, free_port, generic_table_callback, start_gunicorn, stop
+
+YEARS = [2018, 2021, 2024]
+
+
+def worker_pids(master_pid):
+    children = Path(f'/proc/{master_pid}/task/{master_pid}/children').read_text()
+    return [int(pid) for pid in children.split()]
+
+
+def memory_kb(pid):
+    # smaps_rollup sums every mapping; Private_* pages belong to this process only
+    fields = {}
+    for line in Path(f'/proc/{pid}/smaps_rollup').read_text().splitlines()[1:]:
+        key, value = line.split(':', 1)
+        fields[key] = int(value.split()[0])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'uss': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def exercise(client, requests):
+    # Cheap but data-touching callbacks, one per tab: generic table, province bar, therapy top 10
+    for i in range(requests):
+        year = YEARS[i % len(YEARS)]
+        client.callback(*generic_table_callback(year, 'BOB', None))
+        client.callback([('province-bar-graph', 'figure')],
+                        [('province-year-dropdown', 'value', year),
+                         ('province-metric-dropdown', 'value', 'Cost'),
+                         ('bob-toggle', 'value', 'BOB'),
+                         ('insurer-dropdown', 'value', None)])
+        client.callback([('therapy-top10-graph', 'figure'), ('therapy-top10-signature', 'data')],
+                        [('therapy-metric-dropdown', 'value', 'Cost'),
+                         ('therapy-year-dropdown', 'value', year),
+                         ('therapy-compare-years-dropdown', 'value', []),
+                         ('bob-toggle', 'value', 'BOB'),
+                         ('insurer-dropdown', 'value', None)],
+                        [('therapy-top10-signature', 'data', None)])
+
+
+def measure(workers, requests, preload):
+    port = free_port()
+    extra_args = ['--preload'] if preload else []
+    # Every frame in every worker either way, so only the sharing differs
+    env = {'TREND_PRELOAD': '1' if preload else '0', 'TREND_LAZY_LOAD': '0'}
+    process = start_gunicorn(port, workers=workers, extra_args=extra_args, env=env)
+    try:
+        client = DashClient(f'http://127.0.0.1:{port}')
+        client.wait_ready()
+        exercise(client, requests)
+        return [memory_kb(pid) for pid in worker_pids(process.pid)]
+    finally:
+        stop(process)
+
+
+def summarize(label, samples):
+    count = len(samples)
+    average = {key: sum(sample[key] for sample in samples) / count for key in ('rss', 'pss', 'uss')}
+    print(f"{label:<10} {count:>7} {average['rss'] / 1024:>10.1f} "
+          f"{average['pss'] / 1024:>10.1f} {average['uss'] / 1024:>10.1f}")
+    return average
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure per-worker memory with and without preload.")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<10} {'workers':>7} {'RSS MiB':>10} {'PSS MiB':>10} {'USS MiB':>10}")
+    plain = summarize('default', measure(args.workers, args.requests, preload=False))
+    shared = summarize('preload', measure(args.workers, args.requests, preload=True))
+    print(f"Unique memory per worker: {plain['uss'] / 1024:.1f} -> {shared['uss'] / 1024:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import snapshot
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the aggregated claims extracts
+DATA_DIR = os.environ.get("TREND_DATA_DIR", "data")
+
+# Keep dimensions as categoricals and downcast metrics (see compact_frames)
+COMPACT = os.environ.get("TREND_COMPACT_DATA", "0") == "1"
+
+# Hand frames to forked gunicorn workers read-only (see freeze_frames)
+PRELOAD = os.environ.get("TREND_PRELOAD", "0") == "1"
+
+# Largest rounding error accepted when downcasting float metrics; the
+# dashboard never shows more than two decimals
+FLOAT_TOLERANCE = 0.005
+
+# Dataset name -> source file inside DATA_DIR
+SOURCES = {
+    'yearly': 'annual.csv',
+    'province': 'province.csv',
+    'generic': 'generic.csv',
+    'therapy': 'therapy.csv',
+}
+
+# Dataset name -> dimension columns besides Insurer and Year
+DIMENSIONS = {
+    'yearly': [],
+    'province': ['Province'],
+    'generic': ['Generic_Name'],
+    'therapy': ['Therapy_Class'],
+}
+
+DIMENSIONS_COLUMNS = [column for keys in DIMENSIONS.values() for column in keys]
+
+GROWTH_BASE_METRICS = ['Claimants', 'Volumes', 'Cost',
+                       'Cost_Per_Claimant', 'Cost_Per_Volume', 'Claims_Per_Claimant']
+
+# Ranked within each insurer-year for datasets with a dimension (see add_ranks)
+RANK_METRICS = GROWTH_BASE_METRICS
+
+
+def source_paths(data_dir=DATA_DIR):
+    return {name: os.path.join(data_dir, filename) for name, filename in SOURCES.items()}
+
+
+def read_source(data_dir, name):
+    # Parse one raw CSV extract
+    return pd.read_csv(os.path.join(data_dir, SOURCES[name]), dtype={'Insurer': str})
+
+
+def add_derived_metrics(df):
+    df['Cost_Per_Claimant'] = df['Cost'] / df['Claimants']
+    df['Cost_Per_Volume'] = df['Cost'] / df['Volumes']
+    df['Claims_Per_Claimant'] = df['Volumes'] / df['Claimants']
+    return df
+
+
+def list_insurers(yearly_df):
+    insurers = sorted(yearly_df['Insurer'].unique().tolist())
+    insurers.remove('BOB')  # Remove BOB from the list to handle it separately
+    return insurers
+
+
+def add_growth_rates(df, keys):
+    # Year-over-year growth (%) of every base metric within each Insurer x keys series
+    ordered = df.sort_values('Year', kind='stable')
+    growth = ordered.groupby(['Insurer'] + keys, sort=False)[GROWTH_BASE_METRICS].pct_change() * 100
+    growth.columns = [f'{metric}_Growth' for metric in GROWTH_BASE_METRICS]
+    return df.join(growth)
+
+
+def add_ranks(df):
+    # Rank of every metric within each insurer-year (1 = largest); ties keep row order
+    ranks = df.groupby(['Insurer', 'Year'], observed=True)[RANK_METRICS].rank(
+        method='first', ascending=False, na_option='bottom')
+    ranks.columns = [f'{metric}_Rank' for metric in RANK_METRICS]
+    return df.join(ranks.astype(np.int32))
+
+
+def add_derived_columns(df, name):
+    df = add_growth_rates(add_derived_metrics(df), DIMENSIONS[name])
+    if DIMENSIONS[name]:
+        df = add_ranks(df)
+    return df
+
+
+def order_yearly(yearly_df):
+    # BOB first, then insurers alphabetically, each in year order
+    order = np.lexsort((yearly_df['Year'], yearly_df['Insurer'], yearly_df['Insurer'] != 'BOB'))
+    return yearly_df.iloc[order]
+
+
+def build_frame(data_dir, name):
+    # Parse one CSV and compute every derived column the callbacks use
+    df = add_derived_columns(read_source(data_dir, name), name)
+    if name == 'yearly':
+        df = order_yearly(df)
+    return df
+
+
+def build_frames(data_dir=DATA_DIR, names=None):
+    return {name: build_frame(data_dir, name) for name in names or SOURCES}
+
+
+def shared_categories(frames, existing=None):
+    # One dictionary per dimension column, shared by every frame that has it.
+    # ``existing`` dtypes (from frames loaded earlier) are reused when they
+    # already cover every value.
+    existing = existing or {}
+    values = {}
+    for df in frames.values():
+        for column in ['Insurer'] + DIMENSIONS_COLUMNS:
+            if column in df.columns:
+                values.setdefault(column, set()).update(df[column].dropna().unique().tolist())
+    dtypes = {}
+    for column, found in values.items():
+        known = existing.get(column)
+        if known is not None and found <= set(known.categories):
+            dtypes[column] = known
+        else:
+            dtypes[column] = pd.CategoricalDtype(sorted(found | set(known.categories if known is not None else ())))
+    return dtypes
+
+
+def downcast(series):
+    if series.dtype.kind in 'iu':
+        return pd.to_numeric(series, downcast='integer')
+    if series.dtype.kind == 'f' and series.dtype.itemsize > 4:
+        narrow = series.astype(np.float32)
+        error = (narrow.astype(series.dtype) - series).abs().max()
+        if not error > FLOAT_TOLERANCE:  # NaN when the column is all NaN
+            return narrow
+    return series
+
+
+def compact_frames(frames, categories=None):
+    """Dimension columns as shared categoricals and metrics in the smallest safe dtype."""
+    dtypes = shared_categories(frames, categories)
+    compacted = {}
+    for name, df in frames.items():
+        compacted[name] = pd.DataFrame(
+            {column: (df[column].astype(dtypes[column]) if column in dtypes else downcast(df[column]))
+             for column in df.columns},
+            index=df.index,
+        )
+    return compacted
+
+
+def freeze_array(array):
+    # Read-only arrays are never written after fork, so their pages stay shared
+    if array.flags.writeable:
+        array = array.copy()
+        array.flags.writeable = False
+    return array
+
+
+def freeze_frames(frames):
+    """Rebuild every column on its own read-only NumPy array.
+
+    Meant for gunicorn --preload: the master loads once and forked workers
+    share the pages. String columns must already be categoricals so no
+    per-row Python objects (and their refcounts) are left to dirty pages.
+    """
+    frozen = {}
+    for name, df in frames.items():
+        data = {}
+        for column in df.columns:
+            values = df[column].array
+            if isinstance(values, pd.Categorical):
+                codes = freeze_array(np.asarray(values.codes))
+                data[column] = pd.Categorical.from_codes(codes, dtype=values.dtype)
+            else:
+                data[column] = freeze_array(np.asarray(values))
+        frozen[name] = pd.DataFrame(data, index=df.index, copy=False)
+    return frozen
+
+
+def frame_memory(frames):
+    return {name: int(df.memory_usage(index=True, deep=True).sum()) for name, df in frames.items()}
+
+
+def read_frames(data_dir=DATA_DIR, names=None, keep_categories=False):
+    # Prefer the binary snapshot; parse the CSVs only when it is missing or stale
+    frames = snapshot.load_snapshot(source_paths(data_dir), snapshot.snapshot_dir(data_dir),
+                                    names=names, keep_categories=keep_categories)
+    if frames is None:
+        logger.info("No fresh snapshot in %s, parsing CSV sources", data_dir)
+        frames = build_frames(data_dir, names)
+    return frames
+
+
+def column_values(data_dir, name, column):
+    """Sorted distinct values of ``column`` in frame ``name``, without building the frame."""
+    values = snapshot.column_values(source_paths(data_dir), snapshot.snapshot_dir(data_dir), name, column)
+    if values is None:
+        values = pd.read_csv(os.path.join(data_dir, SOURCES[name]), usecols=[column])[column].dropna().unique()
+    return sorted(values)
+
+
+def prepare_frames(frames, compact=COMPACT, freeze=PRELOAD, categories=None):
+    # Apply the configured in-memory representation
+    if compact or freeze:
+        frames = compact_frames(frames, categories)
+    if freeze:
+        frames = freeze_frames(frames)
+    return frames
+
+
+def load_frames(data_dir=DATA_DIR, compact=COMPACT, freeze=PRELOAD):
+    return prepare_frames(read_frames(data_dir, keep_categories=compact or freeze), compact, freeze)
+
+
+def insurer_digest(df, name):
+    """Order-independent checksum of each insurer's source rows."""
+    columns = ['Insurer', 'Year'] + DIMENSIONS[name] + ['Claimants', 'Volumes', 'Cost']
+    hashes = pd.util.hash_pandas_object(df[columns], index=False)
+    return hashes.groupby(df['Insurer'].to_numpy()).sum()
+
+
+def refresh_frame(data_dir, name, previous, previous_digest):
+    """Re-read one CSV, recomputing growth and ranks only for insurers whose rows changed.
+
+    ``previous`` is the frame currently served and ``previous_digest`` the
+    insurer_digest() it was built from. Returns the new frame (before
+    prepare_frames) and its digest.
+    """
+    df = read_source(data_dir, name)
+    digest = insurer_digest(df, name)
+    same = digest.reindex(previous_digest.index) == previous_digest
+    unchanged = same.index[same.to_numpy()]
+    changed_rows = df[~df['Insurer'].isin(unchanged)]
+    kept_rows = previous[previous['Insurer'].isin(unchanged)]
+    logger.info("Refreshing %s: %d of %d insurers changed", name,
+                changed_rows['Insurer'].nunique(), len(digest))
+    changed_rows = add_derived_columns(changed_rows.copy(), name)
+    parts = [part for part in (kept_rows, changed_rows) if len(part)] or [changed_rows]
+    df = pd.concat(parts, ignore_index=True)
+    if name == 'yearly':
+        df = order_yearly(df)
+    return df, digest
+
+
+def load_data(data_dir=DATA_DIR, compact=COMPACT, freeze=PRELOAD):
+    frames = load_frames(data_dir, compact, freeze)
+    insurers = list_insurers(frames['yearly'])
+    return frames['yearly'], frames['province'], frames['generic'], frames['therapy'], insurers
@@ -0,0 +1,279 @@
+"""The dataset currently served by the dashboard, and its hot reload.
+
+Callbacks call ``current()`` once per request and use that Dataset for the
+whole request. A reload builds a complete new Dataset off the request path
+and then swaps the module reference in one assignment, so a callback sees
+either the old data or the new data, never a mix.
+
+Only the annual frame is loaded up front. The province, generic and therapy
+frames load on first use by their tab's callbacks (TREND_LAZY_LOAD=0 loads
+everything at startup; preload mode always does). TREND_WARM_DATA=1 loads
+the rest in a background thread once the worker serves its first request.
+
+Set TREND_RELOAD_INTERVAL (seconds) to poll the data directory and reload
+when a source file changes. Only insurers whose rows changed get their
+growth columns recomputed.
+"""
+import hashlib
+import itertools
+import json
+import logging
+import os
+import threading
+
+import data_loader
+from metrics import timed_data
+from partitions import InsurerContext, PartitionIndex
+from rankings import RankingStore
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the data directory; 0 disables hot reload
+RELOAD_INTERVAL = float(os.environ.get("TREND_RELOAD_INTERVAL", "0"))
+
+# Load the tab datasets on first use; forked workers can't share lazily loaded pages
+LAZY_LOAD = os.environ.get("TREND_LAZY_LOAD", "1") == "1" and not data_loader.PRELOAD
+
+# Load the remaining datasets in the background after the first request
+WARM_DATA = os.environ.get("TREND_WARM_DATA", "0") == "1"
+
+EAGER_FRAMES = ['yearly']
+
+
+class Dataset:
+    """Frames, their partition index and rankings, and the sources they came from.
+
+    A Dataset never changes what it serves: frames missing at construction
+    are loaded once, under a lock, from the same data directory.
+    """
+
+    def __init__(self, data_dir, sources, version, frames=None, digests=None):
+        self.data_dir = data_dir
+        self.sources = sources
+        self.version = version
+        # Same sources and representation give the same key in every worker
+        fingerprint = [sorted(sources.items()), data_loader.COMPACT or data_loader.PRELOAD]
+        self.cache_key = hashlib.sha256(json.dumps(fingerprint).encode()).hexdigest()[:16]
+        self.frames = {}
+        self.digests = dict(digests or {})
+        self.partitions = PartitionIndex({})
+        self.rankings = RankingStore()
+        self._insurers = None
+        self._contexts = {}
+        self._values = {}
+        self._load_lock = threading.Lock()
+        self._install(frames or {})
+
+    def _install(self, frames):
+        for name, df in frames.items():
+            self.partitions.add(name, df)
+            if data_loader.DIMENSIONS[name]:
+                self.rankings.add(name, df)
+        # Publish frames last so other threads only see fully indexed ones
+        self.frames.update(frames)
+
+    def _categories(self):
+        # Categorical dtypes already in use, so lazily loaded frames share them
+        return {column: df[column].dtype for df in self.frames.values() for column in df.columns
+                if df[column].dtype == 'category'}
+
+    def load(self, names):
+        missing = [name for name in names if name not in self.frames]
+        if not missing:
+            return
+        with self._load_lock:
+            missing = [name for name in missing if name not in self.frames]
+            if not missing:
+                return
+            compact = data_loader.COMPACT or data_loader.PRELOAD
+            raw = data_loader.read_frames(self.data_dir, missing, keep_categories=compact)
+            for name, df in raw.items():
+                self.digests[name] = data_loader.insurer_digest(df, name)
+            self._install(data_loader.prepare_frames(raw, categories=self._categories()))
+            logger.info("Loaded %s for dataset version %d", ', '.join(missing), self.version)
+
+    @timed_data
+    def frame(self, name):
+        if name not in self.frames:
+            self.load([name])
+        return self.frames[name]
+
+    @timed_data
+    def by_insurer(self, name, insurer):
+        self.frame(name)
+        return self.partitions.by_insurer(name, insurer)
+
+    @timed_data
+    def by_year(self, name, insurer, year):
+        self.frame(name)
+        return self.partitions.by_year(name, insurer, year)
+
+    @timed_data
+    def top(self, name, insurer, year, metric, n):
+        self.frame(name)
+        return self.rankings.top(name, insurer, year, metric, n)
+
+    def values(self, name, column):
+        """Sorted distinct values of a column; read without loading the frame if it isn't loaded."""
+        key = (name, column)
+        if key not in self._values:
+            if name in self.frames:
+                self._values[key] = sorted(self.frames[name][column].dropna().unique())
+            else:
+                self._values[key] = data_loader.column_values(self.data_dir, name, column)
+        return self._values[key]
+
+    def context(self, insurer):
+        """The shared InsurerContext for ``insurer`` (one per insurer and Dataset)."""
+        context = self._contexts.get(insurer)
+        if context is None:
+            context = self._contexts.setdefault(insurer, InsurerContext(self, insurer))
+        return context
+
+    @property
+    def insurers(self):
+        if self._insurers is None:
+            self._insurers = data_loader.list_insurers(self.yearly)
+        return self._insurers
+
+    @property
+    def yearly(self):
+        return self.frame('yearly')
+
+    @property
+    def province(self):
+        return self.frame('province')
+
+    @property
+    def generic(self):
+        return self.frame('generic')
+
+    @property
+    def therapy(self):
+        return self.frame('therapy')
+
+
+_current = None
+_versions = itertools.count(1)
+_reload_lock = threading.Lock()
+_refresher = None
+_refresher_lock = threading.Lock()
+_warm_started = set()
+_warm_lock = threading.Lock()
+
+
+def current():
+    return _current
+
+
+def source_signature(data_dir):
+    # Cheap change detection: size and mtime of every source file
+    signature = {}
+    for name, path in data_loader.source_paths(data_dir).items():
+        stat = os.stat(path)
+        signature[name] = (stat.st_size, stat.st_mtime_ns)
+    return signature
+
+
+def load(data_dir=data_loader.DATA_DIR, lazy=LAZY_LOAD):
+    """Load the dataset from scratch (snapshot or CSVs) and make it current."""
+    global _current
+    with _reload_lock:
+        dataset = Dataset(data_dir, source_signature(data_dir), next(_versions))
+        dataset.load(EAGER_FRAMES if lazy else list(data_loader.SOURCES))
+        _current = dataset
+    return _current
+
+
+def reload(data_dir=data_loader.DATA_DIR):
+    """Rebuild from changed sources and swap the result in. Returns True if swapped.
+
+    Frames the current dataset has not loaded yet stay lazy in the new one.
+    """
+    global _current
+    with _reload_lock:
+        previous = _current
+        if previous is None:
+            raise RuntimeError("datastore.load() must run before reload()")
+        sources = source_signature(data_dir)
+        if sources == previous.sources:
+            return False
+        raw, digests = {}, {}
+        for name in list(previous.frames):
+            raw[name], digests[name] = data_loader.refresh_frame(
+                data_dir, name, previous.frames[name], previous.digests[name])
+        dataset = Dataset(data_dir, sources, next(_versions), data_loader.prepare_frames(raw), digests)
+        _current = dataset
+    logger.info("Swapped in dataset version %d", dataset.version)
+    return True
+
+
+def warm_up():
+    """Load the current dataset's remaining frames in a background thread.
+
+    Enabled by TREND_WARM_DATA; runs once per worker process and dataset version.
+    """
+    if not WARM_DATA:
+        return None
+    dataset = _current
+    key = (os.getpid(), dataset.version)
+    with _warm_lock:
+        if key in _warm_started:
+            return None
+        _warm_started.add(key)
+    thread = threading.Thread(target=dataset.load, args=(list(data_loader.SOURCES),),
+                              name='data-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+class Refresher(threading.Thread):
+    """Polls the source files and reloads once a change has settled."""
+
+    def __init__(self, data_dir, interval):
+        super().__init__(name='data-refresher', daemon=True)
+        self.data_dir = data_dir
+        self.interval = interval
+        self.pid = os.getpid()
+        self._stopped = threading.Event()
+
+    def run(self):
+        pending = None
+        while not self._stopped.wait(self.interval):
+            try:
+                sources = source_signature(self.data_dir)
+            except OSError:
+                continue  # A file is being replaced; look again next time
+            if sources == _current.sources:
+                pending = None
+                continue
+            # Wait for one unchanged interval so half-written files are skipped
+            if sources != pending:
+                pending = sources
+                continue
+            try:
+                reload(self.data_dir)
+            except Exception:
+                logger.exception("Reloading data from %s failed; keeping version %d",
+                                 self.data_dir, _current.version)
+            pending = None
+
+    def stop(self):
+        self._stopped.set()
+
+
+def start_refresher(data_dir=data_loader.DATA_DIR, interval=RELOAD_INTERVAL):
+    """Start the refresher in this process if hot reload is enabled.
+
+    Threads don't survive fork, so this is safe (and cheap) to call from
+    every request: each gunicorn worker ends up with its own refresher.
+    """
+    global _refresher
+    if interval <= 0:
+        return None
+    if _refresher is None or _refresher.pid != os.getpid():
+        with _refresher_lock:
+            if _refresher is None or _refresher.pid != os.getpid():
+                _refresher = Refresher(data_dir, interval)
+                _refresher.start()
+    return _refresher
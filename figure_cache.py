@@ -0,0 +1,172 @@
+"""Memoized figures for the dashboard callbacks.
+
+The data only changes on reload and the inputs come from a handful of
+dropdowns, so the same figure is rebuilt over and over. ``cached_figure``
+keys each figure on the callback, its arguments and the data version
+(``Dataset.cache_key``, stable across workers), and keeps it in a bounded
+LRU with an optional TTL.
+
+TREND_FIGURE_CACHE_DIR adds a disk store shared by every worker on the host:
+figures are written there as Plotly JSON and read back on an in-process miss.
+
+    TREND_FIGURE_CACHE_SIZE   entries kept per process (0 disables the cache)
+    TREND_FIGURE_CACHE_TTL    seconds before an entry is rebuilt (0 = never)
+    TREND_FIGURE_CACHE_DIR    directory for the shared disk store (unset = off)
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import plotly.io as pio
+
+import datastore
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = int(os.environ.get("TREND_FIGURE_CACHE_SIZE", "512"))
+CACHE_TTL = float(os.environ.get("TREND_FIGURE_CACHE_TTL", "0"))
+CACHE_DIR = os.environ.get("TREND_FIGURE_CACHE_DIR")
+
+# The disk store is pruned back to this many files every PRUNE_EVERY writes
+DISK_MAX_ENTRIES = 4 * CACHE_SIZE
+PRUNE_EVERY = 64
+
+
+class FigureCache:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL, directory=CACHE_DIR):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get_or_build(self, key, build):
+        """Return the figure cached under ``key``, calling ``build()`` on a miss."""
+        if self.maxsize <= 0:
+            return build()
+        figure = self.get(key)
+        if figure is None:
+            # Concurrent misses on one key may both build; the figures are identical
+            figure = build()
+            with self._lock:
+                self.misses += 1
+            self.put(key, figure)
+        return figure
+
+    def get(self, key):
+        """Return the figure cached under ``key`` in memory or on disk, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl <= 0 or time.monotonic() - entry[0] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        figure = self._read_disk(key)
+        if figure is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, figure)
+        return figure
+
+    def put(self, key, figure):
+        """Cache a figure built elsewhere, e.g. by the warm-up pool."""
+        self._write_disk(key, figure)
+        self._remember(key, figure)
+
+    def _remember(self, key, figure):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), figure)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'entries': len(self._entries), 'maxsize': self.maxsize}
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + '.json')
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            if self.ttl > 0 and time.time() - os.path.getmtime(path) >= self.ttl:
+                return None
+            with open(path) as f:
+                # Dash accepts the plain dict; no need to revalidate it as a go.Figure
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, figure):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(tmp, 'w') as f:
+                f.write(pio.to_json(figure, validate=False))
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("Could not write figure cache entry %s: %s", path, exc)
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        # Drop the least recently written files beyond DISK_MAX_ENTRIES
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+            entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+            for entry in entries[DISK_MAX_ENTRIES:]:
+                os.remove(entry.path)
+        except OSError:
+            pass  # Another worker is pruning too
+
+
+cache = FigureCache()
+
+
+def figure_key(callback, args):
+    """Cache key of ``callback(*args)`` for the current data version."""
+    name = f"{callback.__module__}.{callback.__qualname__}"
+    return f"{name}:{datastore.current().cache_key}:{json.dumps(args, default=str)}"
+
+
+def cached_figure(callback):
+    """Memoize a figure callback on its arguments and the current data version.
+
+    Goes between ``@app.callback`` and the function, so Dash registers the
+    cached wrapper.
+    """
+    @functools.wraps(callback)
+    def wrapper(*args):
+        return cache.get_or_build(figure_key(callback, args), lambda: callback(*args))
+
+    return wrapper
+
+
+def stats():
+    return cache.stats()
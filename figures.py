@@ -0,0 +1,214 @@
+"""Figure builders shared by the dashboard callbacks.
+
+Labels and hover text are left to Plotly templates (``texttemplate`` and
+``hovertemplate`` over ``customdata``) or built with vectorized string
+operations, and annotations are set in one layout update, so build time no
+longer grows with a Python loop per bar. Callbacks pick the rows; the
+builders only turn them into figures.
+"""
+import numpy as np
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+
+# Per-unit costs are shown in dollars and cents, everything else in whole numbers
+CURRENCY_METRICS = ['Cost_Per_Claimant', 'Cost_Per_Volume']
+
+COMPARE_COLORS = ['#28A745', '#FD7E14', '#6610F2', '#20C997']
+
+
+def metric_label(metric):
+    return metric.replace('_', ' ')
+
+
+def text_format(metric):
+    # d3 format of the value printed next to a bar
+    return '$,.2f' if metric in CURRENCY_METRICS else ',.0f'
+
+
+def hover_format(metric):
+    # d3 format of a value in hover text; total cost is in dollars too
+    if metric in CURRENCY_METRICS:
+        return '$,.2f'
+    return '$,.0f' if metric == 'Cost' else ',.0f'
+
+
+def as_strings(values):
+    return np.asarray(values, dtype=object).astype(str)
+
+
+def numbered_labels(names, start=1):
+    """'1. name', '2. name', ... for every entry of ``names``."""
+    ranks = np.arange(start, start + len(names)).astype(str)
+    return np.char.add(np.char.add(ranks, '. '), as_strings(names)).tolist()
+
+
+def annotations(x, y, text, **style):
+    """One annotation per (x, y, text), all sharing ``style``."""
+    return [dict(x=xi, y=yi, text=ti, **style)
+            for xi, yi, ti in zip(np.asarray(x).tolist(), np.asarray(y).tolist(), np.asarray(text).tolist())]
+
+
+def add_annotations(fig, new):
+    # A single layout update validates the whole batch once
+    fig.update_layout(annotations=list(fig.layout.annotations) + new)
+    return fig
+
+
+def top_cost_bar(top, comparisons, dimension, selected_metric, selected_year, compare_years, title, axis_title):
+    """Horizontal bars of the top items by cost, with comparison years and % of total cost.
+
+    ``top`` holds the selected year's rows, ordered for display, with a
+    Percent_of_Total column. ``comparisons`` is a list of (color index,
+    year, rows aligned with ``top``).
+    """
+    fig = go.Figure()
+
+    # Add bars for the selected year
+    fig.add_trace(go.Bar(
+        y=top[dimension],
+        x=top[selected_metric],
+        orientation='h',
+        name=f"{selected_year}",
+        marker=dict(color='#007BFF'),
+        texttemplate=f"%{{x:{text_format(selected_metric)}}}",
+        textposition='outside',
+        customdata=top['Percent_of_Total'],
+        hovertemplate=(f"%{{y}}<br>{selected_year}: %{{x:,.2f}}<br>"
+                       "% of Total Cost: %{customdata:.1f}%<extra></extra>")
+    ))
+
+    # Add comparison years
+    for i, year, year_data in comparisons:
+        fig.add_trace(go.Bar(
+            y=year_data[dimension],
+            x=year_data[selected_metric],
+            orientation='h',
+            name=f"{year}",
+            marker=dict(color=COMPARE_COLORS[i % len(COMPARE_COLORS)]),
+            opacity=0.7,
+            hovertemplate=f"%{{y}}<br>{year}: %{{x:,.2f}}<extra></extra>"
+        ))
+
+    # Always add markers for percentage of total cost
+    fig.add_trace(go.Scatter(
+        y=top[dimension],
+        x=top['Percent_of_Total'],
+        mode='markers+text',
+        name='% of Total Cost',
+        marker=dict(
+            symbol='circle',
+            size=12,
+            color='#DC3545'
+        ),
+        texttemplate='%{x:.1f}%',
+        textposition='middle right',
+        xaxis='x2'
+    ))
+
+    # Update layout with secondary x-axis
+    fig.update_layout(
+        xaxis2=dict(
+            title='% of Total Cost',
+            overlaying='x',
+            side='top',
+            range=[0, top['Percent_of_Total'].max() * 1.2],
+            showgrid=False
+        ),
+        title=title,
+        xaxis=dict(
+            title=metric_label(selected_metric),
+            showgrid=True
+        ),
+        yaxis=dict(
+            title=axis_title,
+            categoryorder='array',
+            categoryarray=top[dimension].tolist()
+        ),
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            y=1.02,
+            xanchor='right',
+            x=1
+        ),
+        margin=dict(l=20, r=20, t=80, b=20),
+        height=600,
+        barmode='group' if compare_years else 'relative'
+    )
+    return fig
+
+
+def ranking_bar(ranked, dimension, selected_metric, title, axis_title, prev_ranks=None):
+    """Bars of ``ranked`` (best first) labelled with their rank.
+
+    ``prev_ranks`` maps items to their rank in the previous year; changes
+    are marked with green/red arrows next to the bars.
+    """
+    colors = qualitative.Plotly
+    ranks = np.arange(1, len(ranked) + 1)
+    labels = numbered_labels(ranked[dimension])
+    values = ranked[selected_metric].to_numpy()
+
+    fig = go.Figure()
+
+    # Create the horizontal bar chart
+    fig.add_trace(go.Bar(
+        y=labels,
+        x=values,
+        orientation='h',
+        marker=dict(
+            color=[colors[i % len(colors)] for i in range(len(ranked))],
+            line=dict(width=1)
+        ),
+        texttemplate=f"%{{x:{text_format(selected_metric)}}}",
+        textposition='outside',
+        customdata=np.column_stack([ranks, as_strings(ranked[dimension])]),
+        hovertemplate=(f"Rank %{{customdata[0]}}: %{{customdata[1]}}<br>"
+                       f"{metric_label(selected_metric)}: %{{x:{hover_format(selected_metric)}}}<extra></extra>")
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis=dict(
+            title=metric_label(selected_metric),
+            showgrid=True
+        ),
+        yaxis=dict(
+            title=axis_title,
+            autorange="reversed"  # To show rank 1 at the top
+        ),
+        margin=dict(l=20, r=20, t=80, b=20),
+        height=600
+    )
+
+    if prev_ranks is not None:
+        # Rank changes from the previous year; items new to the list get no marker
+        change = prev_ranks.reindex(as_strings(ranked[dimension])).to_numpy(dtype=float) - ranks
+        moved = ~np.isnan(change) & (change != 0)
+        up = change[moved] > 0
+        arrows = annotations(values[moved] * 1.02,  # Slightly to the right of the bar
+                             np.asarray(labels, dtype=object)[moved],
+                             np.char.add(np.where(up, '▲ ', '▼ '), np.abs(change[moved]).astype(int).astype(str)),
+                             showarrow=False, align='left')
+        for arrow, color in zip(arrows, np.where(up, 'green', 'red').tolist()):
+            arrow['font'] = dict(color=color, size=12)
+        add_annotations(fig, arrows)
+    return fig
+
+
+def growth_annotations(years, values, growth):
+    """Growth labels ('4.2%') above every point after the first that has one."""
+    growth = np.asarray(growth, dtype=float)
+    keep = ~np.isnan(growth)
+    keep[:1] = False
+    return annotations(
+        np.asarray(years)[keep], np.asarray(values)[keep], np.char.mod('%.1f%%', growth[keep]),
+        showarrow=True,
+        arrowhead=4,
+        arrowsize=1,
+        arrowwidth=1,
+        arrowcolor="#636363",
+        ax=0,
+        ay=-30,
+        font=dict(size=10)
+    )
@@ -0,0 +1,83 @@
+"""Gunicorn settings for serving the dashboard.
+
+    gunicorn -c gunicorn.conf.py app:server
+
+Workers are sized from the cores this process may use (CPU affinity and the
+cgroup CPU quota, so a container limited to 2 CPUs on a 64-core host gets 2,
+not 64), with at least two so one can recycle while the other serves.
+
+Each worker runs gthread threads. Callbacks spend much of their time in
+pandas and in JSON encoding, and a second thread keeps probes and cheap
+callbacks moving while one request builds a large figure. Threads are safe
+with the shared DataFrames because a worker never changes them in place:
+a Dataset is fixed once built, lazily loaded frames are published under a
+lock after they are fully indexed, a reload swaps the whole Dataset in one
+assignment, and the figure cache and job store take their own locks.
+
+Workers are restarted after about MAX_REQUESTS requests, with jitter so they
+don't all restart together. This bounds slow growth from pandas and Plotly
+caches. With TREND_PRELOAD=1 the app loads once in the master and the
+workers share its memory. Without it each worker loads (and warms) its own
+copy within TIMEOUT. Application logs (startup phases, data loads, warm-up)
+go to stderr at TREND_LOG_LEVEL.
+
+    PORT                    port to listen on (default 8000)
+    WEB_CONCURRENCY         workers (default: available cores, at least 2)
+    TREND_THREADS           threads per worker (default 4)
+    TREND_MAX_REQUESTS      requests before a worker is recycled (default 1000; 0: never)
+    TREND_TIMEOUT           seconds a request or a booting worker may take (default 60)
+    TREND_LOG_LEVEL         application log level (default INFO)
+"""
+import math
+import os
+
+
+def available_cores():
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    # cgroup v2 quota: "<quota> <period>" or "max <period>"
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cores = min(cores, max(math.ceil(int(quota) / int(period)), 1))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '0')) or max(available_cores(), 2)
+worker_class = 'gthread'
+threads = int(os.environ.get('TREND_THREADS', '4'))
+
+max_requests = int(os.environ.get('TREND_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+# Above TREND_WARMUP_BUDGET (default 20 s), so a warming worker isn't killed
+timeout = int(os.environ.get('TREND_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+
+# Load once in the master and share the pages (see data_loader.PRELOAD)
+preload_app = os.environ.get('TREND_PRELOAD', '0') == '1'
+
+# Heartbeat files on tmpfs; a disk-backed /tmp can stall them in containers
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Gunicorn's default logging (access log on stdout), plus the app's modules on stderr
+logconfig_dict = {
+    'root': {'level': os.environ.get('TREND_LOG_LEVEL', 'INFO'), 'handlers': ['error_console']},
+    'loggers': {
+        'gunicorn.error': {'level': 'INFO', 'handlers': ['error_console'], 'propagate': False},
+        'gunicorn.access': {'level': 'INFO', 'handlers': ['console'], 'propagate': False},
+    },
+}
+
+
+def when_ready(server):
+    server.log.info("Serving with %d %s workers x %d threads, recycled every ~%d requests",
+                    workers, worker_class, threads, max_requests)
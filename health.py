@@ -0,0 +1,80 @@
+"""Liveness and readiness endpoints for the load balancer and the platform.
+
+* ``/healthz`` answers 200 while the worker process serves requests.
+* ``/readyz`` answers 200 once this worker can serve the dashboard at full
+  speed: the dataset is loaded, every frame is in memory when
+  TREND_WARM_DATA is on, and the figure cache warm-up (TREND_WARMUP) has run.
+  Until then it answers 503. Either way the body lists which checks passed.
+
+Probes carry no credentials, so both answer ahead of the dashboard's basic
+auth, as WSGI middleware around the Flask app. They report states and
+counts only, never data. Like any request, a probe starts the worker's
+background data threads (hot reload, TREND_WARM_DATA), so a fresh worker
+warms up even before users reach it.
+"""
+import json
+
+from werkzeug.wrappers import Response
+
+import data_loader
+import datastore
+
+LIVENESS_PATH = '/healthz'
+READINESS_PATH = '/readyz'
+
+# warmup.state when the app warms the figure cache (TREND_WARMUP), else None
+_warmup_state = None
+
+
+def readiness():
+    """(ready, details) for this worker."""
+    dataset = datastore.current()
+    loaded = sorted(dataset.frames) if dataset is not None else []
+    checks = {
+        'data': dataset is not None,
+        'frames': dataset is not None and (not datastore.WARM_DATA or len(loaded) == len(data_loader.SOURCES)),
+        'warmup': _warmup_state is None or _warmup_state['done'],
+    }
+    details = {
+        'ready': all(checks.values()),
+        'checks': checks,
+        'dataset_version': dataset.version if dataset is not None else None,
+        'frames': loaded,
+        'warmup': ({key: _warmup_state[key] for key in ('done', 'planned', 'cached', 'rendered')}
+                   if _warmup_state is not None else None),
+    }
+    return details['ready'], details
+
+
+def _json(body, status):
+    return Response(json.dumps(body), status=status, mimetype='application/json',
+                    headers={'Cache-Control': 'no-store'})
+
+
+class HealthMiddleware:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path == LIVENESS_PATH:
+            response = _json({'status': 'ok'}, 200)
+        elif path == READINESS_PATH:
+            if datastore.current() is not None:
+                datastore.start_refresher()
+                datastore.warm_up()
+            ready, details = readiness()
+            response = _json(details, 200 if ready else 503)
+        else:
+            return self.wsgi_app(environ, start_response)
+        return response(environ, start_response)
+
+
+def install(server, warmup_state=None):
+    """Answer the probes on ``server`` before any Flask hook (auth, metrics, compression) runs.
+
+    With ``warmup_state`` (warmup.state), readiness waits for the warm-up.
+    """
+    global _warmup_state
+    _warmup_state = warmup_state
+    server.wsgi_app = HealthMiddleware(server.wsgi_app)
@@ -0,0 +1,224 @@
+"""Stream line-level claim files into the four summary CSVs.
+
+Raw files hold one claim per line with at least these columns::
+
+    Claimant_ID, Insurer, Year, Province, Generic_Name, Therapy_Class, Cost
+
+(``Service_Date`` may stand in for ``Year``). Files are read in chunks and
+each chunk is reduced to per-group partial sums plus the distinct
+(group, claimant) pairs, so memory is bounded by the number of groups and
+distinct claimants rather than by the number of claim lines.
+
+With --workers N each file is cut into byte ranges at line boundaries
+(RANGE_BYTES at most; claim lines must not contain quoted newlines). Each
+worker process reads and parses its own range, reduces it chunk by chunk,
+and sends back only the merged partials, which the parent merges as they
+arrive.
+
+The output matches what data_loader reads: ``annual.csv``,
+``province.csv``, ``generic.csv`` and ``therapy.csv`` with
+Year, [dimension,] Claimants, Volumes, Cost, Insurer, including the 'BOB'
+(book of business) rows aggregated across insurers.
+
+    python ingest.py claims/*.csv --out data [--workers 4] [--chunksize 500000]
+"""
+import argparse
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from data_loader import DIMENSIONS, SOURCES
+
+RAW_COLUMNS = ['Claimant_ID', 'Insurer', 'Year', 'Province', 'Generic_Name', 'Therapy_Class', 'Cost']
+
+# Re-aggregate buffered partials once this many rows have piled up
+COMPACT_ROWS = 2_000_000
+
+# Largest byte range a worker reads and parses in one task
+RANGE_BYTES = 64 * 1024 * 1024
+
+
+def csv_options(path):
+    """read_csv keywords for a raw claims file: header names, used columns, dtypes."""
+    header = list(pd.read_csv(path, nrows=0).columns)
+    usecols = [column for column in RAW_COLUMNS + ['Service_Date'] if column in header]
+    missing = set(RAW_COLUMNS) - set(usecols) - ({'Year'} if 'Service_Date' in usecols else set())
+    if missing:
+        raise ValueError(f"{path} is missing columns: {sorted(missing)}")
+    dtypes = {'Claimant_ID': str, 'Insurer': str, 'Province': str,
+              'Generic_Name': str, 'Therapy_Class': str, 'Service_Date': str}
+    return {'names': header, 'usecols': usecols,
+            'dtype': {column: dtypes[column] for column in usecols if column in dtypes}}
+
+
+def read_chunks(path, chunksize):
+    options = csv_options(path)
+    yield from pd.read_csv(path, usecols=options['usecols'], dtype=options['dtype'], chunksize=chunksize)
+
+
+def byte_ranges(path, range_bytes=RANGE_BYTES):
+    """(start, end) offsets covering the data lines of ``path``, each ending at a newline."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + range_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def reduce_range(path, start, end, options, chunksize):
+    """Read, parse and reduce bytes [start, end) of ``path``; returns (partial, claim lines)."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = io.BytesIO(f.read(end - start))
+    aggregator = Aggregator()
+    rows = 0
+    for chunk in pd.read_csv(data, header=None, chunksize=chunksize, **options):
+        rows += len(chunk)
+        aggregator.add(reduce_chunk(chunk))
+    return aggregator.partial(), rows
+
+
+def reduce_chunk(chunk):
+    """Partial aggregates of one chunk: {dataset: (sums, claimant pairs)}."""
+    if 'Year' not in chunk.columns:
+        chunk = chunk.assign(Year=pd.to_datetime(chunk['Service_Date']).dt.year)
+    if (chunk['Insurer'] == 'BOB').any():
+        raise ValueError("'BOB' is reserved for the book-of-business totals")
+    # Distinct claimants only need identity, so keep an 8-byte hash of the id
+    chunk = chunk.assign(Claimant=pd.util.hash_array(chunk['Claimant_ID'].to_numpy(dtype=object)))
+
+    partial = {}
+    for name, keys in DIMENSIONS.items():
+        group = ['Insurer', 'Year'] + keys
+        sums = chunk.groupby(group, sort=False).agg(Volumes=('Cost', 'size'), Cost=('Cost', 'sum'))
+        pairs = chunk[group + ['Claimant']].drop_duplicates()
+        partial[name] = (sums.reset_index(), pairs)
+    return partial
+
+
+class Aggregator:
+    """Merges chunk partials and produces the summary frames."""
+
+    def __init__(self, compact_rows=COMPACT_ROWS):
+        self.compact_rows = compact_rows
+        self.sums = {name: [] for name in DIMENSIONS}
+        self.pairs = {name: [] for name in DIMENSIONS}
+        self.buffered = 0
+
+    def add(self, partial):
+        for name, (sums, pairs) in partial.items():
+            self.sums[name].append(sums)
+            self.pairs[name].append(pairs)
+            self.buffered += len(sums) + len(pairs)
+        if self.buffered > self.compact_rows:
+            self.compact()
+
+    def compact(self):
+        self.buffered = 0
+        for name, keys in DIMENSIONS.items():
+            group = ['Insurer', 'Year'] + keys
+            if self.sums[name]:
+                sums = pd.concat(self.sums[name], ignore_index=True)
+                self.sums[name] = [sums.groupby(group, sort=False, as_index=False)[['Volumes', 'Cost']].sum()]
+            if self.pairs[name]:
+                self.pairs[name] = [pd.concat(self.pairs[name], ignore_index=True).drop_duplicates()]
+            self.buffered += len(self.sums[name][0]) + len(self.pairs[name][0])
+
+    def partial(self):
+        """Everything merged so far, in reduce_chunk's shape, for another Aggregator to add."""
+        self.compact()
+        return {name: (self.sums[name][0], self.pairs[name][0]) for name in DIMENSIONS if self.sums[name]}
+
+    def result(self):
+        """The four summary frames, keyed like data_loader.SOURCES."""
+        self.compact()
+        frames = {}
+        for name, keys in DIMENSIONS.items():
+            group = ['Insurer', 'Year'] + keys
+            if not self.sums[name]:
+                frames[name] = pd.DataFrame(columns=['Year'] + keys + ['Claimants', 'Volumes', 'Cost', 'Insurer'])
+                continue
+            sums, pairs = self.sums[name][0], self.pairs[name][0]
+            claimants = pairs.groupby(group, sort=False).size().rename('Claimants')
+            by_insurer = sums.join(claimants, on=group)
+
+            # Book of business: sums add up, claimants are re-counted across insurers
+            bob_group = ['Year'] + keys
+            bob = sums.groupby(bob_group, sort=False, as_index=False)[['Volumes', 'Cost']].sum()
+            bob_claimants = pairs[bob_group + ['Claimant']].drop_duplicates().groupby(bob_group).size()
+            bob = bob.join(bob_claimants.rename('Claimants'), on=bob_group).assign(Insurer='BOB')
+
+            # Cents, so results don't depend on the order partials were merged in
+            summary = pd.concat([bob, by_insurer], ignore_index=True).round({'Cost': 2})
+            # BOB first, then insurer, year, largest cost (dimension breaks ties)
+            order = np.lexsort([summary[key] for key in reversed(keys)]
+                               + [-summary['Cost'].to_numpy(), summary['Year'], summary['Insurer'],
+                                  summary['Insurer'] != 'BOB'])
+            frames[name] = summary.iloc[order][['Year'] + keys + ['Claimants', 'Volumes', 'Cost', 'Insurer']]
+        return frames
+
+
+def ingest(paths, chunksize=500_000, workers=1):
+    """Aggregate raw claim files; returns (summary frames, claim lines read)."""
+    aggregator = Aggregator()
+    rows = 0
+    if workers <= 1:
+        for chunk in (chunk for path in paths for chunk in read_chunks(path, chunksize)):
+            rows += len(chunk)
+            aggregator.add(reduce_chunk(chunk))
+        return aggregator.result(), rows
+
+    # Only (path, offsets) go to the workers and only reduced partials come
+    # back; at most one range per worker is held in memory at a time
+    with ProcessPoolExecutor(workers) as pool:
+        futures = []
+        for path in paths:
+            options = csv_options(path)
+            # Ranges small enough that every worker gets some of a single file
+            range_bytes = min(RANGE_BYTES, max(os.path.getsize(path) // (2 * workers), 1))
+            futures += [pool.submit(reduce_range, path, start, end, options, chunksize)
+                        for start, end in byte_ranges(path, range_bytes)]
+        for future in as_completed(futures):
+            partial, lines = future.result()
+            rows += lines
+            aggregator.add(partial)
+    return aggregator.result(), rows
+
+
+def write_summaries(frames, out_dir):
+    # Write each file under a temporary name and rename it into place, so a
+    # hot-reloading dashboard never reads a half-written CSV
+    os.makedirs(out_dir, exist_ok=True)
+    for name, filename in SOURCES.items():
+        path = os.path.join(out_dir, filename)
+        tmp = f"{path}.tmp{os.getpid()}"
+        frames[name].to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate line-level claim files into the dashboard CSVs.")
+    parser.add_argument('paths', nargs='+', help="raw claim CSV files")
+    parser.add_argument('--out', default='data', help="directory for the summary CSVs")
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    frames, rows = ingest(args.paths, args.chunksize, args.workers)
+    write_summaries(frames, args.out)
+    elapsed = time.perf_counter() - start
+    print(f"Aggregated {rows:,} claim lines in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s) into {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+"""Slow callbacks as background jobs on a local pool (TREND_BACKGROUND_JOBS=1).
+
+A ``background=True`` Dash callback answers the first request at once with a
+job handle; the browser then polls until the result is in, so a gunicorn
+worker isn't held for the whole computation. Dash's bundled managers need
+diskcache/multiprocess/psutil or Celery and Redis. JobManager is a manager
+built on the standard library instead:
+
+* jobs run on a pool inside each worker process: threads by default, which
+  share the worker's loaded data and figure cache, or forked processes
+  (TREND_JOB_POOL=process), which load their own copy of the data;
+* results, progress and job state are files in TREND_JOB_DIR, so any worker
+  on the host can answer the browser's polls;
+* when the inputs change while a job runs, the browser asks for the old job to
+  be cancelled. The job stops the next time it reports progress or reaches a
+  ``checkpoint()`` between build steps, and its result is dropped.
+
+    TREND_BACKGROUND_JOBS   run the selected callbacks as jobs (default 0)
+    TREND_JOB_POOL          thread or process
+    TREND_JOB_WORKERS       jobs running at once per worker process (default 2)
+    TREND_JOB_DIR           result store (default <tmp>/trend-jobs)
+"""
+import contextvars
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import dash
+from dash.background_callback.managers import BaseBackgroundCallbackManager
+from dash.exceptions import PreventUpdate
+from plotly.io.json import to_json_plotly
+
+# Dash internals this module relies on, tested with the versions pinned in
+# requirements.txt (dash>=4.4,<4.5). Check them before moving the pin:
+#
+# * private imports, so a job gets the callback context Dash gives its own
+#   managers' jobs: dash._callback_context.context_value,
+#   dash._utils.AttributeDict and
+#   dash.background_callback._proxy_set_props.ProxySetProps;
+# * the undocumented manager interface JobManager implements:
+#   BaseBackgroundCallbackManager.__init__(cache_by), UNDEFINED, make_job_fn,
+#   call_job_fn (and the keys of its ``context``), job_running, terminate_job,
+#   terminate_unhealthy_job, get_progress, result_ready, get_result,
+#   get_updated_props and get_or_create_signing_secret.
+#
+# A Dash release may move the private names, so they are imported here only.
+try:
+    from dash._callback_context import context_value
+    from dash._utils import AttributeDict
+    from dash.background_callback._proxy_set_props import ProxySetProps
+except ImportError as exc:
+    _internals_error = exc
+else:
+    _internals_error = None
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_JOBS = os.environ.get("TREND_BACKGROUND_JOBS", "0") == "1"
+JOB_POOL = os.environ.get("TREND_JOB_POOL", "thread")
+JOB_WORKERS = int(os.environ.get("TREND_JOB_WORKERS", "2"))
+JOB_DIR = os.environ.get("TREND_JOB_DIR", os.path.join(tempfile.gettempdir(), "trend-jobs"))
+
+# Milliseconds between the browser's polls for a running job
+POLL_INTERVAL = 500
+
+# Files nobody collected (closed tabs, killed workers) are removed after
+# MAX_AGE seconds, checked every PRUNE_EVERY jobs
+MAX_AGE = 3600
+PRUNE_EVERY = 64
+
+SECRET_FILE = 'signing-secret'
+
+# (callback, takes set_progress) by registry key; forked pool processes inherit it
+_functions = {}
+
+# The running job's cancel check, for checkpoint(); None outside a job
+_cancel_check = contextvars.ContextVar('trend_job_cancel_check', default=None)
+
+
+class JobCancelled(Exception):
+    """Raised in a job whose result is no longer wanted."""
+
+
+def checkpoint():
+    """Stop the running job here if it was cancelled; does nothing outside a job.
+
+    For loops between ``set_progress`` calls, so a cancelled job frees its
+    pool slot without building the rest of the figure.
+    """
+    check = _cancel_check.get()
+    if check is not None:
+        check()
+
+
+class JobStore:
+    """Job state and results as JSON files in one directory.
+
+    ``<key>.<job>`` holds the result of a job, ``<key>-progress`` and
+    ``<key>-set_props`` its latest progress and set_props updates,
+    ``job-<job>`` marks it as running (with the pid that owns it) and
+    ``job-<job>.cancel`` asks it to stop.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write(self, name, value):
+        path = self.path(name)
+        tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, 'w') as f:
+            # Figures, Patches and NumPy arrays serialize the way Dash sends them
+            f.write(to_json_plotly(value))
+        os.replace(tmp, path)
+
+    def read(self, name, default=None):
+        try:
+            with open(self.path(name)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+
+    def pop(self, name, default=None):
+        value = self.read(name, default)
+        self.delete(name)
+        return value
+
+    def delete(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def start(self, job):
+        self.write(f"job-{job}", {'pid': os.getpid(), 'started': time.time()})
+
+    def finish(self, job):
+        self.delete(f"job-{job}")
+        self.delete(f"job-{job}.cancel")
+
+    def cancel(self, job):
+        if self.exists(f"job-{job}"):
+            self.write(f"job-{job}.cancel", True)
+
+    def cancelled(self, job):
+        return self.exists(f"job-{job}.cancel")
+
+    def running(self, job):
+        state = self.read(f"job-{job}")
+        if state is None or self.cancelled(job):
+            return False
+        # A job whose worker died (restart, OOM kill) will never finish
+        try:
+            os.kill(state['pid'], 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def prune(self, max_age=MAX_AGE):
+        cutoff = time.time() - max_age
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.name != SECRET_FILE and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+        except OSError:
+            pass  # Another worker is pruning too
+
+
+def _run_job(function_key, directory, job, result_key, args, context):
+    # Module level so a process pool can pickle it
+    store = JobStore(directory)
+
+    def check_cancelled():
+        if store.cancelled(job):
+            raise JobCancelled(job)
+
+    def set_progress(value):
+        check_cancelled()
+        store.write(f"{result_key}-progress", list(value) if isinstance(value, (list, tuple)) else [value])
+
+    def set_props(component_id, props):
+        store.write(f"{result_key}-set_props", {component_id: props})
+
+    callback_context = AttributeDict(**context)
+    callback_context.ignore_register_page = False
+    callback_context.updated_props = ProxySetProps(set_props)
+    context_value.set(callback_context)
+    # Pool threads run one job after another; the check is reset when this one ends
+    cancel_token = _cancel_check.set(check_cancelled)
+
+    try:
+        # Callbacks registered after a process pool forked are unknown to it
+        callback, takes_progress = _functions[function_key]
+        progress = [set_progress] if takes_progress else []
+        if isinstance(args, dict):
+            result = callback(*progress, **args)
+        else:
+            result = callback(*progress, *args)
+    except JobCancelled:
+        logger.debug("Job %s cancelled", job)
+        result = None
+    except PreventUpdate:
+        result = {'_dash_no_update': '_dash_no_update'}
+    except Exception as exc:
+        result = {'background_callback_error': {'msg': str(exc), 'tb': traceback.format_exc()}}
+    try:
+        if not store.cancelled(job):
+            store.write(f"{result_key}.{job}", result)
+    except (OSError, TypeError, ValueError) as exc:
+        # The browser sees the job end without a result, as if cancelled
+        logger.warning("Could not store the result of job %s: %s", job, exc)
+    finally:
+        _cancel_check.reset(cancel_token)
+        store.finish(job)
+
+
+class JobManager(BaseBackgroundCallbackManager):
+    """Dash background callback manager running jobs on a local pool."""
+
+    def __init__(self, directory=JOB_DIR, pool=JOB_POOL, workers=JOB_WORKERS):
+        if _internals_error is not None:
+            raise RuntimeError(f"Background jobs don't support dash {dash.__version__} ({_internals_error}). "
+                               "Install the Dash version pinned in requirements.txt or set TREND_BACKGROUND_JOBS=0.")
+        self.directory = directory
+        self.store = JobStore(directory)
+        self.pool_kind = pool
+        self.workers = workers
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._submitted = 0
+        super().__init__(cache_by=None)
+
+    def _pool(self):
+        # One pool per process; workers forked from a preloading master make their own
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                if self.pool_kind == 'process':
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+                else:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='trend-job')
+                self._executor_pid = os.getpid()
+            self._submitted += 1
+            prune = self._submitted % PRUNE_EVERY == 0
+        if prune:
+            self.store.prune()
+        return self._executor
+
+    def make_job_fn(self, fn, progress, key=None):
+        _functions[key] = (fn, bool(progress))
+        return functools.partial(_run_job, key)
+
+    def call_job_fn(self, key, job_fn, args, context):
+        job = uuid.uuid4().hex
+        self.store.start(job)
+        self._pool().submit(job_fn, self.directory, job, key, args, dict(context))
+        return job
+
+    def job_running(self, job):
+        return job is not None and self.store.running(job)
+
+    def terminate_job(self, job):
+        if job is not None:
+            self.store.cancel(job)
+
+    def terminate_unhealthy_job(self, job):
+        if not self.job_running(job):
+            self.terminate_job(job)
+            return True
+        return False
+
+    def get_progress(self, key):
+        return self.store.pop(f"{key}-progress")
+
+    def result_ready(self, key):
+        return any(entry.name.startswith(f"{key}.") for entry in os.scandir(self.directory))
+
+    def get_result(self, key, job):
+        # Results are per job: two tabs with the same inputs each collect their own
+        if job is None:
+            return self.UNDEFINED
+        result = self.store.pop(f"{key}.{job}", self.UNDEFINED)
+        if result is self.UNDEFINED:
+            return self.UNDEFINED
+        self.store.delete(f"{key}-progress")
+        self.terminate_job(job)
+        return result
+
+    def get_updated_props(self, key):
+        return self.store.pop(f"{key}-set_props", {})
+
+    def get_or_create_signing_secret(self, generate):
+        # Every worker must sign job handles with the same secret; the first one wins
+        path = self.store.path(SECRET_FILE)
+        tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp, 'wb') as f:
+            f.write(generate())
+        try:
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+manager = JobManager() if BACKGROUND_JOBS else None
+
+
+def callback(app, *dependencies, progress=None, running=None):
+    """``app.callback`` that runs the function as a background job.
+
+    The function takes ``set_progress`` as its first argument. app.py
+    imports this module only with TREND_BACKGROUND_JOBS=1.
+    """
+    def decorator(func):
+        return app.callback(*dependencies, background=True, manager=manager, interval=POLL_INTERVAL,
+                            progress=progress, running=running)(func)
+    return decorator
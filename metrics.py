@@ -0,0 +1,247 @@
+"""Per-callback latency and payload metrics on /metrics (Prometheus text format).
+
+``install`` wraps every server callback registered on the app afterwards and
+records, per callback:
+
+* calls and errors;
+* seconds by phase: ``data`` (dataset and partition lookups, i.e. functions
+  decorated with ``timed_data``), ``figure`` (the rest of the callback:
+  figure building and diffing), ``serialize`` (Dash validating and encoding
+  the response) and ``total`` (the whole request handler);
+* response bytes as sent, after compression.
+
+The endpoint also reports the figure cache hit counts and the worker's
+resident memory. Each gunicorn worker keeps its own numbers, labelled with
+its pid; a scrape is answered by whichever worker takes it. Like every other
+route it sits behind the dashboard's basic auth.
+
+    TREND_METRICS   1 to record and serve metrics (default 1)
+"""
+import bisect
+import contextvars
+import functools
+import os
+import resource
+import threading
+import time
+from collections import defaultdict
+
+from dash.exceptions import PreventUpdate
+from flask import Response, g
+
+METRICS = os.environ.get("TREND_METRICS", "1") == "1"
+
+SECONDS_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+BYTES_BUCKETS = [256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304]
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label tuple."""
+
+    def __init__(self, name, documentation, label_names, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = defaultdict(lambda: [[0] * (len(buckets) + 1), 0.0])
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series[labels]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            base = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{{{_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def _labels(names, values):
+    # Workers forked after import report their own pid
+    pairs = [('worker', os.getpid())] + list(zip(names, values))
+    return ','.join(f'{name}="{value}"' for name, value in pairs)
+
+
+def _samples(name, kind, documentation, samples):
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{{{_labels(names, values)}}} {value}" for names, values, value in samples]
+    return lines
+
+
+calls = Counter('trend_callback_calls_total', "Callback executions.", ['callback'])
+errors = Counter('trend_callback_errors_total', "Callback executions that raised.", ['callback'])
+seconds = Histogram('trend_callback_seconds', "Callback time by phase.", ['callback', 'phase'], SECONDS_BUCKETS)
+response_bytes = Histogram('trend_callback_response_bytes', "Callback response size as sent.",
+                           ['callback'], BYTES_BUCKETS)
+
+
+class _Timings:
+    def __init__(self):
+        self.data = 0.0
+        self.function = None
+        self.in_data = False
+
+
+# Timings of the callback running in this thread (or background job)
+_function = contextvars.ContextVar('trend_callback_function', default=None)
+_handler = contextvars.ContextVar('trend_callback_handler', default=None)
+
+
+def timed_data(func):
+    """Count the time spent in ``func`` toward the running callback's data phase."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _function.get()
+        # Outside a callback, or nested in another data lookup
+        if timings is None or timings.in_data:
+            return func(*args, **kwargs)
+        timings.in_data = True
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.data += time.perf_counter() - start
+            timings.in_data = False
+
+    return wrapper
+
+
+def _timed_function(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _Timings()
+        token = _function.set(timings)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except PreventUpdate:
+            raise
+        except Exception:
+            errors.inc((name,))
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _function.reset(token)
+            calls.inc((name,))
+            seconds.observe((name, 'data'), timings.data)
+            seconds.observe((name, 'figure'), max(elapsed - timings.data, 0.0))
+            handler = _handler.get()
+            if handler is not None:
+                handler.function = elapsed
+
+    return wrapper
+
+
+def _timed_handler(name, handler):
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        timings = _Timings()
+        token = _handler.set(timings)
+        g.trend_callback = name
+        start = time.perf_counter()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _handler.reset(token)
+            # Background callbacks run their function elsewhere; the request only starts or polls it
+            seconds.observe((name, 'serialize'), max(elapsed - (timings.function or 0.0), 0.0))
+            seconds.observe((name, 'total'), elapsed)
+
+    return wrapper
+
+
+def _record_bytes(response):
+    name = g.pop('trend_callback', None)
+    if name is not None and response.content_length is not None:
+        response_bytes.observe((name,), response.content_length)
+    return response
+
+
+def resident_bytes():
+    # Current RSS from /proc; peak RSS where that isn't available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def render(cache_stats=None):
+    lines = []
+    for metric in (calls, errors, seconds, response_bytes):
+        lines += metric.render()
+    if cache_stats is not None:
+        stats = cache_stats()
+        lines += _samples('trend_figure_cache_lookups_total', 'counter', "Figure cache lookups by result.",
+                        [(['result'], (result,), stats[key])
+                         for result, key in [('hit', 'hits'), ('disk_hit', 'disk_hits'), ('miss', 'misses')]])
+        lines += _samples('trend_figure_cache_entries', 'gauge', "Figures held in this worker's cache.",
+                        [([], (), stats['entries'])])
+    lines += _samples('trend_worker_resident_memory_bytes', 'gauge', "Resident memory of this worker.",
+                    [([], (), resident_bytes())])
+    return '\n'.join(lines) + '\n'
+
+
+def install(app, cache_stats=None, enabled=METRICS):
+    """Instrument callbacks registered on ``app`` from now on and serve /metrics."""
+    if not enabled:
+        return
+    register = app.callback
+
+    def callback(*args, **kwargs):
+        # Dash adds the callback_map entry here and its handler when decorating
+        before = set(app.callback_map)
+        decorator = register(*args, **kwargs)
+        added = set(app.callback_map) - before
+
+        def wrap(func):
+            decorator(_timed_function(func.__name__, func))
+            for callback_id in added:
+                entry = app.callback_map[callback_id]
+                if 'callback' in entry:
+                    entry['callback'] = _timed_handler(func.__name__, entry['callback'])
+            return func
+
+        return wrap
+
+    app.callback = callback
+    # Registered before responses.install, so it runs after compression
+    app.server.after_request(_record_bytes)
+
+    @app.server.route('/metrics')
+    def metrics_endpoint():
+        return Response(render(cache_stats), mimetype='text/plain; version=0.0.4')
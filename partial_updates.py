@@ -0,0 +1,112 @@
+"""Send only the parts of a figure that change with the inputs.
+
+A figure callback also writes a short signature of the figure's static part
+(its layout minus the VARYING paths) to a dcc.Store and gets it back as
+State. While the new figure has the signature the browser already holds,
+e.g. after a metric or year change, the callback returns a ``dash.Patch``
+that replaces the traces and the varying layout paths. The template, axis
+styling, margins and legend settings are not sent again. Any other change
+(empty figure, different chart shape) sends the full figure.
+
+Set TREND_PARTIAL_UPDATES=0 to always send full figures.
+"""
+import hashlib
+import os
+
+from dash import Patch
+from plotly.io.json import to_json_plotly
+
+PARTIAL_UPDATES = os.environ.get("TREND_PARTIAL_UPDATES", "1") == "1"
+
+# Layout paths that follow the selected metric, year or comparison years
+VARYING = [
+    ('title',),
+    ('xaxis', 'title'),
+    ('yaxis', 'title'),
+    ('yaxis', 'categoryarray'),
+    ('xaxis2', 'range'),
+    ('barmode',),
+    ('annotations',),
+]
+
+
+def figure_json(figure):
+    # Cached figures are go.Figure objects, or plain dicts when read from disk
+    return figure.to_plotly_json() if hasattr(figure, 'to_plotly_json') else figure
+
+
+def split_layout(layout, varying=VARYING):
+    """Return (layout without the varying paths, {path: value} of those present)."""
+    static = dict(layout)
+    values = {}
+    for path in varying:
+        parent = static
+        for key in path[:-1]:
+            if not isinstance(parent.get(key), dict):
+                parent = None
+                break
+            # Copy on the way down so the figure itself is left alone
+            parent[key] = dict(parent[key])
+            parent = parent[key]
+        if parent is not None and path[-1] in parent:
+            values[path] = parent.pop(path[-1])
+    return static, values
+
+
+def digest(value):
+    return hashlib.sha256(to_json_plotly(value).encode()).hexdigest()[:16]
+
+
+def figure_signature(figure, varying=VARYING):
+    static, _ = split_layout(figure_json(figure).get('layout', {}), varying)
+    return digest(static)
+
+
+def patch_figure(node, figure, varying=VARYING):
+    """Record in Patch ``node`` the assignments that turn a same-signature figure into ``figure``."""
+    full = figure_json(figure)
+    _, values = split_layout(full.get('layout', {}), varying)
+    node['data'] = full.get('data', [])
+    if 'frames' in full:
+        node['frames'] = full['frames']
+    for path in varying:
+        if path in values:
+            target = node['layout']
+            for key in path[:-1]:
+                target = target[key]
+            target[path[-1]] = values[path]
+        elif _has_parent(full.get('layout', {}), path):
+            # Present in the browser's figure (e.g. last year's annotations) but not in this one
+            target = node['layout']
+            for key in path[:-1]:
+                target = target[key]
+            del target[path[-1]]
+
+
+def _has_parent(layout, path):
+    for key in path[:-1]:
+        layout = layout.get(key)
+        if not isinstance(layout, dict):
+            return False
+    return True
+
+
+def update(figure, client_signature, varying=VARYING):
+    """Return (figure or Patch, signature) for a graph's figure output."""
+    signature = figure_signature(figure, varying)
+    if not PARTIAL_UPDATES or signature != client_signature:
+        return figure, signature
+    patch = Patch()
+    patch_figure(patch, figure, varying)
+    return patch, signature
+
+
+def update_frames(frames, client_signature, varying=VARYING):
+    """Like update() for a {'years': [...], 'figures': [...]} store of per-year figures."""
+    signature = digest([frames['years']] + [figure_signature(figure, varying) for figure in frames['figures']])
+    if not PARTIAL_UPDATES or signature != client_signature:
+        return frames, signature
+    patch = Patch()
+    for i, figure in enumerate(frames['figures']):
+        patch_figure(patch['figures'][i], figure, varying)
+    return patch, signature
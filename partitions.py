@@ -0,0 +1,92 @@
+"""Per-(dataset, insurer, year) slices of the dashboard frames.
+
+Callbacks used to mask the full frames on every request. The index is built
+once after loading, so a lookup costs the same however many insurers and
+years the data holds.
+"""
+import data_loader
+from metrics import timed_data
+
+
+class PartitionIndex:
+    def __init__(self, frames):
+        self._insurer_slices = {}
+        self._year_slices = {}
+        self._empty = {}
+        for name, df in frames.items():
+            self.add(name, df)
+
+    def add(self, name, df):
+        """Index (or re-index) the frame for dataset ``name``."""
+        insurer_slices = {}
+        year_slices = {}
+
+        # Every year for an insurer, in year order (ties keep source order)
+        by_year = df.sort_values('Year', kind='stable')
+        for insurer, part in by_year.groupby('Insurer', sort=False, observed=True):
+            insurer_slices[(name, insurer)] = part
+
+        # One insurer-year, largest cost first
+        by_cost = df.sort_values('Cost', ascending=False, kind='stable')
+        for (insurer, year), part in by_cost.groupby(['Insurer', 'Year'], sort=False, observed=True):
+            year_slices[(name, insurer, year)] = part
+
+        self._insurer_slices.update(insurer_slices)
+        self._year_slices.update(year_slices)
+        self._empty[name] = df.iloc[0:0]
+
+    def by_insurer(self, dataset, insurer):
+        """All rows of ``dataset`` for ``insurer``, ordered by Year."""
+        return self._insurer_slices.get((dataset, insurer), self._empty[dataset])
+
+    def by_year(self, dataset, insurer, year):
+        """Rows of ``dataset`` for ``insurer`` in ``year``, ordered by descending Cost."""
+        return self._year_slices.get((dataset, insurer, year), self._empty[dataset])
+
+
+class InsurerContext:
+    """One insurer's view of a Dataset, shared by every callback of an insurer switch.
+
+    Switching insurer fires about ten callbacks for the same insurer. They all
+    take their slices from one context (cached on the Dataset), so anything
+    derived from a slice (years, per-item series) is computed once per
+    insurer and data version instead of once per callback.
+    """
+
+    def __init__(self, dataset, insurer):
+        self.dataset = dataset
+        self.insurer = insurer
+        self._years = {}
+        self._series = {}
+
+    def rows(self, name):
+        """All rows of dataset ``name``, ordered by Year."""
+        return self.dataset.by_insurer(name, self.insurer)
+
+    def year_rows(self, name, year):
+        """Rows of dataset ``name`` in ``year``, ordered by descending Cost."""
+        return self.dataset.by_year(name, self.insurer, year)
+
+    def top(self, name, year, metric, n):
+        return self.dataset.top(name, self.insurer, year, metric, n)
+
+    @timed_data
+    def years(self, name):
+        """Years with rows in dataset ``name``, ascending."""
+        if name not in self._years:
+            self._years[name] = [int(year) for year in self.rows(name)['Year'].unique()]
+        return self._years[name]
+
+    def latest_year(self, name):
+        years = self.years(name)
+        return years[-1] if years else None
+
+    @timed_data
+    def series(self, name, key):
+        """Rows of one dimension value (e.g. a province) over the years."""
+        if name not in self._series:
+            rows = self.rows(name)
+            dimension = rows[data_loader.DIMENSIONS[name][0]]
+            self._series[name] = dict(iter(rows.groupby(dimension.to_numpy(), sort=False)))
+        series = self._series[name]
+        return series[key] if key in series else self.rows(name).iloc[0:0]
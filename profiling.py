@@ -0,0 +1,157 @@
+"""Profile single callback requests on demand (TREND_PROFILE_TOKEN).
+
+With a token set, a /_dash-update-component request that carries it in the
+``X-Trend-Profile`` header is profiled from the end of the auth check to the
+response, and the profile is written to TREND_PROFILE_DIR:
+
+* ``cprofile`` (default): a pstats file, for ``python -m pstats``, snakeviz
+  or flameprof;
+* ``sample``: the request thread's stack sampled every millisecond, as
+  folded stacks for flamegraph.pl or speedscope.
+
+Each profile is named after the time and the callback's first output, and a
+``.json`` file beside it records the output, inputs, status and duration.
+Requests need the dashboard's basic auth first, then the token.
+
+Without a token nothing is installed, so requests pay nothing. With one,
+requests without the header pay one header lookup.
+
+    TREND_PROFILE_TOKEN     value of X-Trend-Profile that turns profiling on (default: off)
+    TREND_PROFILE_MODE      cprofile or sample
+    TREND_PROFILE_DIR       output directory (default <tmp>/trend-profiles)
+
+    curl -u user:pass -H "X-Trend-Profile: $TREND_PROFILE_TOKEN" -H 'Content-Type: application/json' \\
+         -d @payload.json http://localhost:8000/_dash-update-component
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN = os.environ.get("TREND_PROFILE_TOKEN", "")
+PROFILE_MODE = os.environ.get("TREND_PROFILE_MODE", "cprofile")
+PROFILE_DIR = os.environ.get("TREND_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "trend-profiles"))
+
+HEADER = 'X-Trend-Profile'
+SAMPLE_INTERVAL = 0.001
+
+
+class StackSampler:
+    """Samples one thread's Python stack from a helper thread."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='trend-profile-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        # Brendan Gregg's folded format: "outer;...;inner count"
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _wanted():
+    supplied = request.headers.get(HEADER)
+    return (supplied is not None and request.path.endswith('/_dash-update-component')
+            and hmac.compare_digest(supplied.encode(), PROFILE_TOKEN.encode()))
+
+
+def _start():
+    if not _wanted():
+        return
+    if PROFILE_MODE == 'sample':
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    g.trend_profile = (profiler, time.perf_counter())
+
+
+def _stop(response):
+    started = g.pop('trend_profile', None)
+    if started is None:
+        return response
+    profiler, start = started
+    if isinstance(profiler, StackSampler):
+        profiler.stop()
+    else:
+        profiler.disable()
+    try:
+        _write(profiler, time.perf_counter() - start, response.status_code)
+    except (OSError, TypeError, ValueError) as exc:
+        logger.warning("Could not write profile: %s", exc)
+    return response
+
+
+def _write(profiler, seconds, status):
+    body = request.get_json(silent=True) or {}
+    output = body.get('output', '')
+    # '..a.figure...b.data..' -> 'a.figure'
+    first_output = output.strip('.').split('...')[0] or 'unknown'
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{re.sub(r'[^A-Za-z0-9_.-]', '_', first_output)}"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, name)
+    # Requests in the same second for the same output
+    suffix = 1
+    while os.path.exists(f"{base}.json"):
+        suffix += 1
+        base = os.path.join(PROFILE_DIR, f"{name}-{suffix}")
+
+    if isinstance(profiler, StackSampler):
+        artifact = f"{base}.folded"
+        profiler.write(artifact)
+    else:
+        artifact = f"{base}.pstats"
+        profiler.dump_stats(artifact)
+    with open(f"{base}.json", 'w') as f:
+        json.dump({
+            'output': output,
+            'inputs': body.get('inputs', []),
+            'state': body.get('state', []),
+            'status': status,
+            'seconds': round(seconds, 6),
+            'mode': PROFILE_MODE,
+            'profile': os.path.basename(artifact),
+        }, f, indent=2, default=str)
+    logger.info("Profiled %s in %.1f ms: %s", first_output, seconds * 1000, artifact)
+
+
+def install(server):
+    """Profile requests carrying the token; call after the auth is set up so its check runs first."""
+    if not PROFILE_TOKEN:
+        return
+    server.before_request(_start)
+    server.after_request(_stop)
@@ -0,0 +1,37 @@
+"""Materialized top-K rankings per (dataset, insurer, year, metric).
+
+data_loader.add_ranks stores each row's rank within its insurer-year as
+``<metric>_Rank`` columns. The store keeps, for every combination, the
+rows ranked 1..TOP_K in rank order, so callbacks read a ready list instead
+of sorting the slice on every request. Only the selected rows are ordered
+when the store is built.
+"""
+from data_loader import RANK_METRICS
+
+# Longest list any view shows (therapy ranking shows 15)
+TOP_K = 15
+
+
+class RankingStore:
+    def __init__(self, frames=None):
+        self._top = {}
+        self._empty = {}
+        for name, df in (frames or {}).items():
+            self.add(name, df)
+
+    def add(self, name, df):
+        """Materialize the rankings of dataset ``name`` (a frame with rank columns)."""
+        top = {}
+        for metric in RANK_METRICS:
+            rank = f'{metric}_Rank'
+            selected = df[df[rank] <= TOP_K].sort_values(rank, kind='stable')
+            for (insurer, year), part in selected.groupby(['Insurer', 'Year'], sort=False, observed=True):
+                top[(name, insurer, year, metric)] = part
+        self._top.update(top)
+        self._empty[name] = df.iloc[0:0]
+
+    def top(self, name, insurer, year, metric, n=TOP_K):
+        """Rows ranked 1..n by ``metric`` for ``insurer`` in ``year``, best first."""
+        if n > TOP_K:
+            raise ValueError(f"Only the top {TOP_K} rows are materialized")
+        return self._top.get((name, insurer, year, metric), self._empty[name]).head(n)
@@ -0,0 +1,107 @@
+"""Compact, compressed HTTP responses (TREND_COMPACT_RESPONSES=1).
+
+Three parts, switched on together by ``install``:
+
+* figures use a slim copy of the default Plotly template holding only the
+  layout and trace defaults these charts use. The stock template repeats
+  about 6 KB of defaults for every trace type in every figure;
+* JSON is encoded with orjson when it is installed (Plotly's fast engine,
+  NumPy arrays as base64 typed arrays);
+* responses are compressed with brotli (when installed) or gzip, whichever
+  the browser accepts.
+
+    pip install orjson brotli   # optional; gzip and the stock encoder are the fallback
+"""
+import gzip
+import logging
+import os
+
+import plotly.graph_objects as go
+import plotly.io as pio
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+COMPACT_RESPONSES = os.environ.get("TREND_COMPACT_RESPONSES", "0") == "1"
+
+# Smaller bodies aren't worth the CPU or the extra header
+MIN_SIZE = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE = {'application/json', 'text/html', 'text/css', 'text/javascript', 'application/javascript'}
+
+TEMPLATE = 'dashboard'
+
+# Trace types the dashboard draws (px.bar/px.line produce these too)
+TEMPLATE_TRACES = ['bar', 'scatter']
+
+# Layout defaults for subplot kinds and colour scales no chart uses
+UNUSED_LAYOUT = ['polar', 'ternary', 'scene', 'geo', 'coloraxis', 'colorscale']
+
+
+def slim_template(base='plotly'):
+    """``base`` reduced to the trace types and layout parts the dashboard uses."""
+    full = pio.templates[base].to_plotly_json()
+    return go.layout.Template({
+        'data': {trace: full['data'][trace] for trace in TEMPLATE_TRACES if trace in full['data']},
+        'layout': {key: value for key, value in full['layout'].items() if key not in UNUSED_LAYOUT},
+    })
+
+
+def accepted_encoding(accept_encoding):
+    # Prefer brotli, then gzip; ignore anything the client rules out with q=0
+    accepted = set()
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    encoding = accepted_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+    if encoding == 'br':
+        data = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, GZIP_LEVEL)
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def install(server, enabled=COMPACT_RESPONSES):
+    """Switch on the compact pipeline for ``server`` and every figure built afterwards."""
+    if not enabled:
+        return
+    pio.templates[TEMPLATE] = slim_template()
+    pio.templates.default = TEMPLATE
+    if orjson is not None:
+        pio.json.config.default_engine = 'orjson'
+    server.after_request(compress_response)
+    logger.info("Compact responses on (encoder: %s, compression: %s)",
+                'orjson' if orjson is not None else 'json', 'brotli/gzip' if brotli is not None else 'gzip')
@@ -0,0 +1,203 @@
+"""Binary columnar snapshot of the derived dashboard frames.
+
+Each frame is stored as one ``.npy`` file per column so workers can
+memory-map it instead of re-parsing the CSV extracts. String columns are
+dictionary-encoded (integer codes plus a category list in the manifest) and
+can be loaded straight back as categoricals.
+
+The manifest records the size, mtime and SHA-256 of every source file. A
+snapshot is used only while those still match; otherwise callers fall back
+to parsing the CSVs.
+
+Build or refresh it with::
+
+    python snapshot.py [--data-dir data] [--force]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the derived columns change so old snapshots are ignored
+SNAPSHOT_VERSION = 3
+
+MANIFEST = 'manifest.json'
+INDEX_COLUMN = '__index__'
+
+
+def snapshot_dir(data_dir):
+    return os.environ.get("TREND_SNAPSHOT_DIR", os.path.join(data_dir, '.snapshot'))
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(paths):
+    # Size, mtime and content hash of every source file
+    result = {}
+    for name, path in paths.items():
+        stat = os.stat(path)
+        result[name] = {
+            'file': os.path.basename(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_digest(path),
+        }
+    return result
+
+
+def is_fresh(manifest, paths):
+    if manifest.get('version') != SNAPSHOT_VERSION:
+        return False
+    sources = manifest.get('sources', {})
+    if set(sources) != set(paths):
+        return False
+    for name, path in paths.items():
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        recorded = sources[name]
+        if stat.st_size != recorded['size']:
+            return False
+        # Unchanged mtime means unchanged file; otherwise compare contents
+        if stat.st_mtime_ns != recorded['mtime_ns'] and file_digest(path) != recorded['sha256']:
+            return False
+    return True
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_frame(df, directory):
+    os.makedirs(directory)
+    columns = []
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        df = df.reset_index(names=INDEX_COLUMN)
+    for position, column in enumerate(df.columns):
+        values = df[column]
+        entry = {'name': column, 'file': f'{position}.npy', 'dtype': str(values.dtype)}
+        if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype.kind not in 'biuf':
+            categorical = pd.Categorical(values)
+            entry['categories'] = categorical.categories.tolist()
+            entry['ordered'] = bool(categorical.ordered)
+            array = categorical.codes
+        else:
+            array = values.to_numpy()
+        np.save(os.path.join(directory, entry['file']), array, allow_pickle=False)
+        columns.append(entry)
+    return {'rows': len(df), 'columns': columns}
+
+
+def read_frame(directory, spec, mmap_mode='r', keep_categories=False):
+    data = {}
+    for entry in spec['columns']:
+        array = np.load(os.path.join(directory, entry['file']), mmap_mode=mmap_mode,
+                        allow_pickle=False)
+        if 'categories' in entry:
+            values = pd.Categorical.from_codes(array, categories=entry['categories'],
+                                               ordered=entry['ordered'])
+            if not keep_categories and entry['dtype'] != 'category':
+                values = pd.Series(values).astype(entry['dtype']).to_numpy()
+            data[entry['name']] = values
+        else:
+            data[entry['name']] = array
+    df = pd.DataFrame(data, copy=False)
+    if INDEX_COLUMN in df.columns:
+        df = df.set_index(INDEX_COLUMN)
+        df.index.name = None
+    return df
+
+
+def write_snapshot(frames, paths, directory):
+    # Write into a fresh subdirectory, then swap the manifest in atomically
+    os.makedirs(directory, exist_ok=True)
+    sources = fingerprint(paths)
+    key = hashlib.sha256(json.dumps(sources, sort_keys=True).encode()).hexdigest()[:16]
+    build_dir = tempfile.mkdtemp(prefix='build-', dir=directory)
+    manifest = {'version': SNAPSHOT_VERSION, 'sources': sources, 'data': key, 'frames': {}}
+    for name, df in frames.items():
+        manifest['frames'][name] = write_frame(df, os.path.join(build_dir, name))
+
+    target = os.path.join(directory, key)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.rename(build_dir, target)
+    tmp_manifest = os.path.join(directory, f'.{MANIFEST}.{os.getpid()}')
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_manifest, os.path.join(directory, MANIFEST))
+
+    # Readers that already mapped an older snapshot keep their open files
+    for entry in os.listdir(directory):
+        stale = os.path.join(directory, entry)
+        if entry != key and os.path.isdir(stale):
+            shutil.rmtree(stale, ignore_errors=True)
+    return manifest
+
+
+def load_snapshot(paths, directory, names=None, mmap_mode='r', keep_categories=False):
+    # ``names`` limits loading to some frames; freshness is still checked on every source
+    manifest = read_manifest(directory)
+    if manifest is None or not is_fresh(manifest, paths):
+        return None
+    data_dir = os.path.join(directory, manifest['data'])
+    try:
+        return {name: read_frame(os.path.join(data_dir, name), manifest['frames'][name], mmap_mode,
+                                 keep_categories)
+                for name in names or manifest['frames']}
+    except (OSError, ValueError, KeyError) as exc:
+        logger.warning("Ignoring unreadable snapshot in %s: %s", directory, exc)
+        return None
+
+
+def column_values(paths, directory, name, column):
+    # Categories of one dictionary-encoded column, from a fresh manifest only
+    manifest = read_manifest(directory)
+    if manifest is None or not is_fresh(manifest, paths):
+        return None
+    for entry in manifest['frames'].get(name, {}).get('columns', []):
+        if entry['name'] == column and 'categories' in entry:
+            return entry['categories']
+    return None
+
+
+def main(argv=None):
+    import data_loader
+
+    parser = argparse.ArgumentParser(description="Build the binary snapshot of the dashboard data.")
+    parser.add_argument('--data-dir', default=data_loader.DATA_DIR)
+    parser.add_argument('--force', action='store_true', help="rebuild even if the snapshot is fresh")
+    args = parser.parse_args(argv)
+
+    paths = data_loader.source_paths(args.data_dir)
+    directory = snapshot_dir(args.data_dir)
+    manifest = read_manifest(directory)
+    if not args.force and manifest is not None and is_fresh(manifest, paths):
+        print(f"Snapshot in {directory} is up to date")
+        return
+    manifest = write_snapshot(data_loader.build_frames(args.data_dir), paths, directory)
+    rows = sum(spec['rows'] for spec in manifest['frames'].values())
+    print(f"Wrote snapshot {manifest['data']} ({rows} rows) to {directory}")
+
+
+if __name__ == '__main__':
+    main()
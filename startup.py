@@ -0,0 +1,34 @@
+"""Startup phase timings for the app module.
+
+app.py imports this first and marks the end of each phase as it loads
+(imports, app setup, data load, layout, callbacks, warm-up). ``report``
+logs the breakdown once, so every worker's boot shows where its time went;
+benchmarks/cold_start.py reads ``timings`` to hold startup to a budget.
+"""
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+_start = time.perf_counter()
+_last = _start
+
+# Seconds per phase, in the order they ran
+timings = {}
+
+
+def mark(phase):
+    """End ``phase`` now; it began where the previous one ended."""
+    global _last
+    now = time.perf_counter()
+    timings[phase] = timings.get(phase, 0.0) + now - _last
+    _last = now
+
+
+def total():
+    return _last - _start
+
+
+def report():
+    breakdown = ', '.join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in timings.items())
+    logger.info("Started in %.0f ms: %s", total() * 1000, breakdown)
@@ -0,0 +1,118 @@
+"""Server-side filtering, sorting and paging for DataTables.
+
+With ``page_action='custom'`` (and the matching filter/sort actions) the
+browser sends its ``filter_query``, ``sort_by``, ``page_current`` and
+``page_size`` and only receives the visible page. ``query_page`` applies
+them to an already partitioned slice.
+
+Filter expressions follow the DataTable syntax, one clause per column joined
+with ``&&``::
+
+    {Generic_Name} icontains "statin" && {Cost} >= 1000
+"""
+import logging
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# "{column} operator value"; the value may be quoted
+CLAUSE = re.compile(r'^\{(?P<column>[^}]+)\}\s+(?P<operator>[a-z]+|[<>!=]=?)\s*(?P<value>.*)$')
+
+OPERATOR_ALIASES = {'=': 'eq', '!=': 'ne', '<': 'lt', '<=': 'le', '>': 'gt', '>=': 'ge'}
+
+
+def parse_value(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in '"\'`':
+        return text[1:-1]
+    return text
+
+
+def clause_mask(df, column, operator, value):
+    """Boolean mask of one filter clause, or None if it can't be applied."""
+    if column not in df.columns:
+        return None
+    operator = OPERATOR_ALIASES.get(operator, operator)
+    # DataTable prefixes i/s for case-insensitive/sensitive; sensitive is the default
+    insensitive = False
+    if operator not in ('is', 'ge', 'le') and operator[:1] in 'is' and len(operator) > 2:
+        insensitive, operator = operator[0] == 'i', operator[1:]
+    values = df[column]
+
+    if operator == 'is':
+        return values.isna() if value in ('blank', 'nil') else None
+    if operator in ('contains', 'datestartswith'):
+        strings = values.astype(str)
+        if insensitive:
+            strings, value = strings.str.lower(), value.lower()
+        if operator == 'contains':
+            return strings.str.contains(value, regex=False)
+        return strings.str.startswith(value)
+
+    if pd.api.types.is_numeric_dtype(values):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    else:
+        values = values.astype(str)
+        if insensitive:
+            values, value = values.str.lower(), value.lower()
+    comparisons = {'eq': values.__eq__, 'ne': values.__ne__, 'lt': values.__lt__,
+                   'le': values.__le__, 'gt': values.__gt__, 'ge': values.__ge__}
+    if operator not in comparisons:
+        return None
+    return comparisons[operator](value)
+
+
+def apply_filter(df, filter_query):
+    if not filter_query:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for clause in filter_query.split(' && '):
+        match = CLAUSE.match(clause.strip())
+        clause_rows = None
+        if match:
+            clause_rows = clause_mask(df, match['column'], match['operator'], parse_value(match['value']))
+        if clause_rows is None:
+            # The table marks invalid queries itself; don't let one empty the page
+            logger.debug("Ignoring filter clause %r", clause)
+            continue
+        mask &= clause_rows.to_numpy(dtype=bool, na_value=False)
+    return df[mask]
+
+
+def apply_sort(df, sort_by):
+    sort_by = [entry for entry in sort_by or [] if entry['column_id'] in df.columns]
+    if not sort_by:
+        return df
+    rank_column = f"{sort_by[0]['column_id']}_Rank"
+    if len(sort_by) == 1 and sort_by[0]['direction'] == 'desc' and rank_column in df.columns:
+        # Precomputed rank order within the insurer-year (see data_loader.add_ranks)
+        return df.iloc[np.argsort(df[rank_column].to_numpy(), kind='stable')]
+    return df.sort_values([entry['column_id'] for entry in sort_by],
+                          ascending=[entry['direction'] == 'asc' for entry in sort_by],
+                          kind='stable', na_position='last')
+
+
+def query_page(df, filter_query, sort_by, page_current, page_size):
+    """Return (visible page, total matching rows, page number actually served).
+
+    A page past the end (e.g. after a narrower filter) falls back to the first.
+    """
+    df = apply_filter(df, filter_query)
+    total = len(df)
+    page_current = page_current or 0
+    if page_current * page_size >= max(total, 1):
+        page_current = 0
+    start = page_current * page_size
+    sorted_rows = apply_sort(df, sort_by)
+    return sorted_rows.iloc[start:start + page_size], total, page_current
+
+
+def page_count(total, page_size):
+    return max(1, math.ceil(total / page_size))
@@ -0,0 +1,11 @@
+"""Shared setup: the repo root on sys.path and bench credentials for ``import app``."""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.dash_client import PASSWORD, USERNAME  # noqa: E402
+
+os.environ.setdefault('DASH_USERNAME', USERNAME)
+os.environ.setdefault('DASH_PASSWORD', PASSWORD)
@@ -0,0 +1,21 @@
+"""The metrics module stays reachable in app.py next to the metric list."""
+import base64
+import os
+
+import metrics
+
+
+def test_metric_list_does_not_shadow_metrics_module():
+    import app
+
+    assert app.callback_metrics is metrics
+    assert [metric['value'] for metric in app.metrics][:3] == ['Claimants', 'Volumes', 'Cost']
+
+
+def test_metrics_endpoint_is_served():
+    import app
+
+    token = base64.b64encode(f"{os.environ['DASH_USERNAME']}:{os.environ['DASH_PASSWORD']}".encode())
+    response = app.server.test_client().get('/metrics', headers={'Authorization': f"Basic {token.decode()}"})
+    assert response.status_code == 200
+    assert b'trend_worker_resident_memory_bytes' in response.data
@@ -0,0 +1,29 @@
+"""Modules kept off the boot path stay out of sys.modules after ``import app``."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.cold_start import DEFERRED, switched_on
+from benchmarks.dash_client import REPO_ROOT
+
+SWITCHES = [variable for variable in DEFERRED.values() if variable is not None]
+
+
+def loaded_at_boot(env):
+    script = "import json, sys, app; print(json.dumps(sorted(sys.modules)))"
+    output = subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return set(json.loads(output.strip().splitlines()[-1]))
+
+
+@pytest.mark.parametrize('overrides', [{}, {'TREND_PARTIAL_UPDATES': '0'}], ids=['default', 'no-partial-updates'])
+def test_deferred_modules_are_not_loaded_at_boot(overrides):
+    env = {key: value for key, value in os.environ.items() if key not in SWITCHES}
+    env.update(overrides)
+    loaded = loaded_at_boot(env)
+    unexpected = [name for name, variable in DEFERRED.items()
+                  if name in loaded and not switched_on(variable, env)]
+    assert unexpected == []
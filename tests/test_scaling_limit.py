@@ -0,0 +1,30 @@
+"""The scaling gate's limit over recorded baselines."""
+import pytest
+
+from benchmarks.scaling import SLACK, SPREAD_FACTOR, limit, regressions
+
+
+def test_limit_uses_tolerance_when_it_is_the_widest_margin():
+    assert limit({'best': 100.0, 'worst': 104.0}, 0.25) == pytest.approx(104.0 + 25.0)
+
+
+def test_limit_uses_recorded_spread_when_it_is_the_widest_margin():
+    recorded = {'best': 10.0, 'worst': 16.0}
+    assert limit(recorded, 0.25) == pytest.approx(16.0 + SPREAD_FACTOR * 6.0)
+
+
+def test_limit_never_drops_below_slack():
+    assert limit({'best': 0.2, 'worst': 0.2}, 0.25) == pytest.approx(0.2 + SLACK)
+
+
+def test_regressions_flag_only_values_over_the_limit():
+    baselines = {'scales': {'small': {'measures': {'annual': {'best': 10.0, 'worst': 12.0},
+                                                   'generic': {'best': 40.0, 'worst': 41.0}}}}}
+    results = {
+        'small': {'measures': {'annual': {'best': 16.0}, 'generic': {'best': 60.0}, 'new': {'best': 1.0}}},
+        'huge': {'measures': {'annual': {'best': 1000.0}}},
+    }
+    # annual: 12 + max(2.5, 4, 1) = 16, not over; generic: 41 + max(10, 2, 1) = 51, over
+    found = regressions(results, baselines, 0.25)
+    assert len(found) == 1
+    assert found[0].startswith('small: generic 60.0')
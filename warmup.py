@@ -0,0 +1,99 @@
+"""Pre-render the dashboard's figures into the figure cache at startup (TREND_WARMUP=1).
+
+Without it the first user to pick an insurer after a deploy pays for every
+chart on every tab. app.py lists the figures users can ask for, for BOB and
+each insurer: the page-load defaults first, then every metric for the latest
+year, then the other years. ``run`` renders them in a pool of forked
+processes, which share the loaded data, and stores them in the figure cache
+(and its disk store, with TREND_FIGURE_CACHE_DIR) before the worker serves.
+
+The warm-up gives up after TREND_WARMUP_BUDGET seconds and never renders
+more figures than the cache holds, so it neither delays readiness for long
+nor evicts its own work. Gunicorn kills a worker that takes longer than
+--timeout to boot: keep the budget below it, or warm once in the master with
+--preload and let every worker inherit the cache.
+
+    TREND_WARMUP            warm the figure cache at startup (default 0)
+    TREND_WARMUP_BUDGET     seconds the warm-up may take (default 20)
+    TREND_WARMUP_WORKERS    render processes (default: CPU count)
+"""
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+from plotly.io.json import to_json_plotly
+
+import data_loader
+import datastore
+from figure_cache import cache, figure_key
+
+logger = logging.getLogger(__name__)
+
+WARMUP = os.environ.get("TREND_WARMUP", "0") == "1"
+WARMUP_BUDGET = float(os.environ.get("TREND_WARMUP_BUDGET", "20"))
+WARMUP_WORKERS = int(os.environ.get("TREND_WARMUP_WORKERS", "0")) or os.cpu_count()
+
+# Outcome of the last run(), for the logs and a readiness check
+state = {'done': False, 'planned': 0, 'cached': 0, 'rendered': 0, 'seconds': 0.0}
+
+# (cached callback, args) being rendered; the forked pool processes inherit it
+_tasks = []
+
+
+def _render(index):
+    callback, args = _tasks[index]
+    # Build without the cache; the parent process stores the result
+    return to_json_plotly(callback.__wrapped__(*args))
+
+
+def run(tasks, budget=WARMUP_BUDGET, workers=WARMUP_WORKERS):
+    """Render ``tasks`` ((cached callback, args), most wanted first) into the figure cache."""
+    start = time.monotonic()
+    state.update(done=False, planned=len(tasks), cached=0, rendered=0)
+    if cache.maxsize <= 0:
+        logger.info("Figure cache disabled; skipping warm-up")
+        state.update(done=True)
+        return state
+
+    # Load every frame before forking so the renderers share it
+    datastore.current().load(list(data_loader.SOURCES))
+    pending = []
+    for callback, args in tasks:
+        key = figure_key(callback, args)
+        # Already in memory, or written to the disk store by another worker
+        if cache.get(key) is None:
+            pending.append((key, callback, args))
+    state['cached'] = len(tasks) - len(pending)
+    room = max(cache.maxsize - state['cached'], 0)
+    if len(pending) > room:
+        logger.info("Warm-up limited to %d of %d figures by TREND_FIGURE_CACHE_SIZE", room, len(pending))
+        pending = pending[:room]
+
+    _tasks[:] = [(callback, args) for _, callback, args in pending]
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+    try:
+        futures = {executor.submit(_render, i): key for i, (key, _, _) in enumerate(pending)}
+        for future in as_completed(futures, timeout=max(budget - (time.monotonic() - start), 0)):
+            try:
+                # Disk-cached figures are plain dicts too; the callbacks accept both
+                cache.put(futures[future], json.loads(future.result()))
+            except Exception:
+                logger.exception("Warm-up render failed for %s", futures[future])
+                continue
+            state['rendered'] += 1
+    except FuturesTimeout:
+        logger.warning("Warm-up budget of %.0fs used up; %d of %d figures rendered",
+                       budget, state['rendered'], len(pending))
+    finally:
+        # Renders in progress finish on their own; queued ones are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+        _tasks.clear()
+
+    state.update(done=True, seconds=round(time.monotonic() - start, 2))
+    logger.info("Warm-up: %(rendered)d figures rendered, %(cached)d already cached, "
+                "%(planned)d planned in %(seconds).1fs", state)
+    return state